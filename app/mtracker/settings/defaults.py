@@ -442,11 +442,79 @@ RAVEN_CONFIG = {
 # requesting a hitgroup page. Increasing the value may be the solution for
 # 'limit exceeded for page xx' messages, caused by crawler timeouts.
 CRAWLER_FETCH_TIMEOUT = 3  # seconds
-CRAWLER_RETRY_SLEEP = 0.1  # seconds
+CRAWLER_RETRY_SLEEP = 0.1  # seconds, base of the exponential retry backoff
+CRAWLER_RETRY_MAX_SLEEP = 2  # seconds, the longest single retry backoff
 CRAWLER_RETRY_COUNT = 1000  # max retries
-CRAWLER_RETRY_WARNING = 800  # logs warnings instead of debugs after that many
+CRAWLER_RETRY_MAX_TIME = 100  # seconds, no retries of a page are started later
+CRAWLER_RETRY_WARNING = 50  # logs warnings instead of debugs after that many
 CRAWLER_TIME_WARNING = 600  # seconds
+# Adaptive limit of requests sent to mturk. The crawler starts with the given
+# rate, increases it while responses are clean and cuts it in half whenever the
+# limit exceeded page is returned.
+CRAWLER_FETCH_RATE = 5.0  # requests per second
+CRAWLER_FETCH_MIN_RATE = 0.5  # requests per second
+CRAWLER_FETCH_MAX_RATE = 50.0  # requests per second
 CRAWLER_GROUP_PROCESSING_TIMEOUT = 60  # seconds
+# Content ids of groups updated during that many days are loaded into memory at
+# the crawl start, so that workers query the database only for unknown groups.
+CRAWLER_CONTENT_ID_CACHE_DAYS = 3
+# Number of idle keep-alive connections kept open per host by the crawler.
+CRAWLER_HTTP_POOL_SIZE = 10
+# Groups found on listing pages are passed to detail workers through a queue
+# limited to that many groups, listing downloads wait while it's full.
+CRAWLER_QUEUE_SIZE = 200
+# Listing pages expected to hold all available groups (CRAWLER_GROUPS_PER_PAGE
+# on every page) are fetched at once, followed by CRAWLER_EXTRA_PAGES pages
+# catching groups posted during the crawl; pages past them are fetched only
+# if the last one isn't empty.
+CRAWLER_GROUPS_PER_PAGE = 10
+CRAWLER_EXTRA_PAGES = 2
+# Number of workers fetching group details and writing them to the database.
+CRAWLER_DETAIL_WORKERS = 20
+# Database connections shared by crawler workers; a worker waits (at most
+# CRAWLER_DB_POOL_TIMEOUT seconds, None - forever) when all of them are busy.
+# Connections are taken only for queries, so a few serve many workers.
+CRAWLER_DB_CONNECTIONS = 5
+CRAWLER_DB_POOL_TIMEOUT = 60
+# Upper limit of crawl --workers (concurrent mturk requests), the scheduler
+# lowers actual concurrency when mturk starts throttling.
+CRAWLER_MAX_WORKERS = 50
+# crawl --daemon starts a crawl every CRAWLER_DAEMON_INTERVAL seconds and
+# reloads requester profiles and content id cache every CRAWLER_DAEMON_REFRESH
+# seconds. Its state is written as JSON to CRAWLER_DAEMON_STATUS_FILE
+# (None - mturk_crawler.status in RUN_DATA_PATH).
+CRAWLER_DAEMON_INTERVAL = 360
+CRAWLER_DAEMON_REFRESH = 3600
+CRAWLER_DAEMON_STATUS_FILE = None
+# Hitgroup status rows are written in bulk after that many were buffered.
+CRAWLER_WRITER_FLUSH_SIZE = 100
+# Listing pages parser engine, either 'scanner' (single forward pass over every
+# row) or 'regex' (the original single regular expression).
+CRAWLER_LISTING_PARSER = 'scanner'
+# New groups reuse html of an identical group of the same requester (same
+# title, reward and description) instead of downloading it. Set to True to
+# always download details of new groups.
+CRAWLER_FORCE_DETAIL_FETCH = False
+# Crawler writes rows of hits_mv into hits_mv_staging table while crawling and
+# moves them to hits_mv at the crawl end, so db_refresh_mviews has nothing to
+# do for such crawls. Set to False to create hits_mv rows by db_refresh_mviews
+# only (joining main_hitgroupstatus and main_hitgroupcontent).
+CRAWLER_STAGE_HITS_MV = True
+# After every correct crawl, crawler writes changes of groups' hits_available
+# to run-length encoded hitgroupstatus_history table.
+CRAWLER_STATUS_HISTORY = True
+# Groups of every finished crawl are written to a binary snapshot file (see
+# mturk.main.snapshots) in CRAWLER_SNAPSHOTS_PATH (None - snapshots directory
+# in RUN_DATA_PATH). Snapshots older than CRAWLER_SNAPSHOTS_KEEP_DAYS days are
+# removed - None keeps all of them. A snapshot takes roughly 50 bytes per
+# group; removed ones can't be replayed and crawls compared with them fall
+# back to db_arrivals.
+CRAWLER_SNAPSHOTS_PATH = None
+CRAWLER_SNAPSHOTS_KEEP_DAYS = None
+# After every correct crawl with staged hits_mv rows, crawler compares its
+# snapshot with the one of the previous correct crawl and writes hits_mv
+# hits_posted and hits_consumed, so that db_arrivals can skip it.
+CRAWLER_ARRIVALS = True
 
 # Decides how many percent groups available must be successfully downloaded to
 # mark a crawl as successful and it's data to be used for further computation.
@@ -461,6 +529,26 @@ INCOMPLETE_CRAWL_THRESHOLD = 0.8
 # some account/connection issues or simply due higher group count.
 INCOMPLETE_CRAWL_WARNING_THRESHOLD = 0.9
 
+# Arrivals (hits_mv hits_posted and hits_consumed) are calculated by db_arrivals
+# with a single set-based statement ('set') or with the original, hits_temp
+# based stored procedures ('procedures'), both give the same results.
+ARRIVALS_ENGINE = 'set'
+
+# hits_mv is partitioned by month of start_time. db_hits_mv_partitions creates
+# partitions for the given number of months ahead and drops ones older than
+# HITS_MV_RETENTION_MONTHS months (None keeps all the data).
+HITS_MV_PARTITIONS_AHEAD = 2
+HITS_MV_RETENTION_MONTHS = None
+
+# Hitgroups html is stored compressed in main_htmlblob table (see
+# mturk.main.htmlblobs). Number of decompressed blobs kept in memory and zlib
+# compression level (1-9).
+HTML_BLOB_CACHE_SIZE = 100
+HTML_BLOB_COMPRESSION_LEVEL = 6
+
+# Number of rows fetched at once by utils.sql query helpers.
+SQL_ITERSIZE = 2000
+
 # Temporarily this file is stored in the $HOME directory. In the final
 # implementation a classification algorithm will be changed, hence this file
 # probably will not be used.
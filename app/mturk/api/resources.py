@@ -8,9 +8,12 @@ class HitGroupContentResource(resources.ModelResource):
 
     has_hashed_group_id = fields.BooleanField(attribute='group_id_hashed')
     date_posted = fields.DateTimeField(attribute='occurrence_date')
+    hits_available = fields.IntegerField(attribute='hits_available')
+    last_updated = fields.DateTimeField(attribute='last_updated', null=True)
 
     class Meta:
-        queryset = HitGroupContent.objects.filter(is_public=True)
+        queryset = HitGroupContent.objects.filter(
+            is_public=True).select_related('state')
         allowed_methods = ['get', ]
         excludes = [
             'first_crawl', 'is_public', 'is_spam',
@@ -24,6 +24,11 @@ class Command(CrawlUpdaterCommand):
             action="store_true",
             help='If true, related hits_posted and hits_consumed will be set '
             'to 0 before proceeding.'),
+        make_option("--engine", dest="engine",
+            default=settings.ARRIVALS_ENGINE, choices=('set', 'procedures'),
+            help='Use single set-based statement (set) or hits_temp based '
+            'stored procedures (procedures) to calculate hits_mv hits_posted '
+            'and hits_consumed.'),
     )
 
     min_crawls = 2
@@ -38,6 +43,17 @@ class Command(CrawlUpdaterCommand):
         'db_initial_post_hits_update',
         'db_reward_population'
     )
+    # the same, with the first two replaced by the set-based one
+    SET_COMMANDS = (
+        'db_hits_arrivals',
+        'db_initial_post_hits_update',
+        'db_reward_population'
+    )
+    # hits_mv arrivals of crawls with has_diffs were written by the crawler,
+    # only crawl aggregates are left
+    DIFFED_COMMANDS = (
+        'db_reward_population',
+    )
 
     def prepare_data(self):
         self.options['clear-existing'] and self.clear_past_results()
@@ -47,8 +63,22 @@ class Command(CrawlUpdaterCommand):
         return crawls.filter(groups_downloaded__gt=F('groups_available') *
             settings.INCOMPLETE_CRAWL_THRESHOLD)
 
+    def is_diffed(self, chunk):
+        """Check if arrivals of the whole ``chunk`` were written by the
+        crawler. Crawl with has_diffs has its hits posted and the previous
+        crawl's hits consumed set, chunk's oldest crawl is only compared
+        with."""
+        return (not self.options['clear-existing'] and
+            all(crawl.has_diffs for crawl in chunk[:-1]))
+
     def process_chunk(self, start, end, chunk):
-        for c in self.COMMANDS:
+        if self.is_diffed(chunk):
+            commands = self.DIFFED_COMMANDS
+        elif self.options['engine'] == 'set':
+            commands = self.SET_COMMANDS
+        else:
+            commands = self.COMMANDS
+        for c in commands:
             self.log.info('Calling {0}, {1}.'.format(c, self.short_date()))
             ctime = time.time()
             call_command(c, start=start, end=end, pidfile='arrivals',
@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+
+from utils.management.commands.base.db_procedure_command import DBProcedureCommand
+import logging
+from django.conf import settings
+
+
+class Command(DBProcedureCommand):
+    help = ('Updates hits_mv hits_posted and hits_consumed with a single '
+        'set-based statement (replaces db_hits_temp_population and '
+        'db_hits_update).')
+    proc_name = 'hits_arrivals'
+    logger = logging.getLogger('mturk.arrivals.db_hits_arrivals')
+
+    def get_proc_args(self):
+        """Adds an extra argument this procedures requires."""
+        return [self.start, self.end, settings.INCOMPLETE_CRAWL_THRESHOLD]
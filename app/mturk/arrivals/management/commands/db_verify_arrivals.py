@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+
+import time
+import logging
+from collections import OrderedDict
+from optparse import make_option
+
+from django.db import connection, transaction
+from django.conf import settings
+
+from utils.pid import Pid
+from utils.management.commands.base.time_args_command import TimeArgsCommand
+
+log = logging.getLogger('mturk.arrivals')
+
+
+HITS_MV_RESULTS = """
+    SELECT group_id, crawl_id, hits_posted, hits_consumed
+    FROM hits_mv
+    WHERE crawl_id IN (
+        SELECT id FROM main_crawl WHERE start_time BETWEEN %s AND %s)
+    ORDER BY crawl_id, group_id, status_id
+"""
+
+CRAWLAGREGATES_RESULTS = """
+    SELECT crawl_id, hits_posted, hits_consumed, rewards_posted,
+        rewards_consumed
+    FROM main_crawlagregates
+    WHERE crawl_id IN (
+        SELECT id FROM main_crawl WHERE start_time BETWEEN %s AND %s)
+    ORDER BY crawl_id, id
+"""
+
+"""Set-based procedures and the original ones they replace.
+
+{name: (original procedures, set-based procedures, query selecting results)}.
+Procedures are called in the given order with the interval start and end.
+
+"""
+COMPARISONS = OrderedDict([
+    ('hits_arrivals', (
+        ('hits_temp_population', 'hits_update'),
+        ('hits_arrivals', ),
+        HITS_MV_RESULTS)),
+    ('initial_post_hits_update', (
+        ('initial_post_hits_update_loop', ),
+        ('initial_post_hits_update', ),
+        HITS_MV_RESULTS)),
+    ('reward_population', (
+        ('reward_population_loop', ),
+        ('reward_population', ),
+        CRAWLAGREGATES_RESULTS)),
+])
+
+"""Procedures taking INCOMPLETE_CRAWL_THRESHOLD as the third argument."""
+THRESHOLD_PROCEDURES = ('hits_temp_population', 'hits_arrivals')
+
+
+class Command(TimeArgsCommand):
+    """Runs set-based arrivals procedures and the original ones they replace
+    on the same crawls and reports any differences of their results.
+
+    Everything is done in a single transaction which is rolled back at the
+    end, so no data is modified. For example, to check the last day:
+
+        db_verify_arrivals --days=1 --procedure=reward_population
+
+    """
+
+    help = ('Compares results of set-based arrivals procedures with the '
+        'original ones.')
+
+    option_list = TimeArgsCommand.option_list + (
+        make_option('--procedure', dest='procedures', action='append',
+            default=[], choices=COMPARISONS.keys(),
+            help='Set-based procedure to verify, can be given many times. '
+                'By default all are verified.'),
+        make_option('--show', dest='show', type='int', default=10,
+            help='Number of differing rows to display.'),
+    )
+
+    def handle(self, **options):
+
+        pid = Pid('arrivals_verify', True)
+        self.process_options(options)
+
+        curr = connection.cursor()
+        try:
+            for name in self.options['procedures'] or COMPARISONS.keys():
+                old_time, new_time, rows, differences = compare_procedures(
+                    curr, name, self.start, self.end)
+                log.info('{0}: {1} rows, original {2:.3f}s, set-based '
+                    '{3:.3f}s, {4} differences.'.format(name, rows, old_time,
+                        new_time, len(differences)))
+                for expected, result in differences[:self.options['show']]:
+                    log.warning('{0}: expected {1}, got {2}.'.format(
+                        name, expected, result))
+        finally:
+            transaction.rollback_unless_managed()
+            pid.remove_pid()
+
+
+def call_procedures(curr, procedures, start, end):
+    for name in procedures:
+        args = [start, end]
+        if name in THRESHOLD_PROCEDURES:
+            args.append(settings.INCOMPLETE_CRAWL_THRESHOLD)
+        curr.callproc(name, args)
+
+
+def same_row(expected, result):
+    """Compares result rows, allowing for float rounding errors of sums
+    calculated in a different order."""
+    if len(expected) != len(result):
+        return False
+    for a, b in zip(expected, result):
+        if isinstance(a, float) and isinstance(b, float):
+            if abs(a - b) > 1e-6 * max(1.0, abs(a)):
+                return False
+        elif a != b:
+            return False
+    return True
+
+
+def compare_procedures(curr, name, start, end):
+    """Calls original and set-based procedures of comparison ``name`` on the
+    same data and returns tuple (original time, set-based time, number of
+    rows, list of differing (expected, result) rows).
+
+    Changes made by both are reverted using a savepoint, the transaction is
+    neither commited nor rolled back.
+
+    """
+    original, set_based, query = COMPARISONS[name]
+
+    def run(procedures):
+        curr.execute('SAVEPOINT verify_arrivals')
+        start_time = time.time()
+        call_procedures(curr, procedures, start, end)
+        elapsed = time.time() - start_time
+        curr.execute(query, (start, end))
+        rows = curr.fetchall()
+        curr.execute('ROLLBACK TO SAVEPOINT verify_arrivals')
+        return elapsed, rows
+
+    old_time, expected = run(original)
+    new_time, results = run(set_based)
+
+    differences = [(a, b) for a, b in map(None, expected, results)
+        if a is None or b is None or not same_row(a, b)]
+    return old_time, new_time, len(expected), differences
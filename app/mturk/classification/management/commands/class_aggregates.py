@@ -105,7 +105,7 @@ class CalculateClassAggregates(BaseCommand):
                     sum(hits_available) as hits_available
                 FROM hits_mv
                 JOIN main_hitgroupclass
-                ON hits_mv.group_id = main_hitgroupclass.group_id
+                ON hits_mv.content_id = main_hitgroupclass.content_id
                 WHERE
                     start_time >= '{}' AND
                     start_time < '{}'
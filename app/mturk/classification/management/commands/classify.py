@@ -2,6 +2,7 @@ import json
 import logging
 import resource
 
+from itertools import islice
 from optparse import make_option
 from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
@@ -44,6 +45,7 @@ class ClassifyCommand(BaseCommand):
                 doc = result['document']
                 prob = result['probabilities']
                 yield HitGroupClass(group_id=doc['group_id'],
+                                    content_id=doc['id'],
                                     classes=NaiveBayesClassifier.most_likely(result),
                                     probabilities=json.dumps(prob))
         if options['clear_all']:
@@ -53,28 +55,28 @@ class ClassifyCommand(BaseCommand):
             return
         if options['begin'] and options['end']:
             # XXX it can be slow.
-            query = ''' SELECT group_id, title, description, keywords
+            query = ''' SELECT content.id, content.group_id, title,
+                               description, keywords
                         FROM main_hitgroupcontent as content
                         JOIN hits_mv 
-                        ON content.group_id = hits_mv.group_id
+                        ON content.id = hits_mv.content_id
                         WHERE 
                             NOT EXISTS(
                                 SELECT * FROM main_hitgroupclass as class
-                                WHERE content.group_id = class.group_id
+                                WHERE content.id = class.content_id
                             ) AND 
                             hits_mv.start_time >= {} AND 
                             hits_mv.start_time < {} 
-                        GROUP BY group_id
-                        LIMIT {};
-                    '''.format(options['begin'], options['end'], self.BATCH_SIZE)
+                        GROUP BY content.id;
+                    '''.format(options['begin'], options['end'])
         else:
-            query = ''' SELECT group_id, title, description, keywords
+            query = ''' SELECT id, group_id, title, description, keywords
                         FROM main_hitgroupcontent as content
                         WHERE NOT EXISTS(
                             SELECT * FROM main_hitgroupclass as class
-                            WHERE content.group_id = class.group_id
-                        ) LIMIT {};
-                    '''.format(self.BATCH_SIZE)
+                            WHERE content.id = class.content_id
+                        );
+                    '''
         if not options['classifier_path']:
             try:
                 options['classifier_path'] = settings.CLASSIFIER_PATH
@@ -87,8 +89,12 @@ class ClassifyCommand(BaseCommand):
             classifier = NaiveBayesClassifier(probabilities=probabilities)
             logger.info('Classification of hit groups started. Processing in '\
                         'batches size of {}'.format(self.BATCH_SIZE))
+            # a single server-side cursor instead of querying for the next
+            # batch of unclassified groups every time
+            documents = query_to_dicts(query, server_side=True,
+                                       itersize=self.BATCH_SIZE)
             while True:
-                models = query_to_dicts(query)
+                models = islice(documents, self.BATCH_SIZE)
                 logger.info('Batch classification started')
                 try:
                     results = _to_hit_group_class(classifier.classify_batch(models))
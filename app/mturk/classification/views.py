@@ -116,8 +116,8 @@ def report(request, classes):
     """ SELECT hmv.crawl_id, hmv.start_time, hgcls.classes, 
                hgcnt.group_id, hgcnt.title, hgcnt.description
         FROM hits_mv AS hmv
-        JOIN main_hitgroupclass AS hgcls ON hmv.group_id = hgcls.group_id
-        JOIN main_hitgroupcontent AS hgcnt ON hgcls.group_id = hgcnt.group_id
+        JOIN main_hitgroupclass AS hgcls ON hmv.content_id = hgcls.content_id
+        JOIN main_hitgroupcontent AS hgcnt ON hgcls.content_id = hgcnt.id
         WHERE hmv.start_time >= '{}' AND hmv.start_time < '{}' AND 
               hgcls.classes & {} <> 0
         ORDER BY start_time ASC
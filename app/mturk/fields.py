@@ -1,4 +1,5 @@
 import datetime
+import psycopg2
 from django.db import models
 from django.db.models import signals
 from django.conf import settings
@@ -52,4 +53,24 @@ class JSONField(models.TextField):
             setattr(instance, self.attname, None)
 
 
+class BlobField(models.Field):
+    """Binary data kept in a bytea column, available as str."""
+
+    __metaclass__ = models.SubfieldBase
+
+    def db_type(self, connection):
+        return 'bytea'
+
+    def to_python(self, value):
+        if isinstance(value, buffer):
+            return str(value)
+        return value
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if value is None:
+            return None
+        return psycopg2.Binary(value)
+
+
 add_introspection_rules([], ["^mturk\.fields\.JSONField"])
+add_introspection_rules([], ["^mturk\.fields\.BlobField"])
@@ -30,7 +30,7 @@ class Command(BaseCommand):
                FROM main_crawl
               WHERE main_crawl.id = p.crawl_id) AS start_time, q.requester_id, p.hits_available, p.page_number, p.inpage_position, p.hit_expiration_date, q.reward, q.time_alloted
        FROM main_hitgroupstatus p
-       JOIN main_hitgroupcontent q ON q.group_id::text = p.group_id::text AND p.hit_group_content_id = q.id
+       JOIN main_hitgroupcontent q ON p.hit_group_content_id = q.id
       WHERE p.crawl_id = %s
                 """ % row['id'])
 
@@ -17,7 +17,8 @@ from pythonsolr import  pysolr
 
 from utils.sql import query_to_tuples
 from mturk.main.templatetags.graph import text_row_formater
-from models import RequesterProfile, HitGroupContent, IndexQueue
+from mturk.main.monitoring import CRAWL_METRICS_COLUMNS, crawl_metrics_value
+from models import RequesterProfile, HitGroupContent, IndexQueue, CrawlMetrics
 from html import strip_tags
 
 
@@ -112,6 +113,28 @@ def top_requesters(request):
     return direct_to_template(request, 'main/graphs/table.html', ctx)
 
 
+@login_required
+@no_cache
+def crawl_metrics(request):
+    """Timing and throughput of crawls from the last week."""
+    date_from = datetime.datetime.now() - datetime.timedelta(days=7)
+    metrics = CrawlMetrics.objects.select_related('crawl').filter(
+        crawl__start_time__gt=date_from).order_by('-crawl__start_time')
+    data = ([crawl_metrics_value(m, attr)
+            for header, attr, fmt in CRAWL_METRICS_COLUMNS]
+        for m in metrics)
+
+    columns = [('number', header)
+        for header, attr, fmt in CRAWL_METRICS_COLUMNS]
+    columns[1] = ('datetime', 'start time')
+    ctx = {
+        'data': data,
+        'columns': tuple(columns),
+        'title': 'Crawl metrics (last 7 days)',
+    }
+    return direct_to_template(request, 'main/graphs/table.html', ctx)
+
+
 @login_required
 @no_cache
 def toggle_requester_status(request, id):
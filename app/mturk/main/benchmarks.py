@@ -0,0 +1,698 @@
+# -*- coding: utf-8 -*-
+"""Performance benchmarks of the crawler and data processing code paths.
+
+Every benchmark is a function registered with ``@benchmark(name)``. It
+receives command options and returns a list of ``(variant, seconds, items)``
+tuples, that are displayed by the ``benchmark`` management command.
+
+Benchmarks using the database work on synthetic data created inside a single
+transaction that is rolled back at the end, so they can be safely run against
+any database.
+"""
+
+import time
+import datetime
+import logging
+from collections import OrderedDict
+
+from django.db import connection, transaction
+from django.conf import settings
+
+
+log = logging.getLogger(__name__)
+
+BENCHMARKS = OrderedDict()
+
+# start time of generated crawl histories, far before any real crawl
+BENCH_EPOCH = datetime.datetime(1990, 1, 1)
+# interval between generated crawls, the same as in the cron schedule
+BENCH_CRAWL_INTERVAL = datetime.timedelta(minutes=6)
+
+
+def benchmark(name):
+    """Register decorated function as benchmark available under ``name``."""
+    def decorator(func):
+        BENCHMARKS[name] = func
+        return func
+    return decorator
+
+
+def timed(func, *args, **kwargs):
+    """Call ``func`` and return tuple (elapsed seconds, result)."""
+    start_time = time.time()
+    result = func(*args, **kwargs)
+    return time.time() - start_time, result
+
+
+def rolled_back(func):
+    """Run decorated benchmark and roll back everything it has written."""
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            transaction.rollback_unless_managed()
+    wrapper.__name__ = func.__name__
+    wrapper.__doc__ = func.__doc__
+    return wrapper
+
+
+def create_bench_crawl(curr, groups=0, start_time=None):
+    """Insert synthetic crawl and return its id."""
+    start_time = start_time or datetime.datetime.now()
+    curr.execute('''
+        INSERT INTO main_crawl (
+            start_time, end_time, success, hits_available, hits_downloaded,
+            groups_available, groups_downloaded, has_diffs, is_spam_computed,
+            has_hits_mv
+        )
+        VALUES (%s, %s, true, 0, 0, %s, %s, false, false, false)
+        RETURNING id
+    ''', (start_time, start_time, groups, groups))
+    return curr.fetchone()[0]
+
+
+def create_bench_contents(curr, size, prefix='BENCH'):
+    """Insert ``size`` synthetic hitgroup contents and return list of
+    (id, group_id) tuples."""
+    curr.execute('''
+        INSERT INTO main_hitgroupcontent (
+            group_id, group_id_hashed, requester_id, requester_name, reward,
+            html, description, title, keywords, qualifications,
+            occurrence_date, time_alloted, is_public
+        )
+        SELECT
+            %s || i, false, 'BENCHREQ' || (i %% 100), 'benchmark', 0.01 * (i %% 50),
+            '', 'benchmark description', 'benchmark ' || i, '', '',
+            now(), 60, true
+        FROM generate_series(1, %s) i
+        RETURNING id, group_id
+    ''', (prefix, size))
+    return curr.fetchall()
+
+
+def bench_status_rows(crawl_id, contents):
+    """Return status data dicts like those built by tasks.process_group."""
+    now = datetime.datetime.now()
+    for n, (content_id, group_id) in enumerate(contents):
+        yield {
+            'crawl_id': crawl_id,
+            'group_id': group_id,
+            'hit_group_content_id': content_id,
+            'requester_id': 'BENCHREQ',
+            'hits_available': n % 300 + 1,
+            'reward': n % 100 / 100.0,
+            'page_number': n / 10 + 1,
+            'inpage_position': n % 10 + 1,
+            'hit_expiration_date': now,
+            'now': now,
+        }
+
+
+def create_bench_history(curr, crawls, size, start_time=BENCH_EPOCH,
+        change_every=1):
+    """Insert ``crawls`` synthetic crawls of ``size`` groups with their
+    main_hitgroupstatus and hits_mv rows and return list of crawl ids.
+
+    Every group is missing in every 7th crawl, and its hits_available goes
+    both up and down every ``change_every`` crawls (except for every 5th
+    group, which never changes).
+    """
+    contents = create_bench_contents(curr, size)
+    content_ids = [content_id for content_id, group_id in contents]
+    crawl_ids = []
+    for k in xrange(crawls):
+        crawl_id = create_bench_crawl(curr, size,
+            start_time + k * BENCH_CRAWL_INTERVAL)
+        curr.execute('''
+            INSERT INTO main_hitgroupstatus (
+                crawl_id, group_id, hit_group_content_id, hits_available,
+                page_number, inpage_position, hit_expiration_date
+            )
+            SELECT
+                %s, c.group_id, c.id, (c.n * 13 + %s * (c.n %% 5) * 37) %% 200,
+                c.n / 10 + 1, c.n %% 10 + 1, now()
+            FROM (
+                SELECT id, group_id, row_number() OVER (ORDER BY id) AS n
+                FROM main_hitgroupcontent
+                WHERE id = ANY(%s)
+            ) c
+            WHERE (c.n + %s) %% 7 <> 0
+        ''', (crawl_id, k / change_every, content_ids, k))
+        crawl_ids.append(crawl_id)
+
+    curr.execute('''
+        INSERT INTO hits_mv (
+            status_id, content_id, group_id, crawl_id, start_time,
+            requester_id, hits_available, page_number, inpage_position,
+            hit_expiration_date, reward, time_alloted, hits_diff, is_spam
+        )
+        SELECT
+            p.id, q.id, p.group_id, p.crawl_id, c.start_time, q.requester_id,
+            p.hits_available, p.page_number, p.inpage_position,
+            p.hit_expiration_date, q.reward, q.time_alloted, null, q.is_spam
+        FROM main_hitgroupstatus p
+        JOIN main_hitgroupcontent q ON p.hit_group_content_id = q.id
+        JOIN main_crawl c ON c.id = p.crawl_id
+        WHERE p.crawl_id = ANY(%s)
+    ''', (crawl_ids, ))
+    return crawl_ids
+
+
+def bench_history_interval(crawl_ids):
+    """Return (start, end) interval containing crawls created by
+    create_bench_history."""
+    return BENCH_EPOCH, BENCH_EPOCH + len(crawl_ids) * BENCH_CRAWL_INTERVAL
+
+
+def set_bench_first_crawls(curr, crawl_ids):
+    """Set first_crawl_id of contents of crawls created by
+    create_bench_history."""
+    curr.execute('''
+        UPDATE main_hitgroupcontent
+        SET first_crawl_id = first.crawl_id
+        FROM (
+            SELECT hit_group_content_id, min(crawl_id) AS crawl_id
+            FROM main_hitgroupstatus
+            WHERE crawl_id = ANY(%s)
+            GROUP BY hit_group_content_id
+        ) first
+        WHERE main_hitgroupcontent.id = first.hit_group_content_id
+    ''', (crawl_ids, ))
+
+
+@benchmark('crawl_writer')
+@rolled_back
+def crawl_writer(size=5000, **options):
+    """Per-row hitgroup status writes versus bulk CrawlWriter writes.
+
+    The per-row path commits after every group; here every "commit" is a
+    savepoint release, so both variants can be rolled back.
+    """
+    from mturk.main.management.commands.crawler.db import DB
+    from mturk.main.management.commands.crawler.writer import CrawlWriter
+
+    curr = connection.cursor()
+    contents = create_bench_contents(curr, size)
+    crawl_id = create_bench_crawl(curr, size)
+    rows = list(bench_status_rows(crawl_id, contents))
+
+    db = DB(connection.connection)
+
+    def per_row():
+        for data in rows:
+            db.insert_hit_group_status(data)
+            db.curr.execute('SAVEPOINT crawl_writer_bench')
+            db.curr.execute('RELEASE SAVEPOINT crawl_writer_bench')
+
+    writer = CrawlWriter(None, set())
+    for data in rows:
+        writer.add(data)
+
+    per_row_time, _ = timed(per_row)
+    bulk_time, _ = timed(writer.write, db.curr,
+        [row for row, group in writer.rows.values()])
+    return [
+        ('per-row', per_row_time, size),
+        ('bulk', bulk_time, size),
+    ]
+
+
+@benchmark('http_pool')
+def http_pool(size=200, **options):
+    """Page downloads from local HTTPS stub: urlopen versus keep-alive pool.
+
+    Every urlopen call pays for a new TCP connection and TLS handshake, the
+    pool does it once per host.
+    """
+    import ssl
+    import urllib2
+    from mturk.main.management.commands.crawler.httppool import (
+        HTTPConnectionPool)
+    from mturk.main.management.commands.crawler.tests.test_httppool import (
+        start_stub_server)
+
+    server = start_stub_server(https=True)
+    url = 'https://127.0.0.1:{0}/page'.format(server.server_port)
+    context = ssl._create_unverified_context()
+    pool = HTTPConnectionPool(ssl_context=context)
+
+    def with_urlopen():
+        for i in xrange(size):
+            urllib2.urlopen(url, context=context).read()
+
+    def with_pool():
+        for i in xrange(size):
+            pool.get(url)
+
+    try:
+        urlopen_time, _ = timed(with_urlopen)
+        pool_time, _ = timed(with_pool)
+    finally:
+        pool.close()
+        server.shutdown()
+        server.server_close()
+    log.info('Keep-alive pool stats: {0}'.format(pool.stats()))
+    return [
+        ('urlopen', urlopen_time, size),
+        ('keep-alive pool', pool_time, size),
+    ]
+
+
+@benchmark('listing_parser')
+def listing_parser(size=20, **options):
+    """Parse time of listing page fixtures with every parser engine.
+
+    Every fixture page is parsed ``size`` times.
+    """
+    import os
+    from mturk.main.management.commands.crawler import parser
+    from mturk.main.management.commands.crawler.tests import test_parser
+
+    pages = []
+    for fname in sorted(os.listdir(test_parser.TESTS_DIR)):
+        if fname.startswith('hitslist') and fname.endswith('.html'):
+            with open(os.path.join(test_parser.TESTS_DIR, fname)) as f:
+                pages.append(f.read())
+
+    def parse(engine):
+        rows = 0
+        for i in xrange(size):
+            for html in pages:
+                rows += len(list(parser.hits_group_listinfo(html, engine)))
+        return rows
+
+    results = []
+    for engine in sorted(parser.LISTING_PARSERS):
+        elapsed, rows = timed(parse, engine)
+        results.append((engine, elapsed, rows))
+    return results
+
+
+@benchmark('arrivals')
+@rolled_back
+def arrivals(size=2000, **options):
+    """Original arrivals procedures versus their set-based replacements.
+
+    Works on 10 crawls of ``size`` groups. Every pair must give the same
+    results (see db_verify_arrivals), any difference is logged as an error.
+    """
+    from mturk.arrivals.management.commands.db_verify_arrivals import (
+        COMPARISONS, compare_procedures)
+    from mturk.main.management.commands.db_update_agregates import (
+        insert_crawl_agregates_batch)
+
+    curr = connection.cursor()
+    crawl_ids = create_bench_history(curr, 10, size)
+    start, end = bench_history_interval(crawl_ids)
+    insert_crawl_agregates_batch(crawl_ids)
+    set_bench_first_crawls(curr, crawl_ids)
+
+    results = []
+    for name in COMPARISONS:
+        old_time, new_time, rows, differences = compare_procedures(curr, name,
+            start, end)
+        if differences:
+            log.error('{0} results differ from the original ones in {1} of '
+                '{2} rows.'.format(name, len(differences), rows))
+        results.append((name + ' original', old_time, rows))
+        results.append((name + ' set-based', new_time, rows))
+    return results
+
+
+@benchmark('crawl_agregates')
+@rolled_back
+def crawl_agregates(size=1000, crawls=50, **options):
+    """Per-crawl main_crawlagregates inserts versus a single batch statement.
+
+    Works on ``crawls`` crawls of ``size`` groups and two crawls with too few
+    groups, which both must skip. Both must give the same aggregates, any
+    difference is logged as an error.
+    """
+    from mturk.main.management.commands.db_update_agregates import (
+        MIN_CRAWL_PROJECTS, insert_crawl_agregates,
+        insert_crawl_agregates_batch)
+
+    curr = connection.cursor()
+    crawl_ids = create_bench_history(curr, crawls, size)
+    crawl_ids += create_bench_history(curr, 2, MIN_CRAWL_PROJECTS - 1,
+        start_time=BENCH_EPOCH + crawls * BENCH_CRAWL_INTERVAL)
+
+    def get_results():
+        curr.execute('''
+            SELECT crawl_id, start_time, hits, reward, projects, spam_projects
+            FROM main_crawlagregates
+            WHERE crawl_id = ANY(%s)
+            ORDER BY crawl_id
+        ''', (crawl_ids, ))
+        return curr.fetchall()
+
+    def per_crawl():
+        for crawl_id in crawl_ids:
+            insert_crawl_agregates(crawl_id)
+
+    per_crawl_time, _ = timed(per_crawl)
+    expected = get_results()
+    curr.execute('DELETE FROM main_crawlagregates WHERE crawl_id = ANY(%s)',
+        (crawl_ids, ))
+    batch_time, inserted = timed(insert_crawl_agregates_batch, crawl_ids)
+    results = get_results()
+
+    if results != expected:
+        log.error('Batch aggregates differ from per-crawl ones: {0} rows '
+            'expected, {1} inserted.'.format(len(expected), len(results)))
+    elif len(results) != crawls:
+        log.error('{0} aggregates inserted, crawls with less than {1} '
+            'projects were not skipped.'.format(len(results),
+                MIN_CRAWL_PROJECTS))
+    else:
+        log.info('Batch aggregates match in all {0} crawls.'.format(
+            len(expected)))
+    return [
+        ('per-crawl', per_crawl_time, len(expected)),
+        ('batch', batch_time, inserted),
+    ]
+
+
+@benchmark('status_history')
+@rolled_back
+def status_history(size=2000, crawls=50, change_every=10, **options):
+    """Per-crawl hits_mv rows versus run-length encoded status history.
+
+    Works on ``crawls`` crawls of ``size`` groups whose hits_available changes
+    every ``change_every`` crawls. Logs the storage taken by both and runs
+    queries like those of hit_group_details, top requesters, crawl aggregates
+    and arrivals on hits_mv (with arrivals calculated by hits_arrivals and
+    initial_post_hits_update procedures) and on hitgroupstatus_history_v; any
+    difference of their results is logged as an error.
+    """
+    curr = connection.cursor()
+    crawl_ids = create_bench_history(curr, crawls, size,
+        change_every=change_every)
+    start, end = bench_history_interval(crawl_ids)
+    set_bench_first_crawls(curr, crawl_ids)
+    curr.execute('SELECT hits_arrivals(%s, %s, %s)', (start, end,
+        settings.INCOMPLETE_CRAWL_THRESHOLD))
+    curr.execute('SELECT initial_post_hits_update(%s, %s)', (start, end))
+    curr.execute('''
+        SELECT DISTINCT group_id FROM hits_mv
+        WHERE crawl_id = ANY(%s) ORDER BY group_id LIMIT 20
+    ''', (crawl_ids, ))
+    group_ids = [group_id for (group_id, ) in curr.fetchall()]
+
+    def update_history():
+        # the same as update_status_history, which would commit
+        for crawl_id in crawl_ids:
+            curr.execute('SELECT hitgroupstatus_history_update(%s)',
+                (crawl_id, ))
+
+    update_time, _ = timed(update_history)
+
+    curr.execute('''
+        SELECT count(*), sum(pg_column_size(h.*)) FROM hits_mv h
+        WHERE crawl_id = ANY(%s)
+    ''', (crawl_ids, ))
+    mv_rows, mv_bytes = curr.fetchone()
+    curr.execute('''
+        SELECT count(*), sum(pg_column_size(h.*))
+        FROM hitgroupstatus_history h
+        WHERE valid_from_crawl_id >= %s
+    ''', (min(crawl_ids), ))
+    history_rows, history_bytes = curr.fetchone()
+    log.info('hits_mv: {0} rows, {1} bytes; hitgroupstatus_history: {2} '
+        'rows, {3} bytes ({4:.1f}x less).'.format(mv_rows, mv_bytes,
+            history_rows, history_bytes,
+            float(mv_bytes) / history_bytes if history_bytes else 0))
+
+    def group_history(table):
+        rows = []
+        for group_id in group_ids:
+            curr.execute('''
+                SELECT group_id, start_time, hits_available FROM {0}
+                WHERE group_id = %s AND crawl_id = ANY(%s)
+                ORDER BY start_time
+            '''.format(table), (group_id, crawl_ids))
+            rows.extend(curr.fetchall())
+        return rows
+
+    def crawl_totals(table):
+        curr.execute('''
+            SELECT crawl_id, count(*), sum(hits_available) FROM {0}
+            WHERE crawl_id = ANY(%s)
+            GROUP BY crawl_id ORDER BY crawl_id
+        '''.format(table), (crawl_ids, ))
+        return curr.fetchall()
+
+    def top_requesters(table):
+        curr.execute('''
+            SELECT q.requester_id, sum(h.hits_available)
+            FROM {0} h JOIN main_hitgroupcontent q ON q.id = h.content_id
+            WHERE h.crawl_id = ANY(%s)
+            GROUP BY q.requester_id ORDER BY q.requester_id
+        '''.format(table), (crawl_ids, ))
+        return curr.fetchall()
+
+    def crawl_arrivals(table):
+        # hits_mv has 0 hits_posted where nothing changed, the view NULL
+        curr.execute('''
+            SELECT
+                crawl_id, sum(coalesce(hits_posted, 0)),
+                sum(coalesce(hits_consumed, 0))
+            FROM {0}
+            WHERE crawl_id = ANY(%s)
+            GROUP BY crawl_id ORDER BY crawl_id
+        '''.format(table), (crawl_ids, ))
+        return curr.fetchall()
+
+    results = [('history update', update_time, mv_rows)]
+    for query in (group_history, crawl_totals, top_requesters,
+            crawl_arrivals):
+        mv_time, expected = timed(query, 'hits_mv')
+        history_time, rows = timed(query, 'hitgroupstatus_history_v')
+        if rows != expected:
+            log.error('{0} results from hitgroupstatus_history_v differ from '
+                'hits_mv ones: {1} rows expected, {2} returned.'.format(
+                    query.__name__, len(expected), len(rows)))
+        results.append((query.__name__ + ' hits_mv', mv_time, len(expected)))
+        results.append((query.__name__ + ' history', history_time, len(rows)))
+    return results
+
+
+@benchmark('content_id_joins')
+@rolled_back
+def content_id_joins(size=2000, crawls=20, **options):
+    """hits_mv joins on text group_id versus integer content_id.
+
+    Works on ``crawls`` crawls of ``size`` classified groups. Logs the storage
+    taken by both keys and their indexes and runs queries like those of top
+    requesters, class_aggregates and hit_group_details with both join paths;
+    any difference of their results is logged as an error.
+    """
+    curr = connection.cursor()
+    crawl_ids = create_bench_history(curr, crawls, size)
+    curr.execute('''
+        INSERT INTO main_hitgroupclass (group_id, content_id, classes,
+            probabilities)
+        SELECT group_id, id, 1 << (id %% 4), '{}'
+        FROM main_hitgroupcontent
+        WHERE id IN (SELECT content_id FROM hits_mv WHERE crawl_id = ANY(%s))
+    ''', (crawl_ids, ))
+    curr.execute('ANALYZE hits_mv_1990_01')
+    curr.execute('''
+        SELECT DISTINCT group_id, content_id FROM hits_mv
+        WHERE crawl_id = ANY(%s) ORDER BY group_id LIMIT 20
+    ''', (crawl_ids, ))
+    groups = curr.fetchall()
+
+    curr.execute('''
+        SELECT count(*), sum(pg_column_size(group_id)),
+            sum(pg_column_size(content_id))
+        FROM hits_mv WHERE crawl_id = ANY(%s)
+    ''', (crawl_ids, ))
+    rows, group_id_bytes, content_id_bytes = curr.fetchone()
+    curr.execute('''
+        SELECT pg_relation_size('hits_mv_1990_01_group_id_start_time'),
+            pg_relation_size('hits_mv_1990_01_content_id_start_time')
+    ''')
+    group_id_index, content_id_index = curr.fetchone()
+    log.info('{0} hits_mv rows: group_id takes {1} bytes, content_id {2}; '
+        '(key, start_time) indexes take {3} and {4} bytes.'.format(rows,
+            group_id_bytes, content_id_bytes, group_id_index,
+            content_id_index))
+
+    def top_requesters(key):
+        content_key = 'group_id' if key == 'group_id' else 'id'
+        curr.execute('''
+            SELECT h.requester_id, count(DISTINCT mv.{0}),
+                sum(mv.hits_available), max(mv.start_time)
+            FROM main_hitgroupcontent h
+            JOIN hits_mv mv ON h.{1} = mv.{0}
+            WHERE mv.crawl_id = ANY(%s)
+            GROUP BY h.requester_id ORDER BY h.requester_id
+        '''.format(key, content_key), (crawl_ids, ))
+        return curr.fetchall()
+
+    def class_aggregates(key):
+        curr.execute('''
+            SELECT crawl_id, start_time, classes, sum(hits_available)
+            FROM hits_mv
+            JOIN main_hitgroupclass c ON hits_mv.{0} = c.{0}
+            WHERE crawl_id = ANY(%s)
+            GROUP BY crawl_id, start_time, classes
+            ORDER BY crawl_id, classes
+        '''.format(key), (crawl_ids, ))
+        return curr.fetchall()
+
+    def group_details(key):
+        rows = []
+        for group in groups:
+            curr.execute('''
+                SELECT start_time, hits_available FROM hits_mv
+                WHERE {0} = %s ORDER BY start_time
+            '''.format(key), (group[0 if key == 'group_id' else 1], ))
+            rows.extend(curr.fetchall())
+        return rows
+
+    results = []
+    for query in (top_requesters, class_aggregates, group_details):
+        text_time, expected = timed(query, 'group_id')
+        integer_time, rows = timed(query, 'content_id')
+        if rows != expected:
+            log.error('{0} results joined on content_id differ from group_id '
+                'ones: {1} rows expected, {2} returned.'.format(
+                    query.__name__, len(expected), len(rows)))
+        results.append((query.__name__ + ' group_id', text_time,
+            len(expected)))
+        results.append((query.__name__ + ' content_id', integer_time,
+            len(rows)))
+    return results
+
+
+def current_rss():
+    """Return resident memory of the process in bytes (Linux only)."""
+    import os
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+@benchmark('sql_cursors')
+@rolled_back
+def sql_cursors(size=2000000, **options):
+    """Reading ``size`` rows with utils.sql helpers: a client-side cursor
+    fetching row by row (as the helpers did before), a client-side cursor
+    fetching in batches and a server-side cursor.
+
+    Logs how much the resident memory grew while reading the rows. Python
+    rarely returns freed memory to the system, so the variants are run from
+    the one expected to take the least memory.
+    """
+    from utils.sql import query_to_tuples
+
+    curr = connection.cursor()
+    curr.execute('''
+        CREATE TEMPORARY TABLE bench_rows AS
+        SELECT i AS id, md5(i::text) AS value, now() AS created
+        FROM generate_series(1, %s) i
+    ''', (size, ))
+    query = 'SELECT id, value, created FROM bench_rows'
+
+    def read(rows):
+        base = peak = current_rss()
+        n = 0
+        for n, row in enumerate(rows, 1):
+            if n % 10000 == 0:
+                peak = max(peak, current_rss())
+        return n, max(peak, current_rss()) - base
+
+    def row_by_row():
+        cursor = connection.cursor()
+        cursor.execute(query)
+        return iter(cursor.fetchone, None)
+
+    results = []
+    for variant, rows in (
+            ('server-side', lambda: query_to_tuples(query, server_side=True)),
+            ('client-side fetchmany', lambda: query_to_tuples(query)),
+            ('client-side fetchone', row_by_row)):
+        elapsed, (n, memory) = timed(lambda: read(rows()))
+        log.info('{0}: {1} rows, memory grew by {2:.1f} MB.'.format(variant,
+            n, memory / 1048576.0))
+        results.append((variant, elapsed, n))
+    return results
+
+
+@benchmark('snapshots')
+def crawl_snapshots(size=20000, **options):
+    """Writing, reading and diffing binary crawl snapshots of ``size`` groups.
+
+    Reading the hits_available column of a snapshot is compared with loading
+    the same data from JSON. Every 10th group changes between the two
+    compared snapshots.
+    """
+    import os
+    import json
+    import random
+    import shutil
+    import tempfile
+    from mturk.main import snapshots
+
+    rand = random.Random(0)
+    chars = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
+    group_ids = [''.join(rand.choice(chars) for i in xrange(30))
+        for n in xrange(size)]
+    previous = dict((group_id, (n % 300 + 1, n % 100 / 100.0, n / 10 + 1,
+            n % 10 + 1)) for n, group_id in enumerate(group_ids))
+    current = dict(previous)
+    for group_id in group_ids[::10]:
+        hits, reward, page_number, inpage_position = current[group_id]
+        current[group_id] = (hits + rand.randint(-hits, 10), reward,
+            page_number, inpage_position)
+
+    path = tempfile.mkdtemp()
+    try:
+        previous_name = snapshots.snapshot_path(1, path)
+        current_name = snapshots.snapshot_path(2, path)
+        json_name = os.path.join(path, 'snapshot.json')
+        start_time = datetime.datetime.now()
+        write_time, _ = timed(snapshots.write_snapshot, previous_name, 1,
+            start_time, previous)
+        snapshots.write_snapshot(current_name, 2, start_time, current)
+        with open(json_name, 'w') as f:
+            json.dump(dict((group_id, hits[0])
+                for group_id, hits in previous.iteritems()), f)
+        log.info('Snapshot of {0} groups takes {1} bytes, JSON of '
+            'hits_available {2} bytes.'.format(size,
+                os.path.getsize(previous_name), os.path.getsize(json_name)))
+
+        def read_json():
+            with open(json_name) as f:
+                return len(json.load(f))
+
+        def read_snapshot():
+            with snapshots.Snapshot(previous_name) as snapshot:
+                return len(snapshot.as_dict())
+
+        def lookups():
+            with snapshots.Snapshot(previous_name) as snapshot:
+                for group_id in group_ids:
+                    snapshot.get(group_id)
+
+        def diff():
+            with snapshots.Snapshot(previous_name) as prev:
+                with snapshots.Snapshot(current_name) as curr:
+                    return snapshots.diff(prev, curr)
+
+        json_time, _ = timed(read_json)
+        read_time, _ = timed(read_snapshot)
+        lookup_time, _ = timed(lookups)
+        diff_time, (posted, consumed) = timed(diff)
+        log.info('Diff found {0} groups posted and {1} consumed.'.format(
+            len(posted), len(consumed)))
+    finally:
+        shutil.rmtree(path)
+    return [
+        ('write', write_time, size),
+        ('read json', json_time, size),
+        ('read snapshot', read_time, size),
+        ('single lookups', lookup_time, size),
+        ('diff', diff_time, size * 2),
+    ]
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""Content-addressed, compressed storage of hitgroups html.
+
+Html is kept in main_htmlblob table under the SHA1 hash of its utf-8 bytes,
+compressed with zlib, so identical html of many groups - eg. templates of the
+same requester - is stored once. main_hitgroupcontent rows refer to it by the
+html_hash column; rows not converted yet (see db_convert_html_blobs) keep html
+inline.
+
+Blobs are read lazily, through a small LRU cache.
+"""
+
+import zlib
+import hashlib
+import threading
+from collections import OrderedDict
+
+import psycopg2
+from django.conf import settings
+from django.db import connection
+
+
+def to_bytes(html):
+    if isinstance(html, unicode):
+        return html.encode('utf-8')
+    return html
+
+
+def html_hash(html):
+    """Return the key ``html`` is stored under."""
+    return hashlib.sha1(to_bytes(html)).hexdigest()
+
+
+def compress(html):
+    """Return tuple (hash, compressed data, uncompressed size) of ``html``."""
+    data = to_bytes(html)
+    return (hashlib.sha1(data).hexdigest(),
+        zlib.compress(data, settings.HTML_BLOB_COMPRESSION_LEVEL), len(data))
+
+
+def decompress(data):
+    """Return utf-8 bytes of html stored as ``data``."""
+    return zlib.decompress(str(data))
+
+
+def store(curr, html):
+    """Insert blob of ``html`` using cursor ``curr``, unless it's already
+    there, and return its hash. Does not commit.
+
+    Concurrent inserts of the same blob are protected by a savepoint, so the
+    surrounding transaction isn't aborted.
+    """
+    key, data, size = compress(html)
+    curr.execute('SAVEPOINT html_blob')
+    try:
+        curr.execute('''
+            INSERT INTO main_htmlblob (hash, data, size)
+            SELECT %s, %s, %s
+            WHERE NOT EXISTS (SELECT 1 FROM main_htmlblob WHERE hash = %s)
+        ''', (key, psycopg2.Binary(data), size, key))
+    except psycopg2.IntegrityError:
+        curr.execute('ROLLBACK TO SAVEPOINT html_blob')
+    else:
+        curr.execute('RELEASE SAVEPOINT html_blob')
+    return key
+
+
+class BlobCache(object):
+    """At most ``max_size`` most recently used decompressed blobs."""
+
+    def __init__(self, max_size=100):
+        self.max_size = max_size
+        self.blobs = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Return html stored under ``key`` as unicode, reading it from the
+        database on cache misses, or None if there's no such blob."""
+        with self.lock:
+            html = self.blobs.pop(key, None)
+            if html is not None:
+                self.blobs[key] = html
+                self.hits += 1
+                return html
+        self.misses += 1
+        curr = connection.cursor()
+        curr.execute('SELECT data FROM main_htmlblob WHERE hash = %s',
+            (key, ))
+        row = curr.fetchone()
+        if row is None:
+            return None
+        html = decompress(row[0]).decode('utf-8')
+        with self.lock:
+            self.blobs[key] = html
+            while len(self.blobs) > self.max_size:
+                self.blobs.popitem(last=False)
+        return html
+
+    def clear(self):
+        with self.lock:
+            self.blobs.clear()
+
+
+cache = BlobCache(settings.HTML_BLOB_CACHE_SIZE)
@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+"""Registry of indexes required by the queries of crawler, arrivals, mviews
+and reports, see db_ensure_indexes command.
+
+Indexes declared by models are created by syncdb and South migrations, this
+registry lists the ones the code relies on, including those created by hand
+or by sql files. An existing index satisfies a required one if it is on the
+same table, uses the same method and predicate and its columns start with the
+required ones (so (crawl_id, group_id) satisfies (crawl_id)).
+
+Indexes of tables split into partitions (like hits_mv) are required on every
+partition instead of the parent table. hits_mv_create_partition procedure
+should create all indexes listed here for hits_mv.
+"""
+
+import re
+from collections import namedtuple
+
+import psycopg2.extensions
+from django.db import connection, transaction
+
+
+class Index(namedtuple('Index', 'table columns name unique where method')):
+    """Required index. ``name`` is appended to the name of the table (or its
+    partition) when the index is created."""
+
+    def __new__(cls, table, columns, name=None, unique=False, where=None,
+            method='btree'):
+        return super(Index, cls).__new__(cls, table, tuple(columns),
+            name or '_'.join(columns), unique, where, method)
+
+    def index_name(self, table):
+        return '{0}_{1}'.format(table, self.name)[:63]
+
+
+ExistingIndex = namedtuple('ExistingIndex',
+    'table name columns unique where method valid primary')
+
+
+REQUIRED_INDEXES = [
+    # crawls are looked up by time by all aggregates and reports
+    Index('main_crawl', ['start_time']),
+    Index('main_crawl', ['has_hits_mv']),
+    Index('main_crawl', ['has_diffs']),
+
+    # every arrivals and mviews query filters status rows by crawl and group
+    Index('main_hitgroupstatus', ['crawl_id', 'group_id']),
+    Index('main_hitgroupstatus', ['hit_group_content_id']),
+
+    Index('main_hitgroupcontent', ['group_id'], unique=True),
+    Index('main_hitgroupcontent', ['requester_id']),
+    Index('main_hitgroupcontent', ['first_crawl_id']),
+
+    Index('main_crawlagregates', ['crawl_id', 'rewards_posted'],
+        name='crawlid_rewardsposted'),
+    Index('main_crawlagregates', ['crawl_id', 'rewards_consumed'],
+        name='crawlid_rewardsconsumed'),
+    Index('main_crawlagregates', ['start_time']),
+
+    Index('main_hitgroupclass', ['content_id'], unique=True),
+
+    Index('hits_mv', ['start_time']),
+    Index('hits_mv', ['crawl_id']),
+    Index('hits_mv', ['is_spam']),
+    Index('hits_mv', ['group_id', 'start_time']),
+    Index('hits_mv', ['group_id', 'crawl_id', 'hits_posted'],
+        name='groupid_crawlid_hitsposted'),
+    Index('hits_mv', ['group_id', 'crawl_id', 'hits_consumed'],
+        name='groupid_crawlid_hitsconsumed'),
+    Index('hits_mv', ['content_id', 'start_time']),
+
+    Index('hits_mv_staging', ['crawl_id']),
+
+    Index('hitgroupstatus_history', ['group_id', 'valid_from_crawl_id'],
+        name='group_id_valid_from'),
+    Index('hitgroupstatus_history', ['valid_from_crawl_id'],
+        name='valid_from'),
+    Index('hitgroupstatus_history', ['valid_to_crawl_id'], name='valid_to'),
+    Index('hitgroupstatus_history', ['group_id'], name='open',
+        where='valid_to_crawl_id IS NULL'),
+
+    Index('daystats_dirty', ['date']),
+]
+
+INDEX_DEF_RE = re.compile(r'^CREATE (UNIQUE )?INDEX (\S+) ON (?:ONLY )?(\S+) '
+    r'USING (\w+) \((.*?)\)(?: WHERE (.*))?$')
+
+
+def split_columns(columns):
+    """Split list of index columns (or expressions) on top-level commas."""
+    result, depth, current = [], 0, ''
+    for char in columns:
+        if char == ',' and depth == 0:
+            result.append(current.strip())
+            current = ''
+            continue
+        depth += {'(': 1, ')': -1}.get(char, 0)
+        current += char
+    if current.strip():
+        result.append(current.strip())
+    return tuple(col.strip('"') for col in result)
+
+
+def normalize_predicate(where):
+    """Return predicate in a form comparable with the one from pg_indexes."""
+    if where is None:
+        return None
+    return re.sub(r'[\s()]+', ' ', where).strip().lower()
+
+
+def parse_index_definition(definition):
+    """Return tuple (table, name, columns, unique, where, method) of index
+    created by ``definition`` from pg_indexes, or None if it can't be
+    parsed."""
+    match = INDEX_DEF_RE.match(definition)
+    if match is None:
+        return None
+    unique, name, table, method, columns, where = match.groups()
+    return (table.split('.')[-1].strip('"'), name.strip('"'),
+        split_columns(columns), bool(unique), normalize_predicate(where),
+        method)
+
+
+def satisfies(existing, required):
+    """Check if ``existing`` index can be used instead of ``required`` one."""
+    return (existing.valid and existing.method == required.method and
+        existing.columns[:len(required.columns)] == required.columns and
+        existing.where == normalize_predicate(required.where) and
+        (existing.unique or not required.unique) and
+        (not required.unique or
+            len(existing.columns) == len(required.columns)))
+
+
+def get_indexes(curr):
+    """Return ExistingIndex tuples of all indexes in the public schema."""
+    curr.execute('''
+        SELECT i.indexdef, x.indisvalid, x.indisprimary
+        FROM pg_indexes i
+        JOIN pg_class c ON c.relname = i.indexname
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+            AND n.nspname = i.schemaname
+        JOIN pg_index x ON x.indexrelid = c.oid
+        WHERE i.schemaname = 'public'
+    ''')
+    indexes = []
+    for definition, valid, primary in curr.fetchall():
+        parsed = parse_index_definition(definition)
+        if parsed is not None:
+            indexes.append(ExistingIndex(*parsed + (valid, primary)))
+    return indexes
+
+
+def get_tables(curr):
+    """Return dictionary mapping names of tables in the public schema to lists
+    of tables inheriting from them (partitions)."""
+    curr.execute('''
+        SELECT c.relname, array(
+            SELECT ch.relname
+            FROM pg_inherits i JOIN pg_class ch ON ch.oid = i.inhrelid
+            WHERE i.inhparent = c.oid
+            ORDER BY ch.relname)
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE c.relkind = 'r' AND n.nspname = 'public'
+    ''')
+    return dict(curr.fetchall())
+
+
+def find_missing(required, existing, tables):
+    """Return list of (table, Index) tuples of ``required`` indexes not
+    satisfied by any of ``existing`` ones.
+
+    ``tables`` maps existing tables to their partitions (see get_tables);
+    indexes of missing tables are skipped, indexes of partitioned tables are
+    checked in every partition.
+    """
+    by_table = {}
+    for index in existing:
+        by_table.setdefault(index.table, []).append(index)
+    missing = []
+    for index in required:
+        if index.table not in tables:
+            continue
+        for table in tables[index.table] or [index.table]:
+            if not any(satisfies(e, index) for e in by_table.get(table, [])):
+                missing.append((table, index))
+    return missing
+
+
+def find_duplicates(existing):
+    """Return list of (index, covering index) tuples of indexes made
+    redundant by another index of the same table: having the same or a
+    shorter list of columns, the same method and predicate.
+
+    Unique indexes and primary keys enforce constraints, so they are never
+    reported as redundant, but they can cover other indexes.
+    """
+    duplicates = []
+    for index in existing:
+        if index.unique or index.primary or not index.valid:
+            continue
+        for other in existing:
+            if (other is index or other.table != index.table or
+                    not other.valid or other.method != index.method or
+                    other.where != index.where or
+                    other.columns[:len(index.columns)] != index.columns):
+                continue
+            # of two identical indexes only the later one is reported
+            if (other.columns == index.columns and not other.unique and
+                    not other.primary and other.name > index.name):
+                continue
+            duplicates.append((index, other))
+            break
+    return duplicates
+
+
+def get_unused(curr):
+    """Return list of (table, index name, size in bytes) tuples of indexes
+    never scanned since statistics were last reset, biggest first. Unique
+    indexes and primary keys are skipped."""
+    curr.execute('''
+        SELECT s.relname, s.indexrelname, pg_relation_size(s.indexrelid)
+        FROM pg_stat_user_indexes s
+        JOIN pg_index x ON x.indexrelid = s.indexrelid
+        WHERE s.idx_scan = 0 AND NOT x.indisunique AND NOT x.indisprimary
+            AND s.schemaname = 'public'
+        ORDER BY 3 DESC, 2
+    ''')
+    return curr.fetchall()
+
+
+def create_index(curr, table, index):
+    """Create ``index`` on ``table`` without locking out writes. An invalid
+    index with the same name, left by a failed earlier attempt, is dropped
+    first.
+
+    CREATE INDEX CONCURRENTLY can't run inside a transaction, so the cursor's
+    connection must be in autocommit mode (see autocommit).
+    """
+    name = index.index_name(table)
+    curr.execute('''
+        SELECT 1 FROM pg_index x JOIN pg_class c ON c.oid = x.indexrelid
+        WHERE c.relname = %s AND NOT x.indisvalid
+    ''', (name, ))
+    if curr.fetchone():
+        curr.execute('DROP INDEX {0}'.format(name))
+    curr.execute('CREATE {unique}INDEX CONCURRENTLY {name} ON {table} '
+        'USING {method} ({columns}){where}'.format(
+            unique='UNIQUE ' if index.unique else '', name=name, table=table,
+            method=index.method, columns=', '.join(index.columns),
+            where=' WHERE {0}'.format(index.where) if index.where else ''))
+    return name
+
+
+class autocommit(object):
+    """Context manager switching the default connection into autocommit mode
+    and returning a cursor."""
+
+    def __enter__(self):
+        transaction.commit_unless_managed()
+        curr = connection.cursor()
+        self.isolation_level = connection.connection.isolation_level
+        connection.connection.set_isolation_level(
+            psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        return curr
+
+    def __exit__(self, *exc_info):
+        connection.connection.set_isolation_level(self.isolation_level)
@@ -31,7 +31,8 @@ def clean_duplicates():
 def calculate_first_crawl_id():
 
     progress = 10
-    results = query_to_dicts("select id from main_hitgroupcontent where first_crawl_id is null")
+    results = query_to_dicts("select id from main_hitgroupcontent where first_crawl_id is null",
+        server_side=True)
     log.info('got missing ids results')
     for i, r in enumerate(results):
         log.info("\tprocessing %s" % r['id'])
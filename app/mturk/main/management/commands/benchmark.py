@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+
+import sys
+import logging
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+
+from mturk.main.benchmarks import BENCHMARKS
+
+log = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """Runs performance benchmarks defined in mturk.main.benchmarks.
+
+    To list available benchmarks use:
+
+        benchmark --list
+
+    To run selected benchmarks:
+
+        benchmark --suite=crawl_writer --size=10000
+
+    """
+
+    help = 'Runs performance benchmarks.'
+
+    option_list = BaseCommand.option_list + (
+        make_option('--list', dest='list', default=False, action='store_true',
+            help='List available benchmarks and exit.'),
+        make_option('--suite', dest='suites', action='append', default=[],
+            help='Benchmark to run, can be given many times. By default all '
+                'benchmarks are ran.'),
+        make_option('--size', dest='size', type='int', default=None,
+            help='Size of the synthetic data set, meaning depends on the '
+                'benchmark.'),
+    )
+
+    def handle(self, **options):
+        if options['list']:
+            for name, func in BENCHMARKS.iteritems():
+                doc = (func.__doc__ or '').strip().split('\n')[0]
+                print '{0:<24} {1}'.format(name, doc)
+            return
+
+        suites = options['suites'] or BENCHMARKS.keys()
+        unknown = [s for s in suites if s not in BENCHMARKS]
+        if unknown:
+            sys.exit('Unknown benchmarks: {0}'.format(', '.join(unknown)))
+
+        kwargs = dict((k, v) for k, v in options.iteritems() if v is not None)
+        for name in suites:
+            log.info('Running benchmark {0}.'.format(name))
+            for variant, elapsed, items in BENCHMARKS[name](**kwargs):
+                rate = items / elapsed if elapsed else 0
+                print '{0:<24} {1:<24} {2:>10.3f}s {3:>12.1f} items/s'.format(
+                    name, variant, elapsed, rate)
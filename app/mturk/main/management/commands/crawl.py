@@ -10,21 +10,36 @@ except ImportError:
 
 
 import os
+import json
 import time
+import signal
 import datetime
 import logging
 from logging.config import fileConfig
 from optparse import make_option
-from psycopg2.pool import ThreadedConnectionPool
 
 import gevent
+from gevent.event import Event
+from gevent.queue import Queue
 from django.core.management.base import BaseCommand
 from django.conf import settings
+from django.db import close_connection
+from django.db.models import F
 
-from utils.pid import Pid
+from utils.lock import FileLock
 from crawler import tasks
 from crawler import auth
-from mturk.main.models import Crawl, RequesterProfile
+from crawler import pages
+from crawler.writer import CrawlWriter
+from crawler.dbpool import DBConnectionPool
+from crawler.cache import GroupContentCache, FingerprintCache
+from crawler import arrivals
+from mturk.main import snapshots
+from mturk.main.models import Crawl, RequesterProfile, CrawlMetrics
+from mturk.main.management.commands.db_refresh_mviews import (
+    move_staged_hits_mv, discard_staged_hits_mv)
+from mturk.main.management.commands.db_hitgroupstatus_history import (
+    update_status_history)
 
 
 log = logging.getLogger(__name__)
@@ -33,7 +48,8 @@ log = logging.getLogger(__name__)
 class Command(BaseCommand):
     option_list = BaseCommand.option_list + (
             make_option('--workers', dest='workers', type='int', default=3,
-                help='Use given number of concurrent crawl workers'),
+                help='Use given number of concurrent crawl workers (maximum '
+                    'number of concurrent requests to mturk)'),
             make_option('--logconf', dest='logconf', metavar='FILE',
                 help='Load logging configuration from given file'),
             make_option('--debug', dest='debug', action='store_true',
@@ -42,6 +58,21 @@ class Command(BaseCommand):
                 help='Mturk authentication email'),
             make_option('--mturk-password', dest='mturk_password',
                 help='Mturk authentication password'),
+            make_option('--cache-days', dest='cache_days', type='int',
+                default=settings.CRAWLER_CONTENT_ID_CACHE_DAYS,
+                help='Preload content ids of groups updated during given '
+                    'number of days'),
+            make_option('--detail-workers', dest='detail_workers', type='int',
+                default=settings.CRAWLER_DETAIL_WORKERS,
+                help='Number of workers processing groups found on listing '
+                    'pages (fetching details and writing to the database)'),
+            make_option('--db-connections', dest='db_connections',
+                type='int', default=settings.CRAWLER_DB_CONNECTIONS,
+                help='Number of database connections shared by the workers'),
+            make_option('--daemon', dest='daemon', action='store_true',
+                default=False,
+                help='Keep running and crawl every CRAWLER_DAEMON_INTERVAL '
+                    'seconds, until SIGTERM or SIGINT is received'),
     )
 
     def setup_logging(self, conf_fname):
@@ -63,7 +94,8 @@ class Command(BaseCommand):
         ``False``.
         """
         if self.mturk_email and self.mturk_password:
-            auth.install_opener()
+            # share the session with connection pool used by the workers
+            auth.install_opener(tasks.http_pool.cookies)
             resp = auth.authenticate(
                 email=email or self.mturk_email,
                 password=password or self.mturk_password
@@ -80,8 +112,6 @@ class Command(BaseCommand):
         self.mturk_email = getattr(settings, 'MTURK_AUTH_EMAIL', None)
         self.mturk_password = getattr(settings, 'MTURK_AUTH_PASSWORD', None)
 
-        _start_time = time.time()
-        pid = Pid('mturk_crawler', True)
         log.info('crawler started: %s;;%s', args, options)
 
         if options.get('mturk_email'):
@@ -94,22 +124,159 @@ class Command(BaseCommand):
 
         if options.get('debug', False):
             self.setup_debug()
-            print 'Current proccess pid: %s' % pid.actual_pid
+            print 'Current proccess pid: %s' % os.getpid()
             print ('To debug, type: python -c "import os,signal; '
-                'os.kill(%s, signal.SIGUSR1)"\n') % pid.actual_pid
+                'os.kill(%s, signal.SIGUSR1)"\n') % os.getpid()
 
         self.maxworkers = options['workers']
-        if self.maxworkers > 9:
-            # If you want to remote this limit, don't forget to change dbpool
-            # object maximum number of connections. Each worker should fetch
-            # 10 hitgroups and spawn single task for every one of them, that
-            # will get private connection instance. So for 9 workers it's
-            # already 9x10 = 90 connections required
-            #
-            # Also, for too many workers, amazon isn't returning valid data
-            # and retrying takes much longer than using smaller amount of
-            # workers
-            sys.exit('Too many workers (more than 9). Quit.')
+        if self.maxworkers > settings.CRAWLER_MAX_WORKERS:
+            # For too many workers, amazon isn't returning valid data and
+            # retrying takes much longer than using smaller amount of workers.
+            # Workers don't hold database connections, they share
+            # --db-connections ones.
+            sys.exit('Too many workers (more than {0}). Quit.'.format(
+                settings.CRAWLER_MAX_WORKERS))
+
+        # a crawl started while the previous one (or the daemon) is still
+        # running is skipped
+        lock = FileLock('mturk_crawler')
+        if not lock.acquire():
+            log.warning('Another crawler is running. Quit.')
+            sys.exit(1)
+        try:
+            self.setup(options)
+            if options['daemon']:
+                self.run_daemon(options)
+            else:
+                self.crawl(options)
+        finally:
+            # setup may fail before the pool is created, its error must not
+            # be hidden
+            dbpool = getattr(self, 'dbpool', None)
+            if dbpool is not None:
+                dbpool.closeall()
+            tasks.http_pool.close()
+            lock.release()
+
+    def setup(self, options):
+        """Prepare state kept between crawls of the daemon: authenticated
+        mturk session, database connections and caches."""
+        # number of concurrent requests to mturk is controlled by the
+        # scheduler, it will never exceed number of workers
+        tasks.fetch_scheduler.set_max_concurrency(self.maxworkers)
+        # workers wait for one of a few connections instead of holding
+        # their own, so fetch concurrency doesn't depend on database limits
+        self.dbpool = DBConnectionPool('dbname=%s user=%s password=%s' % (
+                settings.DATABASES['default']['NAME'],
+                settings.DATABASES['default']['USER'],
+                settings.DATABASES['default']['PASSWORD']),
+            size=options['db_connections'],
+            timeout=settings.CRAWLER_DB_POOL_TIMEOUT)
+        # ids of recently active groups, so that workers won't have to query
+        # the database for every group
+        self.content_ids = GroupContentCache()
+        # html of new groups, reused for their identical siblings
+        self.fingerprints = FingerprintCache()
+        # snapshot of the last correct crawl, the next one is compared with
+        self.snapshot = None
+        self.reqesters = None
+        self.refreshed = None
+        self.authenticated = False
+
+    def refresh(self, options):
+        """Reload requester profiles and content ids of recently active
+        groups, if they are older than CRAWLER_DAEMON_REFRESH seconds."""
+        if (self.refreshed is not None and
+                time.time() - self.refreshed < settings.CRAWLER_DAEMON_REFRESH):
+            return
+        # fetch those requester profiles so we could decide if their hitgroups
+        # are public or not
+        self.reqesters = RequesterProfile.objects.all_as_dict()
+        with self.dbpool.connection() as conn:
+            self.content_ids.load(conn, options['cache_days'])
+        self.refreshed = time.time()
+
+    def run_daemon(self, options):
+        """Run a crawl every CRAWLER_DAEMON_INTERVAL seconds until SIGTERM or
+        SIGINT is received. A crawl in progress is always finished; starts
+        missed because of a long crawl are skipped.
+
+        State of the daemon is written to the status file after every change
+        (see write_status).
+        """
+        self.stopping = Event()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, self.stop)
+        interval = settings.CRAWLER_DAEMON_INTERVAL
+        self.status = {'pid': os.getpid(), 'started': time.time(),
+            'crawls': 0, 'failures': 0, 'consecutive_failures': 0,
+            'last_crawl': None}
+        log.info('Crawler daemon started, crawling every %ss.', interval)
+
+        next_start = time.time()
+        while not self.stopping.is_set():
+            self.write_status('crawling', next_crawl=None)
+            start = time.time()
+            try:
+                crawl, correct = self.crawl(options)
+            except Exception:
+                log.exception('Crawl failed.')
+                crawl, correct = None, False
+            finally:
+                # reconnect if the database went away meanwhile
+                close_connection()
+            self.status['crawls'] += 1
+            if correct:
+                self.status['consecutive_failures'] = 0
+            else:
+                self.status['failures'] += 1
+                self.status['consecutive_failures'] += 1
+                # mturk session might have expired
+                self.authenticated = False
+            self.status['last_crawl'] = {
+                'id': crawl and crawl.id, 'correct': correct,
+                'start': start, 'duration': time.time() - start,
+                'groups_downloaded': crawl and crawl.groups_downloaded,
+                'groups_available': crawl and crawl.groups_available}
+
+            while next_start <= time.time():
+                next_start += interval
+            self.write_status('idle', next_crawl=next_start)
+            self.stopping.wait(next_start - time.time())
+
+        self.write_status('stopped', next_crawl=None)
+        log.info('Crawler daemon stopped.')
+
+    def stop(self, signum, frame):
+        log.info('Signal %s received, stopping after the current crawl.',
+            signum)
+        self.stopping.set()
+
+    def write_status(self, state, **fields):
+        """Atomically replace the status file with JSON describing the
+        daemon: its ``state``, number of crawls and failures, details of the
+        last crawl and time of the next one (unix timestamps)."""
+        self.status.update(fields, state=state, updated=time.time())
+        path = settings.CRAWLER_DAEMON_STATUS_FILE or os.path.join(
+            settings.RUN_DATA_PATH, 'mturk_crawler.status')
+        with open(path + '.tmp', 'w') as f:
+            json.dump(self.status, f, indent=2)
+        os.rename(path + '.tmp', path)
+
+    def crawl(self, options):
+        """Crawl mturk once. Return tuple (crawl, True if enough groups were
+        downloaded to consider it correct)."""
+        _start_time = time.time()
+        if not self.authenticated:
+            self.authenticated = self._authenticate_if_possible()
+        self.refresh(options)
+
+        tasks.fetch_scheduler.reset_stats()
+        tasks.http_pool.reset_stats()
+        tasks.metrics.reset()
+        self.dbpool.reset_stats()
+        self.content_ids.reset_stats()
+        self.fingerprints.reset_stats()
         start_time = datetime.datetime.now()
 
         hits_available = tasks.hits_mainpage_total()
@@ -126,68 +293,98 @@ class Command(BaseCommand):
                 groups_downloaded=groups_available)
         log.debug('fresh crawl object created: %s', crawl.id)
 
-        # fetch those requester profiles so we could decide if their hitgroups
-        # are public or not
-        reqesters = RequesterProfile.objects.all_as_dict()
-
-        dbpool = ThreadedConnectionPool(10, 90,
-            'dbname=%s user=%s password=%s' % (
-                settings.DATABASES['default']['NAME'],
-                settings.DATABASES['default']['USER'],
-                settings.DATABASES['default']['PASSWORD']))
+        reqesters = self.reqesters
+        dbpool = self.dbpool
+        content_ids = self.content_ids
+        fingerprints = self.fingerprints
         # collection of group_ids that were already processed - this should
         # protect us from duplicating data
         processed_groups = set()
-        total_reward = 0
-        hitgroups_iter = self.hits_iter()
-
-        for hg_pack in hitgroups_iter:
-            jobs = []
-            for hg in hg_pack:
-                if hg['group_id'] in processed_groups:
-                    log.debug('Group already in processed_groups, skipping.')
-                    continue
-                processed_groups.add(hg['group_id'])
-
-                j = gevent.spawn(tasks.process_group,
-                        hg, crawl.id, reqesters, processed_groups, dbpool)
-                jobs.append(j)
-                total_reward += hg['reward'] * hg['hits_available']
-            log.debug('processing pack of hitgroups objects')
-            gevent.joinall(
-                jobs, timeout=settings.CRAWLER_GROUP_PROCESSING_TIMEOUT)
-            # check if all jobs ended successfully
-            for job in jobs:
-                if not job.ready():
-                    log.info('Killing job: %s', job)
-                    job.kill()
-
-            if len(processed_groups) >= groups_available:
-                log.info('Skipping empty groups.')
-                # there's no need to iterate over empty groups.. break
-                break
-
-            # amazon does not like too many requests at once, so give them a
-            # quick rest...
-            gevent.sleep(1)
-
-        dbpool.closeall()
+        # hitgroup status rows are buffered and written in bulk
+        writer = CrawlWriter(dbpool, processed_groups,
+            settings.CRAWLER_WRITER_FLUSH_SIZE,
+            stage_hits_mv=settings.CRAWLER_STAGE_HITS_MV)
+        # listing pages are downloaded by the producer, that passes new
+        # groups to detail/db workers through a bounded queue, so that
+        # listing downloads overlap with processing of already found groups
+        queue = Queue(maxsize=settings.CRAWLER_QUEUE_SIZE)
+        producer = gevent.spawn(self.produce_groups, queue, processed_groups,
+            groups_available, options['detail_workers'])
+        consumers = [gevent.spawn(self.consume_groups, queue, crawl.id,
+                reqesters, processed_groups, dbpool, writer, content_ids,
+                fingerprints)
+            for i in xrange(options['detail_workers'])]
+        gevent.joinall([producer] + consumers)
+        total_reward = producer.value or 0
+
+        writer.flush()
+        pool_stats = dbpool.stats()
 
         # update crawler object
         crawl.groups_downloaded = len(processed_groups)
         crawl.end_time = datetime.datetime.now()
         crawl.save()
+        snapshot = self.write_snapshot(crawl, writer.groups, groups_available)
+        metrics = CrawlMetrics.objects.create(crawl=crawl,
+            stats={
+                'fetch': tasks.fetch_scheduler.stats(),
+                'http': tasks.http_pool.stats(),
+                'writer': {'rows': writer.rows_written,
+                    'flushes': writer.flushes},
+                'content_ids': {'preloaded': content_ids.preloaded,
+                    'hits': content_ids.hits, 'misses': content_ids.misses},
+                'fetches_avoided': fingerprints.avoided,
+                'db_pool': pool_stats,
+            },
+            **tasks.metrics.record(crawl.groups_downloaded, writer.write_time))
 
         work_time = time.time() - _start_time
+        fetch_stats = tasks.fetch_scheduler.stats()
+        http_stats = tasks.http_pool.stats()
         log.info("""Crawl finished:
         created crawl id: {crawl_id})
         total reward value: {total_reward}
         hits groups downloaded: {processed_groups}
         hits groups available: {groups_available}
+        status rows written: {rows_written} in {flushes} flushes, {write_time:.2f} seconds
+        content id cache: {cache_size} preloaded, {cache_hits} hits, {cache_misses} db lookups ({cache_hit_rate:.1%} hit rate)
+        detail fetches avoided: {fetches_avoided} ({fingerprint_lookups} fingerprint db lookups)
+        mturk requests: {requests} ({throttles} limit exceeded, {errors} failed), {req_per_sec:.2f} req/s, final rate {rate:.2f} req/s, concurrency {concurrency}
+        http connections: {connections} opened for {http_requests} requests ({reuse_ratio:.1%} reused, {stale} stale)
+        db connections: {db_connections} of {db_pool_size} used for {db_requests} requests, {db_waits} waited {db_wait_time:.2f} seconds (max {db_wait_max:.3f}, p95 {db_wait_p95:.3f})
+        fetch latency p50/p95/p99: {p50:.3f}/{p95:.3f}/{p99:.3f} seconds, {retries:.2f} retries per page
         work time: {work_time:.2f} seconds
         """.format(crawl_id=crawl.id, total_reward=total_reward,
             processed_groups=len(processed_groups),
             groups_available=groups_available,
+            rows_written=writer.rows_written, flushes=writer.flushes,
+            write_time=writer.write_time,
+            cache_size=content_ids.preloaded, cache_hits=content_ids.hits,
+            cache_misses=content_ids.misses,
+            cache_hit_rate=content_ids.hit_rate(),
+            fetches_avoided=fingerprints.avoided,
+            fingerprint_lookups=fingerprints.db_lookups,
+            requests=fetch_stats['requests'],
+            throttles=fetch_stats['throttles'],
+            errors=fetch_stats['errors'],
+            req_per_sec=fetch_stats['req_per_sec'],
+            rate=fetch_stats['rate'],
+            concurrency=fetch_stats['concurrency'],
+            connections=http_stats['connections'],
+            http_requests=http_stats['requests'],
+            reuse_ratio=http_stats['reuse_ratio'],
+            stale=http_stats['stale'],
+            db_connections=pool_stats['connections'],
+            db_pool_size=pool_stats['size'],
+            db_requests=pool_stats['requests'],
+            db_waits=pool_stats['waits'],
+            db_wait_time=pool_stats['wait_time'],
+            db_wait_max=pool_stats['wait_max'],
+            db_wait_p95=pool_stats['wait_p95'],
+            p50=metrics.fetch_latency_p50 or 0,
+            p95=metrics.fetch_latency_p95 or 0,
+            p99=metrics.fetch_latency_p99 or 0,
+            retries=metrics.retries_per_page or 0,
             work_time=work_time))
 
         crawl_downloaded_pc = settings.INCOMPLETE_CRAWL_THRESHOLD
@@ -211,52 +408,159 @@ class Command(BaseCommand):
                     downloaded_pc, crawl_downloaded_pc,
                     crawl.groups_downloaded, groups_available))
 
-        pid.remove_pid()
-
-    def hits_iter(self):
-        """Hits group lists generator.
-
-        As long as available, return lists of parsed hits group. Because this
-        method is using concurent download, number of returned elements on
-        each list cannot be greater that maximum number of workers.
-
-        On start, the number of pages could be estimated using fetched
-        groups_avaialable and the number of crawls per page. However the number
-        will change during the crawl as tasks are posted and completed and can
-        be only estimated with precision of roughly 1-3 page.
-
-        Therefore finding an empty page is the stop condition.
-
+        # the same condition as in db_refresh_mviews.get_crawls_for_update
+        crawl_correct = (
+            groups_available * crawl_downloaded_pc < crawl.groups_downloaded)
+        if writer.stage_hits_mv:
+            if crawl_correct:
+                start = time.time()
+                move_staged_hits_mv(crawl.id)
+                log.info('hits_mv records created in %.2f seconds',
+                    time.time() - start)
+                if settings.CRAWLER_ARRIVALS and snapshot is not None:
+                    self.update_arrivals(crawl, snapshot)
+            else:
+                discard_staged_hits_mv(crawl.id)
+        if snapshot is not None:
+            if crawl_correct:
+                self.snapshot and self.snapshot.close()
+                self.snapshot = snapshot
+            else:
+                snapshot.close()
+
+        if settings.CRAWLER_STATUS_HISTORY and crawl_correct:
+            start = time.time()
+            update_status_history(crawl.id)
+            log.info('hitgroupstatus_history updated in %.2f seconds',
+                time.time() - start)
+
+        return crawl, crawl_correct
+
+    def write_snapshot(self, crawl, groups, groups_available):
+        """Write snapshot of the finished ``crawl`` (see mturk.main.snapshots)
+        with its ``groups``, remove snapshots older than
+        CRAWLER_SNAPSHOTS_KEEP_DAYS and return the new one, opened. Return
+        None if it couldn't be written."""
+        path = snapshots.snapshots_path()
+        filename = snapshots.snapshot_path(crawl.id, path)
+        try:
+            if not os.path.isdir(path):
+                os.makedirs(path)
+            snapshots.write_snapshot(filename, crawl.id, crawl.start_time,
+                groups, groups_available)
+            if settings.CRAWLER_SNAPSHOTS_KEEP_DAYS is not None:
+                snapshots.remove_old_snapshots(
+                    settings.CRAWLER_SNAPSHOTS_KEEP_DAYS, path)
+            return snapshots.Snapshot(filename)
+        except (IOError, OSError, snapshots.SnapshotError):
+            log.exception('Writing crawl snapshot %s failed.', filename)
+            return None
+
+    def update_arrivals(self, crawl, snapshot):
+        """Write arrivals of the correct ``crawl`` with hits_mv rows, comparing
+        its ``snapshot`` with the one of the previous correct crawl, see
+        crawler.arrivals.
+
+        Arrivals are left to db_arrivals if the previous snapshot is missing.
+        """
+        # the same crawl db_arrivals would compare this one with
+        threshold = settings.INCOMPLETE_CRAWL_THRESHOLD
+        previous_crawl = Crawl.objects.filter(
+            start_time__lt=crawl.start_time,
+            groups_downloaded__gt=F('groups_available') * threshold).order_by(
+                '-start_time')[:1]
+        previous_crawl = previous_crawl[0] if previous_crawl else None
+        previous = arrivals.previous_snapshot(previous_crawl, self.snapshot)
+        if previous is None:
+            return
+
+        start = time.time()
+        try:
+            posted, consumed = snapshots.diff(previous, snapshot)
+            with self.dbpool.connection() as conn:
+                curr = conn.cursor()
+                try:
+                    updated = arrivals.write_arrivals(curr, crawl,
+                        previous_crawl, posted, consumed)
+                    conn.commit()
+                finally:
+                    curr.close()
+        except Exception:
+            log.exception('Writing arrivals failed, they are left to '
+                'db_arrivals.')
+            return
+        finally:
+            if previous is not self.snapshot:
+                previous.close()
+        log.info('Arrivals written in %.2f seconds: %s groups posted, %s '
+            'consumed, %s hits_mv rows updated.', time.time() - start,
+            len(posted), len(consumed), updated)
+
+    def produce_groups(self, queue, processed_groups, groups_available,
+            consumers):
+        """Put groups found on listing pages into ``queue``, skipping already
+        processed ones, and a ``None`` marker for every consumer at the end.
+
+        Return total reward value of queued groups.
         """
-        self._authenticate_if_possible()
-
-        counter = count(1, self.maxworkers)
-        for i in counter:
-            pages = range(i, i + self.maxworkers)
-            log.debug('Processing pages: {0}'.format(pages))
-            jobs = [gevent.spawn(tasks.hits_groups_info, page_nr)
-                for page_nr in pages]
-            gevent.joinall(jobs)
-
-            # get data from completed tasks & remove empty results
-            hgs = []
-            for job in jobs:
-                if job.value:
-                    hgs.extend(job.value)
-
-            # if no data was returned, end - previous page was probably the
-            # last one with results
-            if not hgs:
-                log.info('None of the pages {0} contains data, assuming all '
-                    'pages were processed, exiting.'.format(pages))
+        total_reward = 0
+        try:
+            for hg_pack in self.hits_iter(groups_available):
+                for hg in hg_pack:
+                    if hg['group_id'] in processed_groups:
+                        log.debug('Group already in processed_groups, '
+                            'skipping.')
+                        continue
+                    processed_groups.add(hg['group_id'])
+                    total_reward += hg['reward'] * hg['hits_available']
+                    # blocks while consumers are behind
+                    queue.put(hg)
+                    tasks.metrics.add_queue_depth(queue.qsize())
+                log.debug('hitgroups pack queued, queue size: %s',
+                    queue.qsize())
+
+                if len(processed_groups) >= groups_available:
+                    log.info('Skipping empty groups.')
+                    # there's no need to iterate over empty groups.. break
+                    break
+        finally:
+            for i in xrange(consumers):
+                queue.put(None)
+        return total_reward
+
+    def consume_groups(self, queue, crawl_id, reqesters, processed_groups,
+            dbpool, writer, content_ids, fingerprints):
+        """Process groups from ``queue`` until ``None`` is received."""
+        while True:
+            hg = queue.get()
+            if hg is None:
                 break
+            timeout = gevent.Timeout(settings.CRAWLER_GROUP_PROCESSING_TIMEOUT)
+            timeout.start()
+            try:
+                tasks.process_group(hg, crawl_id, reqesters, processed_groups,
+                    dbpool, writer, content_ids, fingerprints)
+            except gevent.Timeout, t:
+                if t is not timeout:
+                    raise
+                log.info('Killing job processing group: %s', hg['group_id'])
+            except Exception:
+                log.exception('Processing group failed: %s', hg['group_id'])
+            finally:
+                timeout.cancel()
+            writer.flush_if_full()
+
+    def hits_iter(self, groups_available=None):
+        """Hits group lists generator.
 
-            log.debug('yielding hits group: %s', len(hgs))
-            yield hgs
+        As long as available, return lists of parsed hits group. Pages
+        expected to hold ``groups_available`` groups are fetched at once by
+        ``maxworkers`` greenlets - the scheduler still limits the number and
+        rate of requests - further ones in batches of the scheduler's current
+        concurrency until an empty one is found, see crawler.pages.
 
+        """
+        return pages.iter_listing_pages(tasks.hits_groups_info,
+            groups_available, self.maxworkers,
+            lambda: tasks.fetch_scheduler.concurrency)
 
-def count(firstval=0, step=1):
-    "Port of itertools.count from python2.7"
-    while True:
-        yield firstval
-        firstval += step
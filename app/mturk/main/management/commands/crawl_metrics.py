@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+
+import datetime
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+from django.utils.timezone import now
+
+from mturk.main.models import CrawlMetrics
+from mturk.main.monitoring import CRAWL_METRICS_COLUMNS, crawl_metrics_value
+
+
+def format_row(metrics):
+    row = []
+    for header, attr, fmt in CRAWL_METRICS_COLUMNS:
+        value = crawl_metrics_value(metrics, attr)
+        row.append('-' if value is None else fmt.format(value))
+    return row
+
+
+class Command(BaseCommand):
+    """Displays timing and throughput metrics of recent crawls.
+
+    To see crawls from the last week:
+
+        crawl_metrics --hours=168
+
+    """
+
+    help = 'Displays timing and throughput metrics of recent crawls.'
+
+    option_list = BaseCommand.option_list + (
+        make_option('--hours', dest='hours', type='int', default=24,
+            help='Show crawls started during given number of hours.'),
+        make_option('--limit', dest='limit', type='int', default=None,
+            help='Show at most given number of the latest crawls.'),
+    )
+
+    def handle(self, **options):
+        metrics = CrawlMetrics.objects.select_related('crawl').filter(
+            crawl__start_time__gt=now() - datetime.timedelta(
+                hours=options['hours'])
+            ).order_by('-crawl__start_time')
+        if options['limit']:
+            metrics = metrics[:options['limit']]
+
+        rows = [[c[0] for c in CRAWL_METRICS_COLUMNS]]
+        rows.extend(format_row(m) for m in reversed(list(metrics)))
+        widths = [max(len(row[i]) for row in rows)
+            for i in range(len(CRAWL_METRICS_COLUMNS))]
+        for row in rows:
+            print ' | '.join(v.rjust(w) for v, w in zip(row, widths))
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""Arrivals (hits_mv hits_posted and hits_consumed) calculated by the crawler.
+
+At the end of every correct crawl, its snapshot (see mturk.main.snapshots) is
+compared with the one of the previous correct crawl and the differences are
+written to hits_mv directly, instead of being found later by db_arrivals
+joining main_hitgroupstatus rows of consecutive crawls. Results are the same
+as of the hits_arrivals and initial_post_hits_update procedures:
+
+* hits_posted of a group in a crawl is the increase of hits_available since
+  the previous crawl,
+* hits_consumed of a group is the decrease of hits_available in the next
+  crawl, set on the earlier crawl's row,
+* neither is set when the difference equals hits_available (the group was
+  just posted or has disappeared); hits_posted of groups posted for the first
+  time is their hits_available.
+
+Rows with no change are not updated at all. Crawls having their arrivals
+written this way are marked with has_diffs and skipped by db_arrivals. If
+there's no previous crawl or its snapshot is missing, eg. after the first
+crawl with snapshots, arrivals are left to db_arrivals.
+"""
+
+import logging
+
+from mturk.main import snapshots
+
+
+log = logging.getLogger(__name__)
+
+
+def previous_snapshot(previous_crawl, last=None, path=None):
+    """Return opened snapshot of the ``previous_crawl``, which is ``last``
+    if it's the snapshot of the same crawl. Return None if there's no
+    previous crawl with hits_mv rows or its snapshot can't be read.
+    """
+    if previous_crawl is None or not previous_crawl.has_hits_mv:
+        return None
+    if last is not None and last.crawl_id == previous_crawl.id:
+        return last
+    try:
+        return snapshots.Snapshot(
+            snapshots.snapshot_path(previous_crawl.id, path))
+    except (IOError, snapshots.SnapshotError) as e:
+        log.info('No snapshot of the previous crawl, arrivals are left to '
+            'db_arrivals: %s', e)
+        return None
+
+
+def write_arrivals(curr, crawl, previous_crawl, posted, consumed,
+        chunk_size=1000):
+    """Write ``posted`` and ``consumed`` hits (see snapshots.diff) of
+    ``crawl`` to hits_mv rows of it and of the ``previous_crawl``, set
+    hits_posted of groups first posted in ``crawl`` and mark it with
+    has_diffs. Both crawls must already have their hits_mv rows. Does not
+    commit.
+
+    Return the number of updated hits_mv rows.
+    """
+    curr.execute('''
+        CREATE TEMPORARY TABLE IF NOT EXISTS crawl_arrivals_staging (
+            crawl_id integer,
+            group_id varchar(50),
+            hits_posted integer,
+            hits_consumed integer
+        ) ON COMMIT DELETE ROWS
+    ''')
+    rows = ([(crawl.id, group_id, hits, None)
+            for group_id, hits in posted.iteritems()] +
+        [(previous_crawl.id, group_id, None, hits)
+            for group_id, hits in consumed.iteritems()])
+    # COPY can't be used with the gevent wait callback, see writer.py
+    for i in xrange(0, len(rows), chunk_size):
+        values = ', '.join(curr.mogrify('(%s, %s, %s, %s)', row)
+            for row in rows[i:i + chunk_size])
+        curr.execute('INSERT INTO crawl_arrivals_staging VALUES ' + values)
+
+    # start_time lets the planner skip other hits_mv partitions
+    curr.execute('''
+        UPDATE hits_mv
+        SET
+            hits_posted = coalesce(a.hits_posted, hits_mv.hits_posted),
+            hits_consumed = coalesce(a.hits_consumed, hits_mv.hits_consumed)
+        FROM crawl_arrivals_staging a
+        WHERE
+            hits_mv.start_time IN (%s, %s) AND
+            hits_mv.crawl_id = a.crawl_id AND
+            hits_mv.group_id = a.group_id
+    ''', (crawl.start_time, previous_crawl.start_time))
+    updated = curr.rowcount
+
+    curr.execute('''
+        UPDATE hits_mv
+        SET hits_posted = hits_mv.hits_available
+        FROM main_hitgroupcontent content
+        WHERE
+            hits_mv.start_time = %s AND
+            hits_mv.crawl_id = %s AND
+            content.id = hits_mv.content_id AND
+            content.first_crawl_id = %s
+    ''', (crawl.start_time, crawl.id, crawl.id))
+    updated += curr.rowcount
+
+    curr.execute('UPDATE main_crawl SET has_diffs = true WHERE id = %s',
+        (crawl.id, ))
+    return updated
@@ -9,9 +9,11 @@ from django.conf import settings
 AUTH_PAGE = '{}/mturk'.format(settings.MTURK_PAGE)
 
 
-def install_opener():
-    """Install global opener with cookies support."""
-    jar = cookielib.CookieJar()
+def install_opener(jar=None):
+    """Install global opener with cookies support. Pass ``jar`` to share
+    the session cookies with other clients."""
+    if jar is None:
+        jar = cookielib.CookieJar()
     opener = urllib2.build_opener(urllib2.HTTPCookieProcessor(jar))
     # Amazon displays 'Please enable cookies (...)' without fake 'User-agent'
     # header.
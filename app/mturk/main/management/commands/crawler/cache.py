@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+
+import time
+import hashlib
+import logging
+from collections import OrderedDict
+
+
+log = logging.getLogger(__name__)
+
+
+class GroupContentCache(object):
+    """In-memory map of group_id to main_hitgroupcontent id.
+
+    Nearly all groups seen during a crawl were already seen during previous
+    ones, so ids of recently active groups are loaded once, at the crawl
+    start. Workers should check this map first and go to the database only
+    for misses, adding ids found or inserted there.
+    """
+
+    def __init__(self):
+        self.ids = {}
+        self.hits = 0
+        self.misses = 0
+        self.preloaded = 0
+        self.load_time = 0.0
+
+    def __len__(self):
+        return len(self.ids)
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+
+    def load(self, conn, days, batch_size=10000):
+        """Load ids of groups updated during last ``days`` days using given
+        database connection. Return the number of loaded ids."""
+        start_time = time.time()
+        curr = conn.cursor()
+        try:
+            curr.execute('''
+                SELECT q.group_id, q.id
+                FROM main_hitgroupstate s
+                JOIN main_hitgroupcontent q ON q.id = s.hit_group_content_id
+                WHERE s.last_updated > now() - %s * interval '1 day'
+            ''', (int(days), ))
+            while True:
+                rows = curr.fetchmany(batch_size)
+                if not rows:
+                    break
+                self.ids.update(rows)
+            conn.commit()
+        finally:
+            curr.close()
+        self.preloaded = len(self.ids)
+        self.load_time = time.time() - start_time
+        log.info('Loaded %s group content ids (last %s days) in %.2fs',
+            len(self.ids), days, self.load_time)
+        return len(self.ids)
+
+    def get(self, group_id):
+        """Return content id of given group or None if it's not known."""
+        content_id = self.ids.get(group_id)
+        if content_id is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return content_id
+
+    def add(self, group_id, content_id):
+        self.ids[group_id] = content_id
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return float(self.hits) / lookups if lookups else 0.0
+
+
+class FingerprintCache(object):
+    """Html of hitgroups, keyed by their content fingerprint.
+
+    Requesters often post many groups differing only in the group id. Such a
+    sibling group has the same fingerprint - requester id, title, reward and
+    description - so its html can be reused instead of downloading preview and
+    iframe pages of a new group. Fingerprints are looked up in memory first,
+    then in main_hitgroupcontent, and at most ``max_size`` most recently used
+    ones are kept.
+    """
+
+    def __init__(self, max_size=1000):
+        self.max_size = max_size
+        self.html = OrderedDict()
+        self.avoided = 0
+        self.db_lookups = 0
+
+    def reset_stats(self):
+        self.avoided = 0
+        self.db_lookups = 0
+
+    @staticmethod
+    def fingerprint(data):
+        return (data['requester_id'], data['title'], float(data['reward']),
+            hashlib.md5(data['description']).hexdigest())
+
+    def get(self, db, data):
+        """Return html of group identical to ``data`` or None. ``db`` is
+        ``crawler.db.DB`` instance used on cache misses."""
+        key = self.fingerprint(data)
+        html = self.html.pop(key, None)
+        if html is None:
+            self.db_lookups += 1
+            html = db.sibling_html(*key)
+        if html:
+            self._store(key, html)
+            self.avoided += 1
+            return html
+        return None
+
+    def add(self, data, html):
+        """Remember ``html`` downloaded for group described by ``data``."""
+        if html:
+            key = self.fingerprint(data)
+            self.html.pop(key, None)
+            self._store(key, html)
+
+    def _store(self, key, html):
+        self.html[key] = html
+        while len(self.html) > self.max_size:
+            self.html.popitem(last=False)
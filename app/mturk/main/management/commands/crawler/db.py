@@ -11,6 +11,8 @@ from psycopg2 import extensions
 
 from django.conf import settings
 
+from mturk.main import htmlblobs
+
 
 log = logging.getLogger(__name__)
 
@@ -57,6 +59,24 @@ class DB(object):
             return result
         return result[0]
 
+    def sibling_html(self, requester_id, title, reward, description_md5):
+        """Return html of the latest group with the same requester, title,
+        reward and description or None if there's no such group."""
+        self.curr.execute('''
+            SELECT q.html, b.data
+            FROM main_hitgroupcontent q
+            LEFT JOIN main_htmlblob b ON b.hash = q.html_hash
+            WHERE q.requester_id = %s AND q.title = %s AND q.reward = %s
+                AND md5(q.description) = %s
+                AND (q.html <> '' OR q.html_hash IS NOT NULL)
+            ORDER BY q.id DESC LIMIT 1
+        ''', (requester_id, title, reward, description_md5))
+        result = self.curr.fetchone()
+        if result is None:
+            return result
+        html, data = result
+        return htmlblobs.decompress(data) if data is not None else html
+
     def insert_hit_group_content(self, data):
         """Insert row into main_hitgroupcontent table and return it's id
 
@@ -64,22 +84,26 @@ class DB(object):
         column and because of that, inserting data with group_id that already
         exists it that table causes IntegrityError. When that happens, instead
         of throwing an exception, return id of already existing row.
+
+        Html is stored in main_htmlblob, see mturk.main.htmlblobs.
         """
         try:
+            html_hash = (htmlblobs.store(self.curr, data['html'])
+                if data['html'] else None)
             self.curr.execute('''
                 INSERT INTO main_hitgroupcontent(
                     reward, description, title, requester_name, qualifications,
-                    time_alloted, html, keywords, requester_id, group_id,
-                    group_id_hashed, occurrence_date, first_crawl_id, is_public,
-                    last_updated, hits_available
+                    time_alloted, html, html_hash, keywords, requester_id,
+                    group_id, group_id_hashed, occurrence_date, first_crawl_id,
+                    is_public
                 )
                 VALUES (
                     %(reward)s, %(description)s, %(title)s, %(requester_name)s,
-                    %(qualifications)s, %(time_alloted)s, %(html)s, %(keywords)s,
-                    %(requester_id)s, %(group_id)s, %(group_id_hashed)s,
-                    %(occurrence_date)s, %(first_crawl_id)s, %(is_public)s,
-                    %(occurrence_date)s, 0
-                )''', data)
+                    %(qualifications)s, %(time_alloted)s, '', %(html_hash)s,
+                    %(keywords)s, %(requester_id)s, %(group_id)s,
+                    %(group_id_hashed)s, %(occurrence_date)s,
+                    %(first_crawl_id)s, %(is_public)s
+                )''', dict(data, html_hash=html_hash))
             self.curr.execute("SELECT currval('main_hitgroupcontent_id_seq')")
         except psycopg2.IntegrityError:
             # this exception was caused because  hitgroupcontent with given
@@ -110,11 +134,22 @@ class DB(object):
             )''', data)
 
         self.curr.execute('''
-            UPDATE main_hitgroupcontent
+            UPDATE main_hitgroupstate
             SET hits_available = %(hits_available)s,
-                last_updated = %(now)s
-            WHERE id = %(hit_group_content_id)s
+                last_updated = %(now)s,
+                last_crawl_id = %(crawl_id)s
+            WHERE hit_group_content_id = %(hit_group_content_id)s
         ''', data)
+        if self.curr.rowcount == 0:
+            self.curr.execute('''
+                INSERT INTO main_hitgroupstate (
+                    hit_group_content_id, hits_available, last_updated,
+                    last_crawl_id
+                )
+                VALUES (
+                    %(hit_group_content_id)s, %(hits_available)s, %(now)s,
+                    %(crawl_id)s
+                )''', data)
 
         # add related hitgroupcontent id to index queue
         self.curr.execute('''
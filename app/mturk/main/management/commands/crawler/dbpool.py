@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+
+import time
+import logging
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import extensions
+from gevent.queue import LifoQueue, Empty
+
+from metrics import percentile
+
+
+log = logging.getLogger(__name__)
+
+
+class PoolTimeout(Exception):
+    """No connection was returned to the pool in time."""
+
+
+class DBConnectionPool(object):
+    """Fixed number of database connections shared by crawler greenlets.
+
+    Up to ``size`` connections are opened lazily, a greenlet asking for a
+    connection when all of them are in use waits in a queue until one is
+    returned (or ``timeout`` seconds pass). Thanks to crawler.db wait
+    callback, queries don't block other greenlets, so a few connections serve
+    any number of workers that spend most of their time on the network.
+
+    Time spent waiting for connections is recorded, see ``stats``.
+    """
+
+    def __init__(self, dsn, size=5, timeout=None, connect=psycopg2.connect):
+        self.dsn = dsn
+        self.size = size
+        self.timeout = timeout
+        self.connect = connect
+        # idle connections and a None for every connection not opened yet,
+        # the most recently used connection is handed out first
+        self.idle = LifoQueue()
+        for i in xrange(size):
+            self.idle.put(None)
+        self.opened = 0
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.requests = 0
+        self.waits = []
+
+    def getconn(self):
+        """Return idle connection, opening a new one if the pool isn't full
+        yet, or wait for one to be returned."""
+        self.requests += 1
+        try:
+            conn = self.idle.get_nowait()
+        except Empty:
+            start_time = time.time()
+            try:
+                conn = self.idle.get(timeout=self.timeout)
+            except Empty:
+                raise PoolTimeout('No database connection available in '
+                    '{0}s.'.format(self.timeout))
+            finally:
+                self.waits.append(time.time() - start_time)
+        if conn is None:
+            try:
+                conn = self.connect(self.dsn)
+            except Exception:
+                self.idle.put(None)
+                raise
+            self.opened += 1
+        return conn
+
+    def putconn(self, conn, close=False):
+        """Return ``conn`` to the pool. Transaction left open is rolled back,
+        broken connections (and all, if ``close`` is set) are closed."""
+        if not close and not conn.closed:
+            try:
+                if (conn.get_transaction_status() !=
+                        extensions.TRANSACTION_STATUS_IDLE):
+                    conn.rollback()
+            except psycopg2.Error:
+                log.exception('Discarding broken database connection.')
+                close = True
+        if close or conn.closed:
+            if not conn.closed:
+                conn.close()
+            self.opened -= 1
+            # next greenlet will open a new connection instead
+            conn = None
+        self.idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """Context manager lending a connection. Uncommitted changes are
+        rolled back when the block exits."""
+        conn = self.getconn()
+        try:
+            yield conn
+        finally:
+            self.putconn(conn)
+
+    def closeall(self):
+        """Close idle connections, they will be reopened when needed.
+        Connections in use are not affected."""
+        idle = []
+        while True:
+            try:
+                conn = self.idle.get_nowait()
+            except Empty:
+                break
+            if conn is not None:
+                conn.close()
+                self.opened -= 1
+            idle.append(None)
+        for conn in idle:
+            self.idle.put(conn)
+
+    def stats(self):
+        """Return dictionary of pool statistics: connections opened, requests
+        for connections, how many of them had to wait and for how long."""
+        waits = self.waits
+        return {
+            'size': self.size,
+            'connections': self.opened,
+            'requests': self.requests,
+            'waits': len(waits),
+            'wait_time': sum(waits),
+            'wait_max': max(waits) if waits else 0.0,
+            'wait_p95': percentile(waits, 95) or 0.0,
+        }
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+
+import ssl
+import socket
+import httplib
+import logging
+import urllib2
+import urlparse
+import cookielib
+import threading
+
+
+log = logging.getLogger(__name__)
+
+REDIRECT_CODES = (301, 302, 303, 307)
+
+
+class HTTPError(Exception):
+    """Response with error status code or too many redirects."""
+
+
+def is_timeout(e):
+    """Return True if connection error ``e`` is a timeout. Timeouts of SSL
+    sockets are raised as ``ssl.SSLError``, not ``socket.timeout``."""
+    return isinstance(e, socket.timeout) or (
+        isinstance(e, ssl.SSLError) and 'timed out' in str(e))
+
+
+class _CookieResponse(object):
+    """Minimal response wrapper required by ``CookieJar.extract_cookies``."""
+
+    def __init__(self, response):
+        self.response = response
+
+    def info(self):
+        return self.response.msg
+
+
+class HTTPConnectionPool(object):
+    """Keep-alive HTTP(S) connections, reused for requests to the same host.
+
+    Every request takes an idle connection to the url's host from the pool
+    (or opens a new one) and puts it back when the whole response was read
+    and the server did not ask to close it. At most ``maxsize`` idle
+    connections are kept per host.
+
+    Cookies are stored in ``cookies`` jar, which can be shared with urllib2
+    opener used for authentication (see ``auth.install_opener``).
+
+    Connections are plain ``httplib`` ones, so the pool is cooperative after
+    gevent monkey patching.
+    """
+
+    max_redirects = 5
+
+    def __init__(self, maxsize=10, cookies=None, headers=None,
+            ssl_context=None):
+        self.maxsize = maxsize
+        self.cookies = cookies if cookies is not None else cookielib.CookieJar()
+        # Amazon displays 'Please enable cookies (...)' without fake
+        # 'User-agent' header.
+        self.headers = headers or {'User-agent': 'Mozilla/5.0'}
+        self.ssl_context = ssl_context
+        self.lock = threading.Lock()
+        self.idle = {}
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.requests = 0
+        self.connections = 0
+        self.reused = 0
+        self.stale = 0
+
+    def stats(self):
+        """Return dictionary with connection reuse statistics."""
+        return {
+            'requests': self.requests,
+            'connections': self.connections,
+            'reused': self.reused,
+            'stale': self.stale,
+            'reuse_ratio': (float(self.reused) / self.requests
+                if self.requests else 0.0),
+        }
+
+    def _key(self, url):
+        parts = urlparse.urlsplit(url)
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+        return parts.scheme, parts.hostname, port
+
+    def _new_connection(self, key, timeout):
+        scheme, host, port = key
+        self.connections += 1
+        if scheme == 'https':
+            return httplib.HTTPSConnection(host, port, timeout=timeout,
+                context=self.ssl_context)
+        return httplib.HTTPConnection(host, port, timeout=timeout)
+
+    def _get_connection(self, key, timeout):
+        """Return tuple (connection, reused)."""
+        with self.lock:
+            idle = self.idle.get(key)
+            conn = idle.pop() if idle else None
+        if conn is None:
+            return self._new_connection(key, timeout), False
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+        return conn, True
+
+    def _put_connection(self, key, conn):
+        with self.lock:
+            idle = self.idle.setdefault(key, [])
+            if len(idle) < self.maxsize:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def close(self):
+        """Close all idle connections."""
+        with self.lock:
+            idle, self.idle = self.idle, {}
+        for connections in idle.values():
+            for conn in connections:
+                conn.close()
+
+    def _request(self, url, timeout):
+        """Send single GET request, return tuple (response, body)."""
+        key = self._key(url)
+        parts = urlparse.urlsplit(url)
+        path = urlparse.urlunsplit(('', '', parts.path or '/', parts.query,
+            ''))
+        # cookielib works on urllib2 requests only
+        request = urllib2.Request(url, headers=self.headers)
+        self.cookies.add_cookie_header(request)
+        headers = dict(request.header_items())
+
+        conn, reused = self._get_connection(key, timeout)
+        self.requests += 1
+        try:
+            try:
+                conn.request('GET', path, headers=headers)
+                response = conn.getresponse()
+            except (socket.error, httplib.HTTPException) as e:
+                # slow server is not a stale connection, a retry would only
+                # double the time spent waiting
+                if not reused or is_timeout(e):
+                    raise
+                # server has closed idle keep-alive connection, it's not an
+                # error of this request, so retry it using a new connection
+                self.stale += 1
+                conn.close()
+                conn = self._new_connection(key, timeout)
+                conn.request('GET', path, headers=headers)
+                response = conn.getresponse()
+            else:
+                if reused:
+                    self.reused += 1
+            body = response.read()
+        except:
+            conn.close()
+            raise
+
+        self.cookies.extract_cookies(_CookieResponse(response), request)
+        if response.will_close:
+            conn.close()
+        else:
+            self._put_connection(key, conn)
+        return response, body
+
+    def get(self, url, timeout=10):
+        """Return body of the page under ``url``, following redirects.
+
+        Raises ``HTTPError`` for error status codes and ``socket.error``,
+        ``httplib.HTTPException`` or ``ssl.SSLError`` on connection errors.
+        """
+        for i in xrange(self.max_redirects + 1):
+            response, body = self._request(url, timeout)
+            location = response.getheader('location')
+            if response.status in REDIRECT_CODES and location:
+                url = urlparse.urljoin(url, location)
+                continue
+            if response.status >= 400:
+                raise HTTPError('HTTP {0} {1}: {2}'.format(
+                    response.status, response.reason, url))
+            return body
+        raise HTTPError('Too many redirects: {0}'.format(url))
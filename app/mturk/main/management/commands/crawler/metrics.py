@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+
+import math
+import time
+from contextlib import contextmanager
+from collections import defaultdict
+
+
+def percentile(values, p):
+    """Return ``p`` percentile (0-100) of ``values`` using the nearest rank
+    method or None if there are no values."""
+    if not values:
+        return None
+    values = sorted(values)
+    rank = int(math.ceil(p / 100.0 * len(values)))
+    return values[min(max(rank, 1), len(values)) - 1]
+
+
+class CrawlMetrics(object):
+    """Timings gathered by the crawler workers during a single crawl.
+
+    ``record`` returns them as values of ``mturk.main.models.CrawlMetrics``
+    fields.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.started = time.time()
+        # duration of every download attempt, including retried ones
+        self.fetch_latencies = []
+        self.queue_depths = []
+        self.times = defaultdict(float)
+        self.counts = defaultdict(int)
+
+    def count(self, name, n=1):
+        self.counts[name] += n
+
+    @contextmanager
+    def timer(self, name):
+        """Add time spent in the block to ``name`` total."""
+        start_time = time.time()
+        try:
+            yield
+        finally:
+            self.times[name] += time.time() - start_time
+            self.counts[name] += 1
+
+    def add_fetch_latency(self, seconds):
+        self.fetch_latencies.append(seconds)
+
+    def add_queue_depth(self, depth):
+        self.queue_depths.append(depth)
+
+    def record(self, groups, write_time=0.0):
+        """Return dictionary of metrics for crawl that downloaded ``groups``
+        hitgroups. ``write_time`` is time spent by the bulk status writer."""
+        work_time = time.time() - self.started
+        attempts = len(self.fetch_latencies)
+        pages = self.counts['pages']
+        depths = self.queue_depths
+        return {
+            'work_time': work_time,
+            'groups_per_sec': groups / work_time if work_time else None,
+            'fetch_requests': attempts,
+            'fetch_latency_p50': percentile(self.fetch_latencies, 50),
+            'fetch_latency_p95': percentile(self.fetch_latencies, 95),
+            'fetch_latency_p99': percentile(self.fetch_latencies, 99),
+            'retries_per_page': (float(attempts - pages) / pages
+                if pages else None),
+            'detail_fetches': self.counts['detail_fetch'],
+            'detail_fetch_time': self.times['detail_fetch'],
+            'parse_time': self.times['parse'],
+            'db_write_time': self.times['db'] + write_time,
+            'queue_depth_max': max(depths) if depths else None,
+            'queue_depth_avg': (float(sum(depths)) / len(depths)
+                if depths else None),
+        }
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""Scheduling of listing page downloads.
+
+All pages expected to hold the available groups, and a few more catching
+groups posted meanwhile (see listing_pages), are fetched at once through a
+pool of greenlets. The number of groups changes during the crawl, so the
+estimate may fall short: if the last of the expected pages isn't empty - or
+couldn't be downloaded - further pages are fetched in batches until none of
+the batch's pages contains data.
+"""
+
+import logging
+
+import gevent
+from gevent.pool import Pool
+from django.conf import settings
+
+
+log = logging.getLogger(__name__)
+
+
+def listing_pages(groups_available,
+        per_page=getattr(settings, 'CRAWLER_GROUPS_PER_PAGE', 10),
+        extra=getattr(settings, 'CRAWLER_EXTRA_PAGES', 2)):
+    """Return numbers of listing pages expected to hold ``groups_available``
+    groups (``per_page`` groups each, see tasks.hitsearch_url), followed by
+    ``extra`` pages catching groups posted meanwhile. Empty list if the number
+    of groups is not known."""
+    if not groups_available:
+        return []
+    return range(1, -(-groups_available // per_page) + extra + 1)
+
+
+def fetch_page(fetch, page_nr):
+    """Return tuple (page_nr, groups returned by ``fetch``, False if the page
+    couldn't be downloaded). A failed download is not an empty page."""
+    try:
+        return page_nr, fetch(page_nr) or [], True
+    except Exception:
+        log.exception('Fetching listing page %s failed.', page_nr)
+        return page_nr, [], False
+
+
+def iter_listing_pages(fetch, groups_available, pool_size, batch_size,
+        per_page=getattr(settings, 'CRAWLER_GROUPS_PER_PAGE', 10),
+        extra=getattr(settings, 'CRAWLER_EXTRA_PAGES', 2)):
+    """Generate lists of groups found on listing pages, calling ``fetch`` with
+    the page number to download a page.
+
+    Expected pages are fetched by ``pool_size`` greenlets and returned as
+    soon as they are downloaded, in no particular order. Further pages are
+    fetched in batches of ``batch_size()`` pages (eg. the scheduler's current
+    concurrency).
+    """
+    pages = listing_pages(groups_available, per_page, extra)
+    i = 1
+    if pages:
+        log.info('Fetching {0} listing pages expected to hold {1} '
+            'groups.'.format(len(pages), groups_available))
+        last_page_empty = last_page_failed = False
+        pool = Pool(pool_size)
+        try:
+            for page_nr, hgs, fetched in pool.imap_unordered(
+                    lambda page_nr: fetch_page(fetch, page_nr), pages):
+                if page_nr == pages[-1]:
+                    last_page_empty = fetched and not hgs
+                    last_page_failed = not fetched
+                if hgs:
+                    log.debug('yielding hits group: %s', len(hgs))
+                    yield hgs
+        finally:
+            pool.kill()
+        if last_page_empty:
+            return
+        if last_page_failed:
+            # fetched again, together with the following pages
+            i = pages[-1]
+            log.warning('Page {0} failed, fetching it and further '
+                'pages.'.format(pages[-1]))
+        else:
+            i = pages[-1] + 1
+            log.info('Page {0} is not empty, fetching further pages.'.format(
+                pages[-1]))
+
+    while True:
+        pages = range(i, i + batch_size())
+        i += len(pages)
+        log.debug('Processing pages: {0}'.format(pages))
+        jobs = [gevent.spawn(fetch_page, fetch, page_nr) for page_nr in pages]
+        gevent.joinall(jobs)
+
+        hgs = []
+        failed = []
+        for job in jobs:
+            page_nr, page_hgs, fetched = job.value
+            hgs.extend(page_hgs)
+            if not fetched:
+                failed.append(page_nr)
+
+        # if no data was returned, end - previous page was probably the
+        # last one with results
+        if not hgs:
+            if failed:
+                log.warning('Pages {0} failed and no other page of the batch '
+                    'contains data, exiting.'.format(failed))
+            log.info('None of the pages {0} contains data, assuming all '
+                'pages were processed, exiting.'.format(pages))
+            break
+
+        log.debug('yielding hits group: %s', len(hgs))
+        yield hgs
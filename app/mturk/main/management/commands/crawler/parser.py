@@ -4,6 +4,8 @@ import re
 import datetime
 import logging
 
+from django.conf import settings
+
 log = logging.getLogger(__name__)
 
 
@@ -206,33 +208,236 @@ def hits_mainpage(html):
     return int(matched.replace(',', ''))
 
 
-def hits_group_listinfo(html):
+def _listinfo_result(res):
+    """Convert raw strings of a single listing row into python objects."""
+    # make parse result more polite and convert to python objects
+    res['reward'] = float(res['reward'])
+    res['hit_expiration_date'] = datetime.datetime.strptime(
+            res['hit_expiration_date'], '%b %d, %Y')
+    res['hits_available'] = int(res['hits_available'])
+    res['keywords'] = _RX_HITS_LIST_KEYWORDS.findall(res['keywords'])
+    qualifications = _RX_HITS_LIST_QUALIFICATIONS.findall(
+        res['qualifications'])
+    res['qualifications'] = [rm_dup_whitechas(q) for q in qualifications]
+    # group id is not always available but hit id in the 'why' link should
+    # point to correct group id
+    res['hit_id'] = res.get('hit_id', None)
+    res['group_id'] = res.get('group_id', None)
+    # convert time allotated to seconds
+    res['time_alloted'] = human_timedelta_seconds(res['time_alloted'])
+    return res
+
+
+def hits_group_listinfo_regex(html):
+    """Listing parser using single ``_RX_HITS_LIST`` regular expression."""
+    rx_i = _RX_HITS_LIST.finditer(html)
+    for rx in rx_i:
+        yield _listinfo_result(rx.groupdict())
+
+
+class _ScanError(Exception):
+    """Listing row doesn't contain expected fields."""
+
+
+_RX_SCAN_ROW = re.compile(r'<a\s+class="capsulelink"[^>]*>')
+_RX_SCAN_TD = re.compile(r'<td[^>]*>')
+_RX_SCAN_TR = re.compile(r'<tr[^>]*>')
+_RX_SCAN_ID_END = re.compile(r'[&"]')
+_RX_SCAN_EXPIRATION = re.compile(r'HIT\s+Expiration\s+Date')
+_RX_SCAN_TIME_ALLOTED = re.compile(r'Time\s+Allotted')
+_RX_SCAN_HITS_AVAILABLE = re.compile(r'HITs\s+Available')
+_RX_SCAN_QUALIFICATIONS = re.compile(r'Qualifications\s+Required')
+# values, matched right after the opening <td> tag
+_RX_SCAN_EXPIRATION_VALUE = re.compile(r'([^&]*)&')
+_RX_SCAN_REWARD_VALUE = \
+    re.compile(r'(?:<span[^>]*>)?\$([\.\d]*)(?:</span>)?</td>')
+_RX_SCAN_HITS_AVAILABLE_VALUE = re.compile(r'(\d+)</td>')
+_RX_SCAN_WHITECHARS = re.compile(r'\s*')
+
+
+class _RowScanner(object):
+    """Extracts fields of a single listing row from ``html[pos:end]``.
+
+    Fields are found in the same order and using the same anchors as
+    ``_RX_HITS_LIST``, but every step is a forward search that never goes
+    back and values are looked for inside their own table cell only, so the
+    time is linear in the row length.
+    """
+
+    def __init__(self, html, pos, end):
+        self.html = html
+        self.pos = pos
+        self.end = end
+
+    def find(self, sub, end=None):
+        """Move after the first occurrence of ``sub`` and return its index."""
+        i = self.html.find(sub, self.pos, end or self.end)
+        if i == -1:
+            raise _ScanError(sub)
+        self.pos = i + len(sub)
+        return i
+
+    def search(self, rx):
+        m = rx.search(self.html, self.pos, self.end)
+        if m is None:
+            raise _ScanError(rx.pattern)
+        self.pos = m.end()
+        return m
+
+    def upto(self, sub):
+        """Return text up to ``sub`` and move after it."""
+        start = self.pos
+        return self.html[start:self.find(sub)]
+
+    def url_param(self, name):
+        """Return value of the next ``name`` url parameter."""
+        self.find(name + '=')
+        start = self.pos
+        return self.html[start:self.search(_RX_SCAN_ID_END).start()]
+
+    def cells(self, limit=None):
+        """Yield tuples (content start, content end) of table cells following
+        current position. With ``limit``, only cells starting within that many
+        characters are returned."""
+        html = self.html
+        td = _RX_SCAN_TD.search(html, self.pos, self.end)
+        while td is not None:
+            if limit is not None and td.start() > self.pos + limit:
+                return
+            end = html.find('</td>', td.end(), self.end)
+            if end == -1:
+                return
+            yield td.end(), end
+            td = _RX_SCAN_TD.search(html, td.end(), self.end)
+
+    def td_value(self, rx, limit=None):
+        """Return match of ``rx`` against the first cell, for which it
+        matches."""
+        for start, end in self.cells(limit):
+            m = rx.match(self.html, start, end + len('</td>'))
+            if m is not None:
+                self.pos = m.end()
+                return m
+        raise _ScanError(rx.pattern)
+
+    def td_text(self, strip=False):
+        """Return whole content of the next cell."""
+        for start, end in self.cells():
+            self.pos = end + len('</td>')
+            text = self.html[start:end]
+            return text.strip() if strip else text
+        raise _ScanError('<td>')
+
+    def requester(self):
+        """Return tuple (requester id, requester name) from the first cell
+        containing just the requester link."""
+        html = self.html
+        for start, end in self.cells():
+            start = _RX_SCAN_WHITECHARS.match(html, start).end()
+            tag_end = html.find('>', start, end)
+            if not html.startswith('<a', start) or tag_end == -1:
+                continue
+            id_start = html.rfind('requesterId=', start, tag_end)
+            if id_start == -1:
+                continue
+            id_start += len('requesterId=')
+            id_end = _RX_SCAN_ID_END.search(html, id_start, end)
+            if id_end is None:
+                continue
+            name_start = html.find('>', id_end.end(), end) + 1
+            name_end = html.rfind('</a>', name_start, end)
+            if name_start and name_end != -1 and \
+                    not html[name_end + len('</a>'):end].strip():
+                self.pos = end + len('</td>')
+                return html[id_start:id_end.start()], html[name_start:name_end]
+        raise _ScanError('requester')
+
+    def row(self):
+        res = {'hit_id': None, 'group_id': None}
+        res['title'] = self.upto('</a>').strip()
+
+        # hit and group ids are optional, only the ones found before the
+        # requester are taken
+        requester = self.html.find('Requester', self.pos, self.end)
+        if requester == -1:
+            raise _ScanError('Requester')
+        hit_id = self.html.find('hitId=', self.pos, requester)
+        group_id = self.html.find('groupId=', self.pos, requester)
+        if hit_id != -1 and (group_id == -1 or hit_id < group_id):
+            res['hit_id'] = self.url_param('hitId')
+            group_id = self.html.find('groupId=', self.pos, requester)
+        if group_id != -1:
+            res['group_id'] = self.url_param('groupId')
+        self.find('Requester')
+        res['requester_id'], res['requester_name'] = self.requester()
+
+        self.search(_RX_SCAN_EXPIRATION)
+        res['hit_expiration_date'] = self.td_value(
+            _RX_SCAN_EXPIRATION_VALUE).group(1)
+
+        self.search(_RX_SCAN_TIME_ALLOTED)
+        res['time_alloted'] = self.td_text()
+
+        # reward value is expected close to its label
+        while 'reward' not in res:
+            self.find('Reward')
+            try:
+                res['reward'] = self.td_value(_RX_SCAN_REWARD_VALUE,
+                    limit=200).group(1)
+            except _ScanError:
+                pass
+
+        self.search(_RX_SCAN_HITS_AVAILABLE)
+        res['hits_available'] = self.td_value(
+            _RX_SCAN_HITS_AVAILABLE_VALUE).group(1)
+
+        self.find('Description:')
+        res['description'] = self.td_text()
+
+        self.find('Keywords')
+        res['keywords'] = self.td_text(strip=True)
+
+        self.search(_RX_SCAN_QUALIFICATIONS)
+        self.search(_RX_SCAN_TR)
+        res['qualifications'] = self.upto('</table>')
+        return res
+
+
+def hits_group_listinfo_scanner(html):
+    """Listing parser scanning every row separately, without backtracking.
+
+    Rows are split on title links, so a malformed row is skipped instead of
+    being matched against fields of the following rows. The parse time is
+    linear in the page size.
+    """
+    starts = list(_RX_SCAN_ROW.finditer(html))
+    for n, m in enumerate(starts):
+        end = starts[n + 1].start() if n + 1 < len(starts) else len(html)
+        try:
+            res = _RowScanner(html, m.end(), end).row()
+        except _ScanError, e:
+            log.debug('Malformed listing row %s, missing %s', n, e)
+            continue
+        yield _listinfo_result(res)
+
+
+LISTING_PARSERS = {
+    'regex': hits_group_listinfo_regex,
+    'scanner': hits_group_listinfo_scanner,
+}
+
+
+def hits_group_listinfo(html, engine=None):
     """Yield info about every hits group found in given html string
 
     Page should be fetched from
     https://www.mturk.com/mturk/findhits?match=false
+
+    Parser engine is chosen by ``CRAWLER_LISTING_PARSER`` setting, unless
+    ``engine`` is given.
     """
-    rx_i = _RX_HITS_LIST.finditer(html)
-    for rx in rx_i:
-        res = rx.groupdict()
-
-        # make parse result more polite and convert to python objects
-        res['reward'] = float(res['reward'])
-        res['hit_expiration_date'] = datetime.datetime.strptime(
-                res['hit_expiration_date'], '%b %d, %Y')
-        res['hits_available'] = int(res['hits_available'])
-        res['keywords'] = _RX_HITS_LIST_KEYWORDS.findall(res['keywords'])
-        qualifications = _RX_HITS_LIST_QUALIFICATIONS.findall(
-            res['qualifications'])
-        res['qualifications'] = [rm_dup_whitechas(q) for q in qualifications]
-        # group id is not always available but hit id in the 'why' link should
-        # point to correct group id
-        res['hit_id'] = res.get('hit_id', None)
-        res['group_id'] = res.get('group_id', None)
-        # convert time allotated to seconds
-        res['time_alloted'] = human_timedelta_seconds(res['time_alloted'])
-
-        yield res
+    engine = engine or getattr(settings, 'CRAWLER_LISTING_PARSER', 'scanner')
+    return LISTING_PARSERS[engine](html)
 
 
 def hits_group_details(html):
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+
+import time
+import random
+import logging
+import threading
+
+
+log = logging.getLogger(__name__)
+
+
+class FetchScheduler(object):
+    """Rate limit aware scheduler for mturk requests.
+
+    Requests are allowed by a token bucket refilled with ``rate`` tokens per
+    second and by a limit of ``concurrency`` requests in flight. Both values
+    follow AIMD rules: they grow additively after every ``increase_every``
+    clean responses and are cut multiplicatively when mturk responds with its
+    "limit exceeded" page, so the scheduler learns the sustainable request
+    rate. Failed attempts are retried after an exponential backoff with full
+    jitter.
+
+    This class does not depend on gevent - pass ``gevent.sleep`` as ``sleep``
+    to make it cooperative.
+    """
+
+    # how long to wait before checking the bucket again, when the number of
+    # requests in flight is exceeded
+    poll_interval = 0.05
+
+    def __init__(self, rate=5.0, min_rate=0.5, max_rate=50.0,
+            rate_increase=0.5, rate_decrease=0.5, concurrency=3,
+            max_concurrency=9, increase_every=20, backoff_base=0.1,
+            backoff_max=10.0, cooldown=1.0, sleep=time.sleep,
+            clock=time.time):
+        self.rate = float(rate)
+        self.min_rate = float(min_rate)
+        self.max_rate = float(max_rate)
+        self.rate_increase = rate_increase
+        self.rate_decrease = rate_decrease
+        self.max_concurrency = max_concurrency
+        self.concurrency = min(concurrency, max_concurrency)
+        self.increase_every = increase_every
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.cooldown = cooldown
+        self.sleep = sleep
+        self.clock = clock
+
+        self.lock = threading.Lock()
+        self.tokens = 1.0
+        self.last_refill = clock()
+        self.last_decrease = None
+        self.inflight = 0
+        self.clean = 0
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Start collecting statistics from scratch, eg. for a new crawl."""
+        self.started = self.clock()
+        self.requests = 0
+        self.throttles = 0
+        self.errors = 0
+        self.waited = 0.0
+
+    def set_max_concurrency(self, max_concurrency):
+        self.max_concurrency = max_concurrency
+        self.concurrency = min(self.concurrency, max_concurrency)
+
+    def _refill(self):
+        now = self.clock()
+        burst = max(1.0, float(self.concurrency))
+        self.tokens = min(burst,
+            self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+    def acquire(self):
+        """Block until next request can be sent."""
+        start_time = self.clock()
+        while True:
+            with self.lock:
+                self._refill()
+                if self.inflight < self.concurrency and self.tokens >= 1:
+                    self.tokens -= 1
+                    self.inflight += 1
+                    self.requests += 1
+                    self.waited += self.clock() - start_time
+                    return
+                if self.inflight >= self.concurrency:
+                    wait = self.poll_interval
+                else:
+                    wait = max(0.001, (1 - self.tokens) / self.rate)
+            self.sleep(wait)
+
+    def release(self, throttled=False, failed=False):
+        """Report the result of request allowed by the last ``acquire``."""
+        with self.lock:
+            self.inflight -= 1
+            if throttled:
+                self.throttles += 1
+                self._decrease()
+            elif failed:
+                self.errors += 1
+            else:
+                self.clean += 1
+                if self.clean >= self.increase_every:
+                    self._increase()
+
+    def _decrease(self):
+        self.clean = 0
+        now = self.clock()
+        # many requests in flight will be throttled at once, treat them as a
+        # single signal
+        if self.last_decrease and now - self.last_decrease < self.cooldown:
+            return
+        self.last_decrease = now
+        self.rate = max(self.min_rate, self.rate * self.rate_decrease)
+        self.concurrency = max(1, self.concurrency / 2)
+        log.debug('Limit exceeded, request rate decreased to %.2f/s, '
+            'concurrency %s', self.rate, self.concurrency)
+
+    def _increase(self):
+        self.clean = 0
+        self.rate = min(self.max_rate, self.rate + self.rate_increase)
+        self.concurrency = min(self.max_concurrency, self.concurrency + 1)
+
+    def backoff(self, attempt):
+        """Sleep before retrying request for the ``attempt`` time."""
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1))
+        self.sleep(random.uniform(0, delay))
+
+    def fetch(self, url, download, is_limit_exceeded, retries=1000,
+            warn_after=None, max_time=None):
+        """Download ``url`` using ``download`` function, retrying on errors
+        (empty result) and limit exceeded responses. Return None if retry
+        limit was exceeded or, if ``max_time`` is given, no retry is started
+        after ``max_time`` seconds since the first attempt.
+        """
+        start_time = self.clock()
+        for attempt in xrange(1, retries + 1):
+            self.acquire()
+            html = ''
+            try:
+                html = download(url)
+            finally:
+                throttled = bool(html) and is_limit_exceeded(html)
+                self.release(throttled=throttled, failed=not html)
+            if html and not throttled:
+                return html
+
+            level = logging.DEBUG
+            if warn_after is not None and attempt > warn_after:
+                level = logging.WARNING
+            log.log(level, ('{0}, retrying download: {1}/{2} (rate {3:.2f}/s)'
+                '\nurl: {4}').format(
+                    'Limit exceeded' if throttled else 'Download failed',
+                    attempt, retries, self.rate, url))
+            if max_time is not None and (
+                    self.clock() - start_time >= max_time):
+                log.warning('Giving up download after {0:.1f} seconds and '
+                    '{1} attempts\nurl: {2}'.format(
+                        self.clock() - start_time, attempt, url))
+                break
+            self.backoff(attempt)
+        return None
+
+    def stats(self):
+        """Return dictionary with statistics gathered since the last
+        ``reset_stats`` call."""
+        elapsed = self.clock() - self.started
+        return {
+            'requests': self.requests,
+            'throttles': self.throttles,
+            'errors': self.errors,
+            'waited': self.waited,
+            'elapsed': elapsed,
+            'req_per_sec': self.requests / elapsed if elapsed else 0.0,
+            'rate': self.rate,
+            'concurrency': self.concurrency,
+        }
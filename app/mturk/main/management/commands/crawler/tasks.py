@@ -1,60 +1,90 @@
 # -*- coding: utf-8 -*-
 
 import ssl
+import time
+import socket
+import httplib
 import logging
-import urllib2
 import datetime
 import hashlib
 
 import gevent
-from gevent import thread
 
 import parser
 from db import DB
+from scheduler import FetchScheduler
+from httppool import HTTPConnectionPool, HTTPError
+from metrics import CrawlMetrics
 from django.conf import settings
 
 
 log = logging.getLogger(__name__)
 
+# keep-alive connections shared by all workers, its cookie jar holds the
+# authenticated mturk session
+http_pool = HTTPConnectionPool(maxsize=settings.CRAWLER_HTTP_POOL_SIZE)
+
+# timings of the current crawl, reset by the crawl command
+metrics = CrawlMetrics()
+
 
 def _download_html(url, timeout=10):
     """Get page code using given url. If server won't response in `timeout`
     seconds, return empty string.
     """
+    start_time = time.time()
     try:
-        return urllib2.urlopen(url, timeout=timeout).read()
-    except (urllib2.URLError, ssl.SSLError):
+        return http_pool.get(url, timeout=timeout)
+    except (HTTPError, socket.error, httplib.HTTPException, ssl.SSLError):
         pass
+    finally:
+        metrics.add_fetch_latency(time.time() - start_time)
     # except (urllib2.URLError, ssl.SSLError), e:
     #     log.error('%s;;%s;;%s', type(e).__name__, url, e.args)
     return ''
 
 
+# scheduler of all requests sent to mturk, it learns the sustainable request
+# rate, so it's kept for the whole process life
+fetch_scheduler = FetchScheduler(
+    rate=settings.CRAWLER_FETCH_RATE,
+    min_rate=settings.CRAWLER_FETCH_MIN_RATE,
+    max_rate=settings.CRAWLER_FETCH_MAX_RATE,
+    backoff_base=settings.CRAWLER_RETRY_SLEEP,
+    backoff_max=settings.CRAWLER_RETRY_MAX_SLEEP,
+    sleep=gevent.sleep)
+
+# requests to other hosts (iframe sources) are not rate limited, only retried
+external_scheduler = FetchScheduler(
+    rate=1000, max_rate=1000, concurrency=1000, max_concurrency=1000,
+    backoff_base=settings.CRAWLER_RETRY_SLEEP,
+    backoff_max=settings.CRAWLER_RETRY_MAX_SLEEP,
+    sleep=gevent.sleep)
+
+
 def _get_html(url, timeout=settings.CRAWLER_FETCH_TIMEOUT,
-        sleep=settings.CRAWLER_RETRY_SLEEP,
         retries=settings.CRAWLER_RETRY_COUNT):
-    while retries > 0:
-        html = _download_html(url, timeout=timeout)
-
-        if html == '' or parser.is_limit_exceeded(html):
-            rs = settings.CRAWLER_RETRY_COUNT - retries + 1
+    """Download given url, retrying on errors and limit exceeded responses.
 
-            if rs > settings.CRAWLER_RETRY_WARNING:
-                level = logging.WARNING
-            else:
-                level = logging.DEBUG
-
-            log.log(level, ('Limit exceeded, retrying download: {0}/{1} ({2}'
-                ' sleep)\nurl: {3}').format(
-                rs, settings.CRAWLER_RETRY_COUNT, sleep, url))
-            gevent.sleep(sleep)
-            retries -= 1
-        else:
-            return html
+    Requests sent to mturk are paced by ``fetch_scheduler``, other ones are
+    only retried with exponential backoff.
+    """
+    if url.startswith(settings.MTURK_PAGE):
+        scheduler = fetch_scheduler
     else:
-        log.warning('Downloader retry limit exceeded. Either the limit '
-            'is too small, some unknown bug was encountered or there is a '
-            'connection error.')
+        scheduler = external_scheduler
+
+    metrics.count('pages')
+    html = scheduler.fetch(url,
+        lambda url: _download_html(url, timeout=timeout),
+        parser.is_limit_exceeded, retries=retries,
+        warn_after=settings.CRAWLER_RETRY_WARNING,
+        max_time=settings.CRAWLER_RETRY_MAX_TIME)
+    if html is None:
+        log.warning('Downloader retry or time limit exceeded. Either the '
+            'limits are too small, some unknown bug was encountered or there '
+            'is a connection error.')
+    return html
 
 
 def hitsearch_url(page=1):
@@ -109,11 +139,12 @@ def hits_groups_info(page_nr,
     url = hitsearch_url(page_nr)
     html = _get_html(url)
     rows = []
-    for n, info in enumerate(parser.hits_group_listinfo(html)):
-        __fix_missing_hash(info)
-        info['page_number'] = page_nr
-        info['inpage_position'] = n + 1
-        rows.append(info)
+    with metrics.timer('parse'):
+        for n, info in enumerate(parser.hits_group_listinfo(html)):
+            __fix_missing_hash(info)
+            info['page_number'] = page_nr
+            info['inpage_position'] = n + 1
+            rows.append(info)
     log.debug('hits_groups_info done: %s;;%s', page_nr, len(rows))
 
     if not rows:
@@ -126,7 +157,8 @@ def hits_group_info(group_id):
     """Return info about given hits group"""
     url = group_url(group_id)
     html = _get_html(url)
-    data = parser.hits_group_details(html)
+    with metrics.timer('parse'):
+        data = parser.hits_group_details(html)
     if not data:
         log.warning('Could not fetch hit group info: {0}'.format(group_id))
     # additional fetch of example task
@@ -146,11 +178,17 @@ def hits_groups_total():
     return parser.hits_group_total(html)
 
 
-def process_group(hg, crawl_id, requesters, processed_groups, dbpool):
+def process_group(hg, crawl_id, requesters, processed_groups, dbpool,
+        writer, content_ids, fingerprints):
     """Gevent worker that should process single hitgroup.
 
     This should write some data into database and do not return any important
-    data.
+    data. Content of new hitgroups is written immediately, hitgroup status is
+    passed to ``writer`` that will write it in bulk. Content ids are looked up
+    in ``content_ids`` cache first and only missing ones are queried. Details
+    of new groups are not downloaded if ``fingerprints`` cache knows html of
+    an identical group. Connections of ``dbpool`` are held only while
+    querying, not during downloads.
     """
     hg['keywords'] = ', '.join(hg['keywords'])
     # for those hit goups that does not contain hash group, create one and
@@ -158,10 +196,21 @@ def process_group(hg, crawl_id, requesters, processed_groups, dbpool):
 
     hg['qualifications'] = ', '.join(hg['qualifications'])
 
-    conn = dbpool.getconn(thread.get_ident())
-    db = DB(conn)
     try:
-        hit_group_content_id = db.hit_group_content_id(hg['group_id'])
+        hit_group_content_id = content_ids.get(hg['group_id'])
+        html = None
+        if hit_group_content_id is None:
+            # connection is not held while group details are downloaded
+            with dbpool.connection() as conn:
+                db = DB(conn)
+                with metrics.timer('db'):
+                    hit_group_content_id = db.hit_group_content_id(
+                        hg['group_id'])
+                if (hit_group_content_id is None and
+                        not hg['group_id_hashed'] and
+                        not settings.CRAWLER_FORCE_DETAIL_FETCH):
+                    html = fingerprints.get(db, hg)
+                db.curr.close()
         if hit_group_content_id is None:
             # check if there's profile for current requester and if does
             # exists with non-public status, then setup non public status for
@@ -175,28 +224,39 @@ def process_group(hg, crawl_id, requesters, processed_groups, dbpool):
             # required by hitgroup content table
             hg['occurrence_date'] = datetime.datetime.now()
             hg['first_crawl_id'] = crawl_id
-            if not hg['group_id_hashed']:
+            if hg['group_id_hashed']:
                 # if group_id is hashed, we cannot fetch details because we
                 # don't know what the real hash is
-                hg.update(hits_group_info(hg['group_id']))
-            else:
                 hg['html'] = ''
-            hit_group_content_id = db.insert_hit_group_content(hg)
+            elif html is None:
+                with metrics.timer('detail_fetch'):
+                    hg.update(hits_group_info(hg['group_id']))
+                fingerprints.add(hg, hg['html'])
+            else:
+                log.debug('reusing html of identical group: %s',
+                    hg['group_id'])
+                hg['html'] = html
+            with dbpool.connection() as conn:
+                db = DB(conn)
+                try:
+                    with metrics.timer('db'):
+                        hit_group_content_id = db.insert_hit_group_content(hg)
+                        conn.commit()
+                finally:
+                    db.curr.close()
             log.debug('new hit group content: %s;;%s',
                     hit_group_content_id, hg['group_id'])
+        content_ids.add(hg['group_id'], hit_group_content_id)
 
         hg['hit_group_content_id'] = hit_group_content_id
         hg['crawl_id'] = crawl_id
         hg['now'] = datetime.datetime.now()
-        db.insert_hit_group_status(hg)
-        conn.commit()
+        writer.add(hg)
     except Exception:
+        # uncommitted changes are rolled back by the pool
         processed_groups.remove(hg['group_id'])
         log.exception('process_group fail - rollback')
-        conn.rollback()
     finally:
-        db.curr.close()
-        dbpool.putconn(conn, thread.get_ident())
         msg = ('This really should not happen, Hitgroupstatus was processed but'
             ' is not on the list, race condition?')
         assert hg['group_id'] in processed_groups, msg
@@ -1 +1,8 @@
 from test_parser import *
+from test_scheduler import *
+from test_httppool import *
+from test_cache import *
+from test_metrics import *
+from test_dbpool import *
+from test_arrivals import *
+from test_pages import *
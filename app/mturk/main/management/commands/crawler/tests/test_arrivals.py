@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+
+import shutil
+import datetime
+import tempfile
+import unittest
+from collections import namedtuple
+
+from mturk.main import snapshots
+from mturk.main.management.commands.crawler.arrivals import (write_arrivals,
+    previous_snapshot)
+
+
+Crawl = namedtuple('Crawl', 'id start_time has_hits_mv')
+
+
+class Cursor(object):
+    """Stands for a psycopg2 cursor, records executed queries."""
+
+    def __init__(self, rowcount=1):
+        self.queries = []
+        self.rowcount = rowcount
+
+    def mogrify(self, query, params):
+        return query % tuple(repr(param) for param in params)
+
+    def execute(self, query, params=None):
+        self.queries.append((' '.join(query.split()), params))
+
+    def staged(self):
+        return [query for query, params in self.queries
+            if query.startswith('INSERT INTO crawl_arrivals_staging')]
+
+
+class TestWriteArrivals(unittest.TestCase):
+
+    def setUp(self):
+        self.previous = Crawl(1, datetime.datetime(2012, 6, 1, 12, 0), True)
+        self.crawl = Crawl(2, datetime.datetime(2012, 6, 1, 12, 20), True)
+
+    def test_against_previous_crawl(self):
+        curr = Cursor()
+        updated = write_arrivals(curr, self.crawl, self.previous,
+            {'posted': 3}, {'consumed': 4})
+        # posted hits go to rows of the crawl, consumed ones to rows of the
+        # previous crawl
+        self.assertEqual(curr.staged(), ["INSERT INTO crawl_arrivals_staging "
+            "VALUES (2, 'posted', 3, None), (1, 'consumed', None, 4)"])
+        params = [params for query, params in curr.queries
+            if query.startswith('UPDATE hits_mv')]
+        self.assertEqual(params, [
+            (self.crawl.start_time, self.previous.start_time),
+            (self.crawl.start_time, self.crawl.id, self.crawl.id)])
+        self.assertEqual(curr.queries[-1],
+            ('UPDATE main_crawl SET has_diffs = true WHERE id = %s', (2, )))
+        self.assertEqual(updated, 2)
+
+    def test_chunks(self):
+        curr = Cursor()
+        write_arrivals(curr, self.crawl, self.previous,
+            dict(('g%s' % i, i) for i in range(1, 6)), {}, chunk_size=2)
+        self.assertEqual(len(curr.staged()), 3)
+
+    def test_nothing_changed(self):
+        # groups posted for the first time and has_diffs are still written
+        curr = Cursor()
+        write_arrivals(curr, self.crawl, self.previous, {}, {})
+        self.assertEqual(curr.staged(), [])
+        self.assertEqual(curr.queries[-1][1], (2, ))
+
+
+class TestPreviousSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.previous = Crawl(1, datetime.datetime(2012, 6, 1, 12, 0), True)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def write(self, crawl):
+        snapshots.write_snapshot(snapshots.snapshot_path(crawl.id, self.path),
+            crawl.id, crawl.start_time, {'A1': (1, 0.1, 1, 1)})
+
+    def test_first_crawl(self):
+        self.assertEqual(previous_snapshot(None, path=self.path), None)
+
+    def test_previous_crawl_without_hits_mv(self):
+        self.write(self.previous)
+        self.assertEqual(previous_snapshot(self.previous._replace(
+            has_hits_mv=False), path=self.path), None)
+
+    def test_missing_snapshot(self):
+        self.assertEqual(previous_snapshot(self.previous, path=self.path),
+            None)
+
+    def test_broken_snapshot(self):
+        with open(snapshots.snapshot_path(1, self.path), 'w') as f:
+            f.write('MTSNAP')
+        self.assertEqual(previous_snapshot(self.previous, path=self.path),
+            None)
+
+    def test_read_from_file(self):
+        self.write(self.previous)
+        snapshot = previous_snapshot(self.previous, path=self.path)
+        self.assertEqual(snapshot.crawl_id, 1)
+        snapshot.close()
+
+    def test_last_snapshot_is_reused(self):
+        self.write(self.previous)
+        self.write(Crawl(3, self.previous.start_time, True))
+        last = snapshots.Snapshot(snapshots.snapshot_path(1, self.path))
+        self.assertTrue(previous_snapshot(self.previous, last,
+            self.path) is last)
+        other = snapshots.Snapshot(snapshots.snapshot_path(3, self.path))
+        snapshot = previous_snapshot(self.previous, other, self.path)
+        self.assertEqual(snapshot.crawl_id, 1)
+        for s in (last, other, snapshot):
+            s.close()
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+
+from mturk.main.management.commands.crawler.cache import FingerprintCache
+
+
+class StoredGroups(object):
+    """Stands for crawler.db.DB, knows html of given fingerprints."""
+
+    def __init__(self, html=None):
+        self.html = html or {}
+        self.lookups = 0
+
+    def sibling_html(self, *fingerprint):
+        self.lookups += 1
+        return self.html.get(fingerprint)
+
+
+def group(title='title', reward=0.1, description='description'):
+    return {'requester_id': 'A1', 'title': title, 'reward': reward,
+        'description': description}
+
+
+class TestFingerprintCache(unittest.TestCase):
+
+    def test_downloaded_html_is_reused(self):
+        cache = FingerprintCache()
+        db = StoredGroups()
+        self.assertEqual(cache.get(db, group()), None)
+        cache.add(group(), '<html>')
+        self.assertEqual(cache.get(db, group()), '<html>')
+        self.assertEqual(db.lookups, 1)
+        self.assertEqual(cache.avoided, 1)
+
+    def test_fingerprint_fields(self):
+        cache = FingerprintCache()
+        db = StoredGroups()
+        cache.add(group(), '<html>')
+        for data in (group(title='other'), group(reward=0.2),
+                group(description='other')):
+            self.assertEqual(cache.get(db, data), None)
+        self.assertEqual(cache.avoided, 0)
+
+    def test_stored_html_is_reused(self):
+        cache = FingerprintCache()
+        db = StoredGroups({FingerprintCache.fingerprint(group()): '<html>'})
+        self.assertEqual(cache.get(db, group()), '<html>')
+        self.assertEqual(cache.get(db, group()), '<html>')
+        self.assertEqual(db.lookups, 1)
+        self.assertEqual(cache.avoided, 2)
+
+    def test_empty_html_is_not_cached(self):
+        cache = FingerprintCache()
+        cache.add(group(), '')
+        self.assertEqual(cache.get(StoredGroups(), group()), None)
+
+    def test_least_recently_used_are_removed(self):
+        cache = FingerprintCache(max_size=2)
+        db = StoredGroups()
+        cache.add(group('a'), 'a')
+        cache.add(group('b'), 'b')
+        cache.get(db, group('a'))
+        cache.add(group('c'), 'c')
+        self.assertEqual(len(cache.html), 2)
+        self.assertEqual(cache.get(db, group('b')), None)
+        self.assertEqual(cache.get(db, group('a')), 'a')
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+
+import gevent
+from psycopg2 import extensions
+
+from mturk.main.management.commands.crawler.dbpool import (
+    DBConnectionPool, PoolTimeout)
+
+
+class FakeConnection(object):
+    """Stands for psycopg2 connection."""
+
+    def __init__(self, dsn):
+        self.dsn = dsn
+        self.closed = False
+        self.status = extensions.TRANSACTION_STATUS_IDLE
+        self.rollbacks = 0
+
+    def get_transaction_status(self):
+        return self.status
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.status = extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = True
+
+
+class TestDBConnectionPool(unittest.TestCase):
+
+    def test_connections_opened_lazily_and_reused(self):
+        pool = DBConnectionPool('dbname=test', size=2, connect=FakeConnection)
+        with pool.connection() as conn:
+            self.assertEqual(conn.dsn, 'dbname=test')
+        with pool.connection() as other:
+            self.assertTrue(other is conn)
+        self.assertEqual(pool.stats()['connections'], 1)
+        self.assertEqual(pool.stats()['requests'], 2)
+        self.assertEqual(pool.stats()['waits'], 0)
+
+    def test_workers_wait_for_connections(self):
+        pool = DBConnectionPool('dbname=test', size=2, connect=FakeConnection)
+        used = []
+
+        def worker():
+            with pool.connection() as conn:
+                used.append(conn)
+                gevent.sleep(0.01)
+
+        gevent.joinall([gevent.spawn(worker) for i in xrange(6)])
+        stats = pool.stats()
+        self.assertEqual(len(used), 6)
+        self.assertEqual(len(set(used)), 2)
+        self.assertEqual(stats['connections'], 2)
+        self.assertEqual(stats['waits'], 4)
+        self.assertTrue(stats['wait_max'] > 0)
+
+    def test_timeout(self):
+        pool = DBConnectionPool('dbname=test', size=1, timeout=0.01,
+            connect=FakeConnection)
+        conn = pool.getconn()
+        self.assertRaises(PoolTimeout, pool.getconn)
+        pool.putconn(conn)
+        self.assertTrue(pool.getconn() is conn)
+
+    def test_open_transaction_rolled_back_and_broken_connection_replaced(self):
+        pool = DBConnectionPool('dbname=test', size=1, connect=FakeConnection)
+        conn = pool.getconn()
+        conn.status = extensions.TRANSACTION_STATUS_INTRANS
+        pool.putconn(conn)
+        self.assertEqual(conn.rollbacks, 1)
+        conn = pool.getconn()
+        conn.closed = True
+        pool.putconn(conn)
+        self.assertEqual(pool.stats()['connections'], 0)
+        self.assertFalse(pool.getconn() is conn)
+        self.assertEqual(pool.stats()['connections'], 1)
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+
+import os
+import ssl
+import time
+import socket
+import unittest
+import threading
+import BaseHTTPServer
+import SocketServer
+
+from mturk.main.management.commands.crawler.httppool import (
+    HTTPConnectionPool, HTTPError, is_timeout)
+
+
+TESTS_DIR = os.path.abspath(os.path.dirname(__file__))
+CERT_FILE = os.path.join(TESTS_DIR, 'localhost.pem')
+
+
+class StubHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """Keep-alive server with a few paths used by the tests."""
+
+    protocol_version = 'HTTP/1.1'
+    # send whole response at once, small writes on keep-alive connection
+    # would be delayed by Nagle's algorithm
+    wbufsize = -1
+
+    def setup(self):
+        BaseHTTPServer.BaseHTTPRequestHandler.setup(self)
+        self.server.connections += 1
+
+    def respond(self, code, body='', headers=()):
+        self.send_response(code)
+        self.send_header('Content-Length', str(len(body)))
+        for header in headers:
+            self.send_header(*header)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/login':
+            self.respond(200, 'logged in',
+                [('Set-Cookie', 'session=secret; Path=/')])
+        elif self.path == '/cookies':
+            self.respond(200, self.headers.get('Cookie', ''))
+        elif self.path == '/redirect':
+            self.respond(302, headers=[('Location', '/page?redirected')])
+        elif self.path == '/close':
+            self.respond(200, 'closed', [('Connection', 'close')])
+        elif self.path == '/drop':
+            # close the connection without telling the client
+            self.respond(200, 'dropped')
+            self.close_connection = 1
+        elif self.path == '/slow':
+            time.sleep(0.5)
+            self.respond(200, 'slow')
+        elif self.path.startswith('/page'):
+            self.respond(200, 'page ' + self.path)
+        else:
+            self.respond(404, 'not found')
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # clients closing keep-alive connections are not errors here
+        pass
+
+
+def start_stub_server(https=False):
+    server = StubServer(('127.0.0.1', 0), StubHandler)
+    server.connections = 0
+    if https:
+        server.socket = ssl.wrap_socket(server.socket, certfile=CERT_FILE,
+            server_side=True)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server
+
+
+class TestHTTPConnectionPool(unittest.TestCase):
+
+    https = False
+
+    def setUp(self):
+        self.server = start_stub_server(self.https)
+        self.url = '{0}://127.0.0.1:{1}'.format(
+            'https' if self.https else 'http', self.server.server_port)
+        self.pool = HTTPConnectionPool(
+            ssl_context=ssl._create_unverified_context())
+
+    def tearDown(self):
+        self.pool.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_connection_is_reused(self):
+        for i in range(5):
+            html = self.pool.get('{0}/page{1}'.format(self.url, i))
+            self.assertEqual(html, 'page /page{0}'.format(i))
+        stats = self.pool.stats()
+        self.assertEqual(stats['requests'], 5)
+        self.assertEqual(stats['connections'], 1)
+        self.assertEqual(stats['reuse_ratio'], 0.8)
+        self.assertEqual(self.server.connections, 1)
+
+    def test_cookies(self):
+        self.assertEqual(self.pool.get(self.url + '/cookies'), '')
+        self.pool.get(self.url + '/login')
+        self.assertEqual(self.pool.get(self.url + '/cookies'),
+            'session=secret')
+
+    def test_redirect(self):
+        self.assertEqual(self.pool.get(self.url + '/redirect'),
+            'page /page?redirected')
+        self.assertEqual(self.pool.stats()['connections'], 1)
+
+    def test_error_status(self):
+        self.assertRaises(HTTPError, self.pool.get, self.url + '/missing')
+        # body was read, so the connection can be still used
+        self.pool.get(self.url + '/page')
+        self.assertEqual(self.pool.stats()['reused'], 1)
+
+    def test_connection_close(self):
+        self.pool.get(self.url + '/close')
+        self.pool.get(self.url + '/page')
+        stats = self.pool.stats()
+        self.assertEqual(stats['connections'], 2)
+        self.assertEqual(stats['reused'], 0)
+
+    def test_stale_connection_is_retried(self):
+        self.pool.get(self.url + '/drop')
+        self.assertEqual(self.pool.get(self.url + '/page'), 'page /page')
+        stats = self.pool.stats()
+        self.assertEqual(stats['connections'], 2)
+        self.assertEqual(stats['stale'], 1)
+
+    def test_timeout_is_not_retried(self):
+        self.pool.get(self.url + '/page')
+        try:
+            self.pool.get(self.url + '/slow', timeout=0.2)
+        except socket.error as e:
+            self.assertTrue(is_timeout(e))
+        else:
+            self.fail('timeout not raised')
+        stats = self.pool.stats()
+        self.assertEqual(stats['stale'], 0)
+        self.assertEqual(self.server.connections, 1)
+
+
+class TestHTTPSConnectionPool(TestHTTPConnectionPool):
+
+    https = True
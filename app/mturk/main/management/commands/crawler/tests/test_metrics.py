@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+
+from mturk.main.management.commands.crawler.metrics import (
+    percentile, CrawlMetrics)
+
+
+class TestCrawlMetrics(unittest.TestCase):
+
+    def test_percentile(self):
+        values = range(1, 101)
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 95), 95)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([3, 1, 2], 50), 2)
+        self.assertEqual(percentile([1], 99), 1)
+        self.assertEqual(percentile([], 50), None)
+
+    def test_record(self):
+        metrics = CrawlMetrics()
+        for latency in (0.1, 0.2, 0.3, 0.4):
+            metrics.add_fetch_latency(latency)
+        metrics.count('pages', 2)
+        with metrics.timer('db'):
+            pass
+        metrics.add_queue_depth(4)
+        metrics.add_queue_depth(2)
+        record = metrics.record(groups=10, write_time=1.5)
+        self.assertEqual(record['fetch_requests'], 4)
+        self.assertEqual(record['fetch_latency_p50'], 0.2)
+        self.assertEqual(record['fetch_latency_p99'], 0.4)
+        self.assertEqual(record['retries_per_page'], 1.0)
+        self.assertTrue(record['db_write_time'] >= 1.5)
+        self.assertEqual(record['queue_depth_max'], 4)
+        self.assertEqual(record['queue_depth_avg'], 3.0)
+        self.assertEqual(record['detail_fetches'], 0)
+
+    def test_empty_record(self):
+        record = CrawlMetrics().record(groups=0)
+        self.assertEqual(record['fetch_latency_p50'], None)
+        self.assertEqual(record['retries_per_page'], None)
+        self.assertEqual(record['queue_depth_max'], None)
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+
+from mturk.main.management.commands.crawler.pages import (listing_pages,
+    iter_listing_pages)
+
+
+class Listing(object):
+    """Stands for tasks.hits_groups_info, serves ``groups`` groups on pages of
+    ``per_page`` and raises on pages listed in ``failing`` (once)."""
+
+    def __init__(self, groups, per_page=10, failing=()):
+        self.groups = groups
+        self.per_page = per_page
+        self.failing = set(failing)
+        self.fetched = []
+
+    def __call__(self, page_nr):
+        self.fetched.append(page_nr)
+        if page_nr in self.failing:
+            self.failing.remove(page_nr)
+            raise IOError('page {0} failed'.format(page_nr))
+        start = (page_nr - 1) * self.per_page
+        return range(start, min(start + self.per_page, self.groups))
+
+
+def crawl(listing, groups_available, batch_size=3):
+    return sorted(group for hgs in iter_listing_pages(listing,
+        groups_available, 5, lambda: batch_size, per_page=10, extra=2)
+        for group in hgs)
+
+
+class TestListingPages(unittest.TestCase):
+
+    def test_unknown_number_of_groups(self):
+        self.assertEqual(listing_pages(0, 10, 2), [])
+        self.assertEqual(listing_pages(None, 10, 2), [])
+
+    def test_exact_multiple(self):
+        self.assertEqual(listing_pages(30, 10, 0), [1, 2, 3])
+
+    def test_remainder(self):
+        self.assertEqual(listing_pages(31, 10, 0), [1, 2, 3, 4])
+        self.assertEqual(listing_pages(1, 10, 0), [1])
+
+    def test_extra(self):
+        self.assertEqual(listing_pages(30, 10, 2), [1, 2, 3, 4, 5])
+        self.assertEqual(listing_pages(31, 10, 1), [1, 2, 3, 4, 5])
+
+
+class TestIterListingPages(unittest.TestCase):
+
+    def test_expected_pages_only(self):
+        listing = Listing(35)
+        self.assertEqual(crawl(listing, 35), range(35))
+        # the last expected page is empty, nothing else is fetched
+        self.assertEqual(sorted(listing.fetched), [1, 2, 3, 4, 5, 6])
+
+    def test_unknown_number_of_groups(self):
+        listing = Listing(25)
+        self.assertEqual(crawl(listing, None), range(25))
+        self.assertEqual(sorted(listing.fetched), [1, 2, 3, 4, 5, 6])
+
+    def test_last_expected_page_not_empty(self):
+        # groups posted meanwhile fill more than the extra pages
+        listing = Listing(75)
+        self.assertEqual(crawl(listing, 20), range(75))
+        # pages 1-4 expected, further ones in batches of 3 until an empty one
+        self.assertEqual(sorted(listing.fetched), range(1, 14))
+
+    def test_last_expected_page_failed(self):
+        listing = Listing(50, failing=[4])
+        self.assertEqual(crawl(listing, 20), range(50))
+        # the failed page is not taken for an empty one, it is fetched again
+        # with the following batches
+        self.assertEqual(sorted(listing.fetched),
+            [1, 2, 3, 4, 4, 5, 6, 7, 8, 9])
+
+    def test_last_expected_page_failed_and_empty(self):
+        listing = Listing(20, failing=[4])
+        self.assertEqual(crawl(listing, 20), range(20))
+        self.assertEqual(sorted(listing.fetched), [1, 2, 3, 4, 4, 5, 6])
+
+    def test_failed_page_in_batch(self):
+        listing = Listing(75, failing=[6])
+        groups = crawl(listing, 20)
+        # groups of the failed page are lost, but the crawl goes on
+        self.assertEqual(groups, range(50) + range(60, 75))
+        self.assertTrue(9 in listing.fetched)
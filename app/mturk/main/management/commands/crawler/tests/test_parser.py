@@ -7,6 +7,8 @@ import unittest
 import itertools
 import datetime
 
+from django.conf import settings
+
 TESTS_DIR = os.path.abspath(os.path.dirname(__file__))
 # add upper dir to PYTHONPATH
 from mturk.main.management.commands.crawler import parser
@@ -38,7 +40,7 @@ class TestParserTools(unittest.TestCase):
             self.assertEqual(result, expected, (result, expected, human_delta))
 
 
-class TestParers(ParserTest):
+class TimeLimitedTest(ParserTest):
     maxtimerun = 1
 
     def setUp(self):
@@ -54,6 +56,9 @@ class TestParers(ParserTest):
         # SIGALRM should not affect other tests
         signal.alarm(0)
 
+
+class TestParers(TimeLimitedTest):
+
     def test_hits_mainpage(self):
         html = self.get_html('mainpage.html')
         expected = 94273
@@ -134,5 +139,57 @@ class TestParers(ParserTest):
         self.assertEqual(result, expected)
 
 
+class TestListingScanner(TimeLimitedTest):
+    """Scanner listing parser should give the same results as the regex one.
+    """
+
+    def assertSameResults(self, html):
+        expected = list(parser.hits_group_listinfo_regex(html))
+        results = list(parser.hits_group_listinfo_scanner(html))
+        self.assertEqual(len(results), len(expected))
+        for result, expected in itertools.izip(results, expected):
+            self.assertEqual(result, expected)
+
+    def test_hitslist(self):
+        self.assertSameResults(self.get_html('hitslist.html'))
+
+    def test_hitslist_new(self):
+        self.assertSameResults(self.get_html('hitslist_new.html'))
+
+    def test_wrong(self):
+        self.assertSameResults('<html>wrong html code</html>')
+
+    def test_engine_selection(self):
+        html = self.get_html('hitslist.html')
+        self.assertEqual(
+            list(parser.hits_group_listinfo(html, engine='regex')),
+            list(parser.hits_group_listinfo(html, engine='scanner')))
+
+    def test_default_engine(self):
+        # settings without CRAWLER_LISTING_PARSER use the scanner
+        html = self.get_html('hitslist.html')
+        engine = settings.CRAWLER_LISTING_PARSER
+        del settings.CRAWLER_LISTING_PARSER
+        try:
+            self.assertEqual(list(parser.hits_group_listinfo(html)),
+                list(parser.hits_group_listinfo(html, engine='scanner')))
+        finally:
+            settings.CRAWLER_LISTING_PARSER = engine
+
+    def test_malformed_row_is_skipped(self):
+        html = self.get_html('hitslist.html')
+        expected = list(parser.hits_group_listinfo_scanner(html))[1:]
+        # first row without the number of hits available
+        html = html.replace('HITs Available:&nbsp;', 'HITs:&nbsp;', 1)
+        results = list(parser.hits_group_listinfo_scanner(html))
+        self.assertEqual(results, expected)
+
+    def test_malformed_page_time(self):
+        # regex parser backtracks for minutes on this page
+        html = self.get_html('hitslist.html').replace(
+            'Qualifications Required', 'Qualifications')
+        self.assertEqual(list(parser.hits_group_listinfo_scanner(html)), [])
+
+
 if __name__ == '__main__':
     unittest.main()
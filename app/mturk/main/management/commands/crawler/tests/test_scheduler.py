@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+
+import time
+import urllib2
+import unittest
+import threading
+import BaseHTTPServer
+
+from mturk.main.management.commands.crawler.scheduler import FetchScheduler
+
+
+LIMIT_EXCEEDED_HTML = ('<html>You have exceeded the maximum allowed page '
+    'request rate for this website.</html>')
+
+
+def is_limit_exceeded(html):
+    return html.find('You have exceeded the maximum allowed page') != -1
+
+
+class FakeClock(object):
+    """Clock advanced only by calls to ``sleep``."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class RateLimitedHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """Serves limit exceeded page when more than ``server.limit`` requests
+    were sent during the last second."""
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            now = time.time()
+            server.history = [t for t in server.history if now - t < 1]
+            server.history.append(now)
+            limited = len(server.history) > server.limit
+            server.served += 1
+        self.send_response(200)
+        self.end_headers()
+        self.wfile.write(LIMIT_EXCEEDED_HTML if limited else
+            '<html>page {0}</html>'.format(self.path))
+
+    def log_message(self, *args):
+        pass
+
+
+class TestFetchScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def get_scheduler(self, **kwargs):
+        return FetchScheduler(sleep=self.clock.sleep, clock=self.clock,
+            **kwargs)
+
+    def test_rate_is_respected(self):
+        scheduler = self.get_scheduler(rate=2, concurrency=1)
+        start = self.clock()
+        for i in range(10):
+            scheduler.acquire()
+            scheduler.release()
+        # first token is available immediately
+        self.assertAlmostEqual(self.clock() - start, 4.5, places=3)
+
+    def test_concurrency_is_respected(self):
+        scheduler = self.get_scheduler(rate=1000, concurrency=2)
+        scheduler.acquire()
+        scheduler.acquire()
+        self.assertEqual(scheduler.inflight, 2)
+        scheduler.sleep = lambda s: (scheduler.release(), self.clock.sleep(s))
+        scheduler.acquire()
+        self.assertEqual(scheduler.inflight, 2)
+
+    def test_throttle_decreases_rate_and_concurrency(self):
+        scheduler = self.get_scheduler(rate=8, concurrency=4)
+        scheduler.acquire()
+        scheduler.release(throttled=True)
+        self.assertEqual(scheduler.rate, 4)
+        self.assertEqual(scheduler.concurrency, 2)
+        # burst of throttled responses is a single signal
+        scheduler.acquire()
+        scheduler.release(throttled=True)
+        self.assertEqual(scheduler.rate, 4)
+        self.assertEqual(scheduler.stats()['throttles'], 2)
+
+    def test_clean_responses_increase_rate(self):
+        scheduler = self.get_scheduler(rate=1, concurrency=1,
+            max_concurrency=3, increase_every=5, rate_increase=0.5)
+        for i in range(10):
+            scheduler.acquire()
+            scheduler.release()
+        self.assertEqual(scheduler.rate, 2)
+        self.assertEqual(scheduler.concurrency, 3)
+
+    def test_limits(self):
+        scheduler = self.get_scheduler(rate=1, min_rate=0.5, max_rate=1.5,
+            concurrency=1, max_concurrency=1, increase_every=1, cooldown=0)
+        for i in range(5):
+            scheduler.acquire()
+            scheduler.release()
+        self.assertEqual(scheduler.rate, 1.5)
+        self.assertEqual(scheduler.concurrency, 1)
+        for i in range(5):
+            scheduler.acquire()
+            scheduler.release(throttled=True)
+        self.assertEqual(scheduler.rate, 0.5)
+        self.assertEqual(scheduler.concurrency, 1)
+
+    def test_backoff(self):
+        scheduler = self.get_scheduler(backoff_base=0.1, backoff_max=1)
+        for attempt, limit in ((1, 0.1), (2, 0.2), (3, 0.4), (10, 1)):
+            start = self.clock()
+            scheduler.backoff(attempt)
+            self.assertTrue(0 <= self.clock() - start <= limit)
+
+    def test_fetch_retries(self):
+        scheduler = self.get_scheduler(rate=1000, concurrency=1)
+        responses = ['', LIMIT_EXCEEDED_HTML, 'ok']
+        html = scheduler.fetch('url', lambda url: responses.pop(0),
+            is_limit_exceeded)
+        self.assertEqual(html, 'ok')
+        stats = scheduler.stats()
+        self.assertEqual(stats['requests'], 3)
+        self.assertEqual(stats['errors'], 1)
+        self.assertEqual(stats['throttles'], 1)
+
+    def test_fetch_retry_limit(self):
+        scheduler = self.get_scheduler(rate=1000)
+        html = scheduler.fetch('url', lambda url: '', is_limit_exceeded,
+            retries=3)
+        self.assertEqual(html, None)
+        self.assertEqual(scheduler.stats()['requests'], 3)
+
+    def test_fetch_time_limit(self):
+        scheduler = self.get_scheduler(rate=1000, backoff_max=1)
+
+        def timed_out(url):
+            self.clock.sleep(3)
+            return ''
+
+        start = self.clock()
+        html = scheduler.fetch('url', timed_out, is_limit_exceeded,
+            retries=1000, max_time=10)
+        self.assertEqual(html, None)
+        # no retry is started once 10 seconds have passed
+        self.assertEqual(scheduler.stats()['requests'], 4)
+        self.assertTrue(self.clock() - start < 10 + 3 + 1)
+
+
+class TestFetchSchedulerStubServer(unittest.TestCase):
+    """Run scheduler against local server simulating mturk rate limit."""
+
+    limit = 20
+    pages = 60
+    workers = 6
+
+    def setUp(self):
+        self.server = BaseHTTPServer.HTTPServer(('127.0.0.1', 0),
+            RateLimitedHandler)
+        self.server.lock = threading.Lock()
+        self.server.history = []
+        self.server.served = 0
+        self.server.limit = self.limit
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.url = 'http://127.0.0.1:{0}/'.format(self.server.server_port)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_learns_rate_limit(self):
+        scheduler = FetchScheduler(rate=100, max_rate=200,
+            concurrency=self.workers, max_concurrency=self.workers,
+            backoff_base=0.05, backoff_max=0.5)
+        results = {}
+
+        def download(url):
+            return urllib2.urlopen(url, timeout=5).read()
+
+        def worker(pages):
+            for page in pages:
+                results[page] = scheduler.fetch(
+                    self.url + str(page), download, is_limit_exceeded)
+
+        threads = [threading.Thread(target=worker,
+            args=(range(i, self.pages, self.workers), ))
+            for i in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(30)
+
+        self.assertEqual(len(results), self.pages)
+        for page, html in results.items():
+            self.assertEqual(html, '<html>page /{0}</html>'.format(page))
+        stats = scheduler.stats()
+        self.assertTrue(stats['throttles'] > 0)
+        self.assertEqual(stats['requests'], self.server.served)
+        self.assertTrue(scheduler.rate < 100)
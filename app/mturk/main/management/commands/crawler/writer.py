@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+
+import time
+import logging
+import threading
+
+from collections import OrderedDict
+
+
+log = logging.getLogger(__name__)
+
+
+# Columns of the per-connection staging table, in the order rows are loaded
+STAGING_COLUMNS = (
+    'crawl_id', 'group_id', 'hit_group_content_id', 'requester_id',
+    'hits_available', 'page_number', 'inpage_position', 'hit_expiration_date',
+    'now',
+)
+# Columns of crawl snapshots, see mturk.main.snapshots
+SNAPSHOT_COLUMNS = (
+    'hits_available', 'reward', 'page_number', 'inpage_position',
+)
+
+
+class CrawlWriter(object):
+    """Collects hitgroup status data gathered by crawler workers and writes it
+    into the database in bulk.
+
+    Workers call ``add`` for every processed hitgroup and ``flush_if_full``
+    afterwards; remaining data is written with ``flush`` at the crawl end.
+    Single flush loads all buffered rows into temporary staging table and then
+    runs set-based statements replacing per-group inserts into
+    main_hitgroupstatus, updates of main_hitgroupstate and inserts into
+    main_indexqueue.
+
+    Rows are buffered by group_id, so the same group can't be written twice
+    within a crawl. If flush fails, group ids of the lost rows are removed
+    from ``processed_groups`` - exactly as ``tasks.process_group`` does on
+    failure - so that they won't be counted as downloaded.
+    """
+
+    # rows per single INSERT statement loading the staging table
+    chunk_size = 1000
+
+    def __init__(self, dbpool, processed_groups, flush_size=100,
+            stage_hits_mv=False):
+        self.dbpool = dbpool
+        self.processed_groups = processed_groups
+        self.flush_size = flush_size
+        self.stage_hits_mv = stage_hits_mv
+        # flushes don't overlap, rows of a group are written in order
+        self.lock = threading.Lock()
+        self.rows = OrderedDict()
+        # SNAPSHOT_COLUMNS of groups already written, by group_id
+        self.groups = {}
+        self.rows_written = 0
+        self.flushes = 0
+        self.write_time = 0.0
+
+    def __len__(self):
+        return len(self.rows)
+
+    def add(self, data):
+        """Buffer status data of single, already processed hitgroup."""
+        self.rows[data['group_id']] = (
+            tuple(data[c] for c in STAGING_COLUMNS),
+            tuple(data[c] for c in SNAPSHOT_COLUMNS))
+
+    def flush_if_full(self):
+        """Flush if at least ``flush_size`` rows are buffered."""
+        if len(self.rows) >= self.flush_size:
+            return self.flush()
+        return 0
+
+    def flush(self):
+        """Write all buffered rows and return the number of rows written."""
+        with self.lock:
+            return self._flush()
+
+    def _flush(self):
+        if not self.rows:
+            return 0
+        rows, self.rows = self.rows, OrderedDict()
+
+        start_time = time.time()
+        try:
+            with self.dbpool.connection() as conn:
+                curr = conn.cursor()
+                try:
+                    self.write(curr, [row for row, group in rows.values()])
+                    conn.commit()
+                finally:
+                    curr.close()
+        except Exception:
+            # uncommitted rows are rolled back by the pool
+            log.exception('CrawlWriter flush fail - rollback, %s groups lost',
+                len(rows))
+            for group_id in rows:
+                self.processed_groups.discard(group_id)
+            return 0
+
+        for group_id, (row, group) in rows.iteritems():
+            self.groups[group_id] = group
+        self.flushes += 1
+        self.rows_written += len(rows)
+        self.write_time += time.time() - start_time
+        log.debug('CrawlWriter flushed %s rows in %.3fs', len(rows),
+            time.time() - start_time)
+        return len(rows)
+
+    def write(self, curr, rows):
+        """Write given staging rows using cursor ``curr``. Does not commit."""
+        curr.execute('''
+            CREATE TEMPORARY TABLE IF NOT EXISTS crawl_status_staging (
+                crawl_id integer,
+                group_id varchar(50),
+                hit_group_content_id integer,
+                requester_id varchar(50),
+                hits_available integer,
+                page_number integer,
+                inpage_position integer,
+                hit_expiration_date timestamp with time zone,
+                now timestamp with time zone
+            ) ON COMMIT DELETE ROWS
+        ''')
+        self.load_staging(curr, rows)
+
+        insert_status = '''
+            INSERT INTO main_hitgroupstatus (
+                crawl_id, inpage_position, hit_group_content_id, page_number,
+                group_id, hits_available, hit_expiration_date
+            )
+            SELECT
+                crawl_id, inpage_position, hit_group_content_id, page_number,
+                group_id, hits_available, hit_expiration_date
+            FROM crawl_status_staging
+        '''
+        if self.stage_hits_mv:
+            # status ids are known only after the insert, rows of hits_mv are
+            # built from its RETURNING clause - content is joined by primary
+            # key for this flush's rows only
+            curr.execute('''
+                WITH status AS ({0}
+                    RETURNING id, crawl_id, group_id, hit_group_content_id,
+                        hits_available, page_number, inpage_position,
+                        hit_expiration_date
+                )
+                INSERT INTO hits_mv_staging (
+                    status_id, content_id, group_id, crawl_id, start_time,
+                    requester_id, hits_available, page_number,
+                    inpage_position, hit_expiration_date, reward,
+                    time_alloted, is_spam
+                )
+                SELECT
+                    s.id, q.id, s.group_id, s.crawl_id, c.start_time,
+                    q.requester_id, s.hits_available, s.page_number,
+                    s.inpage_position, s.hit_expiration_date, q.reward,
+                    q.time_alloted, q.is_spam
+                FROM status s
+                JOIN main_hitgroupcontent q ON q.id = s.hit_group_content_id
+                JOIN main_crawl c ON c.id = s.crawl_id
+            '''.format(insert_status))
+        else:
+            curr.execute(insert_status)
+
+        # narrow main_hitgroupstate rows are updated instead of wide
+        # main_hitgroupcontent ones; groups seen for the first time get new
+        # rows
+        curr.execute('''
+            WITH updated AS (
+                UPDATE main_hitgroupstate
+                SET hits_available = s.hits_available,
+                    last_updated = s.now,
+                    last_crawl_id = s.crawl_id
+                FROM crawl_status_staging s
+                WHERE main_hitgroupstate.hit_group_content_id =
+                    s.hit_group_content_id
+                RETURNING main_hitgroupstate.hit_group_content_id
+            )
+            INSERT INTO main_hitgroupstate (
+                hit_group_content_id, hits_available, last_updated,
+                last_crawl_id
+            )
+            SELECT hit_group_content_id, hits_available, now, crawl_id
+            FROM crawl_status_staging
+            WHERE hit_group_content_id NOT IN (
+                SELECT hit_group_content_id FROM updated)
+        ''')
+
+        # add related hitgroupcontent ids to index queue
+        curr.execute('''
+            INSERT INTO main_indexqueue (
+                hitgroupcontent_id, requester_id, created
+            )
+            SELECT hit_group_content_id, requester_id, now()
+            FROM crawl_status_staging
+        ''')
+
+    def load_staging(self, curr, rows):
+        """Load rows into staging table.
+
+        COPY can't be used by the crawler, because psycopg2 refuses to run it
+        with the gevent wait callback installed (see db.py), so rows are sent
+        using multi-row INSERT statements instead - still a single round trip
+        per ``chunk_size`` rows.
+        """
+        row_template = '(' + ', '.join(['%s'] * len(STAGING_COLUMNS)) + ')'
+        rows = list(rows)
+        for i in xrange(0, len(rows), self.chunk_size):
+            values = ', '.join(curr.mogrify(row_template, row)
+                for row in rows[i:i + self.chunk_size])
+            curr.execute('INSERT INTO crawl_status_staging ({0}) VALUES {1}'
+                .format(', '.join(STAGING_COLUMNS), values))
@@ -0,0 +1,95 @@
+import time
+import logging
+import psycopg2
+from optparse import make_option
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from utils.pid import Pid
+from mturk.main import htmlblobs
+
+log = logging.getLogger('mturk.main.html_blobs')
+
+
+class Command(BaseCommand):
+    """Moves html kept inline in main_hitgroupcontent into compressed,
+    deduplicated main_htmlblob rows (see mturk.main.htmlblobs).
+
+    Rows are converted in batches ordered by id, every batch in a separate
+    transaction, so the command can be stopped and resumed at any time. The
+    space of emptied html values is reused by new rows after VACUUM, to return
+    it to the system VACUUM FULL main_hitgroupcontent is required.
+
+    """
+
+    help = 'Converts inline html of hitgroups into compressed html blobs.'
+
+    option_list = BaseCommand.option_list + (
+        make_option('--batch-size', dest='batch_size', type='int',
+            default=1000, help='Number of rows converted in one transaction.'),
+        make_option('--limit', dest='limit', type='int', default=None,
+            help='Stop after converting the given number of rows.'),
+    )
+
+    def handle(self, **options):
+        pid = Pid('convert_html_blobs', True)
+        try:
+            stats = convert_html_blobs(options['batch_size'],
+                options['limit'])
+            log.info('Converted {rows} rows: {html_bytes} bytes of html, '
+                '{new_blobs} new blobs taking {blob_bytes} bytes, '
+                '{saved} bytes ({saved_pc:.1f}%) saved.'.format(**stats))
+        finally:
+            pid.remove_pid()
+
+
+def convert_batch(curr, rows, stats):
+    """Stores html of given (id, html) rows in blobs and updates their
+    main_hitgroupcontent rows."""
+    for content_id, html in rows:
+        key, data, size = htmlblobs.compress(html)
+        curr.execute('''
+            INSERT INTO main_htmlblob (hash, data, size)
+            SELECT %s, %s, %s
+            WHERE NOT EXISTS (SELECT 1 FROM main_htmlblob WHERE hash = %s)
+        ''', (key, psycopg2.Binary(data), size, key))
+        if curr.rowcount:
+            stats['new_blobs'] += 1
+            stats['blob_bytes'] += len(data)
+        curr.execute('''
+            UPDATE main_hitgroupcontent SET html = '', html_hash = %s
+            WHERE id = %s
+        ''', (key, content_id))
+        stats['html_bytes'] += size
+    stats['rows'] += len(rows)
+
+
+def convert_html_blobs(batch_size=1000, limit=None):
+    """Converts inline html of main_hitgroupcontent rows and returns
+    dictionary of statistics: number of rows and new blobs, bytes of html
+    converted and bytes of blobs created."""
+    stats = dict(rows=0, new_blobs=0, html_bytes=0, blob_bytes=0)
+    curr = connection.cursor()
+    last_id = 0
+    start_time = time.time()
+    while limit is None or stats['rows'] < limit:
+        size = batch_size if limit is None else min(batch_size,
+            limit - stats['rows'])
+        curr.execute('''
+            SELECT id, html FROM main_hitgroupcontent
+            WHERE id > %s AND html_hash IS NULL AND html <> ''
+            ORDER BY id LIMIT %s
+        ''', (last_id, size))
+        rows = curr.fetchall()
+        if not rows:
+            break
+        convert_batch(curr, rows, stats)
+        transaction.commit_unless_managed()
+        last_id = rows[-1][0]
+        log.info('{0} rows converted in {1:.1f}s, last id {2}.'.format(
+            stats['rows'], time.time() - start_time, last_id))
+
+    stats['saved'] = stats['html_bytes'] - stats['blob_bytes']
+    stats['saved_pc'] = (100.0 * stats['saved'] / stats['html_bytes']
+        if stats['html_bytes'] else 0.0)
+    return stats
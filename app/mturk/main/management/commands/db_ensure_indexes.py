@@ -0,0 +1,73 @@
+import time
+import logging
+from optparse import make_option
+from django.core.management.base import BaseCommand
+
+from utils.pid import Pid
+from mturk.main import indexes
+
+log = logging.getLogger('mturk.main.indexes')
+
+
+class Command(BaseCommand):
+    """Compares indexes listed in mturk.main.indexes with the ones existing in
+    the database and creates the missing ones with CREATE INDEX CONCURRENTLY,
+    so tables stay writable meanwhile. Run on every deployment.
+
+    Afterwards reports indexes that are never used (according to
+    pg_stat_user_indexes) or made redundant by other indexes. Nothing is
+    dropped, the report only helps to decide what to remove.
+
+    """
+
+    help = 'Creates missing required indexes and reports unused ones.'
+
+    option_list = BaseCommand.option_list + (
+        make_option('--dry-run', dest='dry_run', default=False,
+            action='store_true',
+            help='Only list missing indexes, do not create them.'),
+        make_option('--no-report', dest='report', default=True,
+            action='store_false',
+            help='Do not report unused and duplicate indexes.'),
+    )
+
+    def handle(self, **options):
+        pid = Pid('ensure_indexes', True)
+        try:
+            with indexes.autocommit() as curr:
+                ensure_indexes(curr, dry_run=options['dry_run'])
+                if options['report']:
+                    report_indexes(curr)
+        finally:
+            pid.remove_pid()
+
+
+def ensure_indexes(curr, dry_run=False):
+    """Creates required indexes missing in the database, returns list of
+    (table, Index) tuples of them."""
+    missing = indexes.find_missing(indexes.REQUIRED_INDEXES,
+        indexes.get_indexes(curr), indexes.get_tables(curr))
+    if not missing:
+        log.info('All {0} required indexes exist.'.format(
+            len(indexes.REQUIRED_INDEXES)))
+    for table, index in missing:
+        if dry_run:
+            log.info('Missing index on {0} ({1}).'.format(table,
+                ', '.join(index.columns)))
+            continue
+        start_time = time.time()
+        name = indexes.create_index(curr, table, index)
+        log.info('Created index {0} on {1} ({2}) in {3:.1f}s.'.format(name,
+            table, ', '.join(index.columns), time.time() - start_time))
+    return missing
+
+
+def report_indexes(curr):
+    """Logs indexes made redundant by other ones and indexes never used."""
+    for index, other in indexes.find_duplicates(indexes.get_indexes(curr)):
+        log.warning('Index {0} on {1} ({2}) is redundant, {3} ({4}) covers '
+            'it.'.format(index.name, index.table, ', '.join(index.columns),
+                other.name, ', '.join(other.columns)))
+    for table, name, size in indexes.get_unused(curr):
+        log.warning('Index {0} on {1} ({2} bytes) was never used.'.format(
+            name, table, size))
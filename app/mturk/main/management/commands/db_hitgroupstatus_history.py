@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+
+import logging
+from django.conf import settings
+
+from utils.sql import execute_sql
+from utils.management.commands.base.db_procedure_command import DBProcedureCommand
+
+
+class Command(DBProcedureCommand):
+    """Builds hitgroupstatus_history of correct crawls from the given
+    interval, which must be newer than crawls already in the history. New
+    crawls are added by the crawler (see CRAWLER_STATUS_HISTORY setting), to
+    fill the history of older ones use eg.:
+
+        db_hitgroupstatus_history --start=2012-01-01 --end=2012-02-01
+
+    """
+
+    help = ('Builds run-length encoded hitgroupstatus_history of crawls from '
+        'the given interval.')
+    proc_name = 'hitgroupstatus_history_build'
+    logger = logging.getLogger('mturk.main.db_hitgroupstatus_history')
+
+    def get_proc_args(self):
+        """Adds an extra argument this procedures requires."""
+        return [self.start, self.end, settings.INCOMPLETE_CRAWL_THRESHOLD]
+
+
+def update_status_history(crawl_id):
+    """Writes hits_available changes of the given crawl to
+    hitgroupstatus_history."""
+    execute_sql('SELECT hitgroupstatus_history_update(%s)', crawl_id,
+        commit=True)
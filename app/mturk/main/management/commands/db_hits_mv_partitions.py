@@ -0,0 +1,218 @@
+import re
+import time
+import datetime
+import logging
+import pytz
+from optparse import make_option
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.conf import settings
+
+from utils.pid import Pid
+from utils.sql import execute_sql, query_to_tuples, get_table_columns
+
+log = logging.getLogger('mturk.aggregates')
+
+PARTITION_RE = re.compile(r'^hits_mv_(\d{4})_(\d{2})$')
+
+
+class Command(BaseCommand):
+    """Maintains monthly partitions of hits_mv (see hits_mv_create_partition
+    procedure).
+
+    By default creates partitions for the next --ahead months and, if
+    --keep-months is given (HITS_MV_RETENTION_MONTHS setting), drops
+    partitions of older months. To move rows left in hits_mv_unpartitioned
+    after the table was partitioned (0013 migration) use:
+
+        db_hits_mv_partitions --move
+
+    Rows are moved in --chunk-hours chunks, each in a separate transaction,
+    so the data is available all the time.
+
+    """
+
+    help = 'Creates, drops and fills monthly partitions of hits_mv.'
+
+    option_list = BaseCommand.option_list + (
+        make_option('--ahead', dest='ahead', type='int',
+            default=settings.HITS_MV_PARTITIONS_AHEAD,
+            help='Number of months after the current one to create '
+                'partitions for.'),
+        make_option('--keep-months', dest='keep_months', type='int',
+            default=settings.HITS_MV_RETENTION_MONTHS,
+            help='Drop partitions older than the given number of months '
+                'before the current one.'),
+        make_option('--detach', dest='detach', default=False,
+            action='store_true',
+            help='Detach old partitions from hits_mv instead of dropping '
+                'them.'),
+        make_option('--move', dest='move', default=False,
+            action='store_true',
+            help='Move rows from hits_mv_unpartitioned into partitions.'),
+        make_option('--chunk-hours', dest='chunk_hours', type='int',
+            default=24,
+            help='Hours of data moved in a single transaction by --move.'),
+        make_option('--list', dest='list', default=False,
+            action='store_true',
+            help='List existing partitions and exit.'),
+    )
+
+    def handle(self, **options):
+        if options['list']:
+            for month, name in get_partitions():
+                print name
+            return
+
+        pid = Pid('hits_mv_partitions', True)
+        try:
+            create_partitions(options['ahead'])
+            if options['keep_months'] is not None:
+                remove_partitions(months_ago(options['keep_months']),
+                    detach=options['detach'])
+            if options['move']:
+                move_unpartitioned(datetime.timedelta(
+                    hours=options['chunk_hours']))
+        finally:
+            pid.remove_pid()
+
+
+def month_start(dt):
+    """Returns the first moment of ``dt`` month in UTC."""
+    dt = dt.astimezone(pytz.utc) if dt.tzinfo else dt
+    return datetime.datetime(dt.year, dt.month, 1, tzinfo=pytz.utc)
+
+
+def next_month(dt):
+    """Returns the first moment of the month following ``dt`` month."""
+    dt = month_start(dt)
+    if dt.month == 12:
+        return dt.replace(year=dt.year + 1, month=1)
+    return dt.replace(month=dt.month + 1)
+
+
+def months_ago(months):
+    """Returns the first moment of the month ``months`` before the current
+    one."""
+    dt = month_start(datetime.datetime.now(pytz.utc))
+    year, month = divmod(dt.year * 12 + dt.month - 1 - months, 12)
+    return dt.replace(year=year, month=month + 1)
+
+
+def partition_name(dt):
+    return 'hits_mv_{0:%Y_%m}'.format(month_start(dt))
+
+
+def get_partitions():
+    """Returns (month start, table name) tuples of hits_mv partitions ordered
+    by month."""
+    partitions = []
+    for (name, ) in query_to_tuples("""
+            SELECT c.relname
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            JOIN pg_class p ON p.oid = i.inhparent
+            WHERE p.relname = 'hits_mv'"""):
+        match = PARTITION_RE.match(name)
+        if match:
+            year, month = map(int, match.groups())
+            partitions.append((
+                datetime.datetime(year, month, 1, tzinfo=pytz.utc), name))
+    return sorted(partitions)
+
+
+def create_partitions(ahead):
+    """Creates missing partitions from the current month to ``ahead`` months
+    after it."""
+    execute_sql("""
+        SELECT hits_mv_create_partition(month::date)
+        FROM generate_series(
+            date_trunc('month', now() AT TIME ZONE 'UTC'),
+            date_trunc('month', now() AT TIME ZONE 'UTC') +
+                interval '{0} months',
+            interval '1 month') AS month
+    """.format(int(ahead)))
+    transaction.commit_unless_managed()
+
+
+def remove_partitions(before, detach=False):
+    """Drops (or detaches) partitions of months before ``before``.
+
+    Unlike DELETE, dropping a table takes the same short time regardless of
+    the number of rows. Detached partitions keep their data, but are no longer
+    visible in hits_mv.
+
+    """
+    for month, name in get_partitions():
+        if month >= before:
+            break
+        if detach:
+            log.info('Detaching hits_mv partition {0}.'.format(name))
+            execute_sql('ALTER TABLE {0} NO INHERIT hits_mv'.format(name))
+        else:
+            log.info('Dropping hits_mv partition {0}.'.format(name))
+            execute_sql('DROP TABLE {0}'.format(name))
+        transaction.commit_unless_managed()
+
+
+def delete_hits_mv(start, end):
+    """Deletes hits_mv rows with start_time between ``start`` and ``end``.
+
+    Partitions within the interval are truncated, only the rows of partitions
+    on its edges are deleted one by one.
+
+    """
+    for month, name in get_partitions():
+        if start <= month and next_month(month) <= end:
+            log.info('Truncating hits_mv partition {0}.'.format(name))
+            execute_sql('TRUNCATE {0}'.format(name))
+    execute_sql("DELETE FROM hits_mv WHERE start_time BETWEEN %s AND %s",
+        start, end)
+    transaction.commit_unless_managed()
+
+
+def move_unpartitioned(chunk=datetime.timedelta(days=1)):
+    """Moves rows from hits_mv_unpartitioned into partitions, oldest first,
+    and drops the table when it's empty. Returns the number of rows moved.
+
+    Every chunk of rows is inserted into its partition and deleted from
+    hits_mv_unpartitioned in a single transaction. Both tables are part of
+    hits_mv, so queries see every row exactly once during the move.
+
+    """
+    if not execute_sql("SELECT 1 FROM pg_class WHERE relname = %s",
+            'hits_mv_unpartitioned').fetchone():
+        log.info('No hits_mv_unpartitioned table, nothing to move.')
+        return 0
+
+    columns = ', '.join(get_table_columns('hits_mv'))
+    moved = 0
+    start_time = time.time()
+    while True:
+        start = execute_sql('SELECT min(start_time) FROM '
+            'hits_mv_unpartitioned').fetchone()[0]
+        if start is None:
+            break
+        # chunks never cross month boundary
+        end = min(start + chunk, next_month(start))
+        name = partition_name(start)
+        execute_sql('SELECT hits_mv_create_partition(%s)',
+            month_start(start).date())
+        rows = execute_sql("""
+            INSERT INTO {name} ({columns})
+            SELECT {columns} FROM hits_mv_unpartitioned
+            WHERE start_time >= %s AND start_time < %s
+        """.format(name=name, columns=columns), start, end).rowcount
+        execute_sql('DELETE FROM hits_mv_unpartitioned WHERE start_time < %s',
+            end)
+        transaction.commit_unless_managed()
+
+        moved += rows
+        elapsed = time.time() - start_time
+        log.info('Moved {0} rows up to {1} into {2}, {3} rows in {4:.1f}s '
+            'so far.'.format(rows, end, name, moved, elapsed))
+
+    execute_sql('DROP TABLE hits_mv_unpartitioned')
+    transaction.commit_unless_managed()
+    log.info('hits_mv_unpartitioned is empty and was dropped.')
+    return moved
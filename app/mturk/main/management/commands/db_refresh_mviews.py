@@ -67,6 +67,13 @@ def update_mviews(clear_existing=True, force=False, start=None, end=None):
     exceeding 10 percent denotes a crawl error. Such crawls should be excluded
     from creating hits_mv and further table records.
 
+    Staged crawls
+    -------------
+    Rows of crawls staged by the crawler (see CRAWLER_STAGE_HITS_MV) but not
+    moved to hits_mv by it, eg. because it was killed, are moved from
+    hits_mv_staging instead of being aggregated again. Staged rows of crawls
+    which won't be processed are removed.
+
     """
     for crawl_id, start_time in get_crawls_for_update(force, start, end):
 
@@ -75,8 +82,15 @@ def update_mviews(clear_existing=True, force=False, start=None, end=None):
             execute_sql("DELETE FROM hits_mv WHERE crawl_id = {0}".format(
                 crawl_id), commit=True)
 
-        log.info("Creating hits_mv records for: {0}.".format(crawl_id))
-        create_hits_mv_record(start_time, crawl_id)
+        if has_staged_hits_mv(crawl_id):
+            log.info("Moving staged hits_mv records for: {0}.".format(
+                crawl_id))
+            move_staged_hits_mv(crawl_id)
+        else:
+            log.info("Creating hits_mv records for: {0}.".format(crawl_id))
+            create_hits_mv_record(start_time, crawl_id)
+
+    purge_staged_hits_mv()
 
 
 def get_crawls_for_update(force=False, start=None, end=None):
@@ -124,8 +138,7 @@ def create_hits_mv_record(start_time, crawl_id):
         FROM
             main_hitgroupstatus p
         JOIN
-            main_hitgroupcontent q ON (q.group_id::text = p.group_id::text
-                                       AND p.hit_group_content_id = q.id)
+            main_hitgroupcontent q ON p.hit_group_content_id = q.id
         WHERE
             p.crawl_id = {crawl_id};
     """.format(start_time=start_time, crawl_id=crawl_id), commit=True)
@@ -134,3 +147,60 @@ def create_hits_mv_record(start_time, crawl_id):
         ).format(crawl_id), commit=True)
 
     transaction.commit_unless_managed()
+
+
+def has_staged_hits_mv(crawl_id):
+    """Returns true if hits_mv_staging contains rows of the given crawl."""
+    return execute_sql(
+        "SELECT 1 FROM hits_mv_staging WHERE crawl_id = {0} LIMIT 1".format(
+            crawl_id)).fetchone() is not None
+
+
+def move_staged_hits_mv(crawl_id):
+    """Moves rows of the given crawl, written to hits_mv_staging by the
+    crawler, into hits_mv and marks crawl as already processed.
+
+    It's a replacement of create_hits_mv_record for staged crawls - no joins,
+    just a single bulk copy done in one transaction.
+
+    """
+    execute_sql("""INSERT INTO
+            hits_mv (status_id, content_id, group_id, crawl_id, start_time,
+                requester_id, hits_available, page_number, inpage_position,
+                hit_expiration_date, reward, time_alloted, hits_diff,
+                is_spam)
+        SELECT status_id, content_id, group_id, crawl_id, start_time,
+            requester_id, hits_available, page_number, inpage_position,
+            hit_expiration_date, reward, time_alloted, null, is_spam
+        FROM
+            hits_mv_staging
+        WHERE
+            crawl_id = {crawl_id};
+
+        DELETE FROM hits_mv_staging WHERE crawl_id = {crawl_id};
+
+        UPDATE main_crawl SET has_hits_mv = true WHERE id = {crawl_id};
+    """.format(crawl_id=crawl_id))
+
+    transaction.commit_unless_managed()
+
+
+def discard_staged_hits_mv(crawl_id):
+    """Removes rows of the given crawl from hits_mv_staging."""
+    execute_sql("DELETE FROM hits_mv_staging WHERE crawl_id = {0}".format(
+        crawl_id), commit=True)
+
+
+def purge_staged_hits_mv():
+    """Removes staged rows of crawls that already have hits_mv records or
+    finished with too few groups downloaded."""
+    execute_sql("""DELETE FROM hits_mv_staging s
+        USING main_crawl p
+        WHERE
+            s.crawl_id = p.id AND
+            p.end_time > p.start_time AND (
+                p.has_hits_mv = true OR
+                p.success = false OR
+                p.groups_available * {crawl_threshold} >= p.groups_downloaded)
+    """.format(crawl_threshold=settings.INCOMPLETE_CRAWL_THRESHOLD),
+        commit=True)
@@ -13,6 +13,9 @@ from mturk.main.management.commands.crawler_common import grab_error
 
 log = logging.getLogger('mturk.aggregates')
 
+# crawls with fewer projects contain dummy data and get no aggregates
+MIN_CRAWL_PROJECTS = 200
+
 
 class Command(TimeArgsCommand):
 
@@ -23,11 +26,21 @@ class Command(TimeArgsCommand):
             default=False, action="store_true",
             help='If true, related main_crawlagregates record will be deleted '
                 'prior to update.'),
+        make_option("--batch", dest="batch",
+            default=False, action="store_true",
+            help='Build aggregates of many crawls with a single statement, '
+                'see --batch-size. Much faster for backfills.'),
+        make_option("--batch-size", dest="batch-size", type='int',
+            default=500,
+            help='Number of crawls aggregated by a single statement in the '
+                'batch mode.'),
     )
 
     def process_options(self, options):
         super(Command, self).process_options(options)
         self.clear_existing = self.options['clear-existing']
+        self.batch = self.options['batch']
+        self.batch_size = self.options['batch-size']
 
     def handle(self, **options):
 
@@ -37,8 +50,13 @@ class Command(TimeArgsCommand):
         start_time = time.time()
 
         log.info('Updating crawl agregates')
-        update_crawl_agregates(start=self.start, end=self.end,
-            clear_existing=self.clear_existing)
+        if self.batch:
+            update_crawl_agregates_batch(start=self.start, end=self.end,
+                clear_existing=self.clear_existing,
+                batch_size=self.batch_size)
+        else:
+            update_crawl_agregates(start=self.start, end=self.end,
+                clear_existing=self.clear_existing)
         log.info('db_update_agregates took: %s' % (time.time() - start_time))
 
         pid.remove_pid()
@@ -56,24 +74,7 @@ def update_crawl_agregates(commit_threshold=1000,
     i = 0
     for i, row in enumerate(get_crawls(start=start, end=end)):
         try:
-            execute_sql("""
-            INSERT INTO
-                main_crawlagregates (hits, start_time, reward, crawl_id, id,
-                    projects, spam_projects)
-            SELECT
-                sum(hits_available) as "hits",
-                start_time,
-                sum(reward * hits_available) as "reward",
-                crawl_id,
-                nextval('main_crawlagregates_id_seq'),
-                count(*) as "count",
-                count(CASE WHEN is_spam = TRUE then TRUE ELSE NULL END)
-            FROM
-                (SELECT DISTINCT ON (group_id) * FROM hits_mv
-                WHERE crawl_id = %s) AS p
-            GROUP BY
-                crawl_id, start_time
-            """, row['id'])
+            insert_crawl_agregates(row['id'])
 
             if i % commit_threshold == 0:
                 print_status(i + 1, row['id'])
@@ -89,10 +90,80 @@ def update_crawl_agregates(commit_threshold=1000,
         print_status(i + 1, row['id'])
         transaction.commit_unless_managed()
 
-    # delete dummy data
-    execute_sql("DELETE FROM main_crawlagregates WHERE projects < 200;",
-        commit=True)
-    transaction.commit_unless_managed()
+
+def update_crawl_agregates_batch(start=None, end=None, clear_existing=False,
+        batch_size=500):
+    """Creates main_crawlagregates records for hits_mv, aggregating
+    ``batch_size`` crawls with a single statement.
+
+    Gives the same results as update_crawl_agregates, see
+    insert_crawl_agregates_batch.
+
+    """
+    clear_existing and start and end and clear_existing_rows(start, end)
+
+    crawl_ids = [row['id'] for row in get_crawls(start=start, end=end)]
+    start_time = time.time()
+    inserted = 0
+    for i in xrange(0, len(crawl_ids), batch_size):
+        batch = crawl_ids[i:i + batch_size]
+        try:
+            inserted += insert_crawl_agregates_batch(batch)
+            transaction.commit_unless_managed()
+        except:
+            error_info = grab_error(sys.exc_info())
+            log.error('an error occured at crawl_ids: %s to %s, %s %s' % (
+                batch[0], batch[-1], error_info['type'], error_info['value']))
+            execute_sql('rollback;')
+            continue
+
+        elapsed = time.time() - start_time
+        log.info('Commited after {0} crawls, {1} rows inserted, '
+            '{2:.1f} rows/s.'.format(i + len(batch), inserted,
+                inserted / elapsed if elapsed else 0))
+    return inserted
+
+
+def insert_crawl_agregates(crawl_id):
+    """Inserts main_crawlagregates record of a single crawl, unless it has
+    less than MIN_CRAWL_PROJECTS projects. Returns number of inserted rows.
+
+    """
+    return insert_crawl_agregates_batch([crawl_id])
+
+
+def insert_crawl_agregates_batch(crawl_ids):
+    """Inserts main_crawlagregates records of given crawls, skipping ones with
+    less than MIN_CRAWL_PROJECTS projects - they contain dummy data. Returns
+    number of inserted rows.
+
+    Crawls are skipped instead of having their rows deleted afterwards, so
+    that no other rows are touched and days of skipped crawls aren't marked
+    in daystats_dirty.
+
+    """
+    cursor = execute_sql("""
+    INSERT INTO
+        main_crawlagregates (hits, start_time, reward, crawl_id, id,
+            projects, spam_projects)
+    SELECT
+        sum(hits_available) as "hits",
+        start_time,
+        sum(reward * hits_available) as "reward",
+        crawl_id,
+        nextval('main_crawlagregates_id_seq'),
+        count(*) as "count",
+        count(CASE WHEN is_spam = TRUE then TRUE ELSE NULL END)
+    FROM
+        (SELECT DISTINCT ON (crawl_id, group_id) * FROM hits_mv
+        WHERE crawl_id = ANY(%s)
+        ORDER BY crawl_id, group_id, status_id) AS p
+    GROUP BY
+        crawl_id, start_time
+    HAVING
+        count(*) >= %s
+    """, list(crawl_ids), MIN_CRAWL_PROJECTS)
+    return cursor.rowcount
 
 
 def get_crawls(start=None, end=None):
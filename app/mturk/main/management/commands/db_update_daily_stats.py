@@ -1,103 +1,124 @@
+import time
 import datetime
 import logging
 import pytz
+from optparse import make_option
 from django.core.management.base import BaseCommand
-from django.db import transaction
-from django.db.models import Q
+from django.db import connection, transaction
 from django.utils.timezone import make_aware
-from mturk.main.models import Crawl, DayStats, CrawlAgregates
+
+from utils.sql import execute_sql
 
 log = logging.getLogger('mturk.aggregates')
 
 
-def get_first_crawl():
-        crawls = Crawl.objects.filter().order_by('start_time')[:1]
-        if not crawls:
-            return None
-        else:
-            return crawls[0]
+class Command(BaseCommand):
+    """Updates daily stats of days whose crawl aggregates were written since
+    the last run. Days are marked by a trigger on main_crawlagregates (see
+    schema_daystats_dirty.sql).
 
+    Use --full to recalculate all days.
 
-class Command(BaseCommand):
+    """
 
     help = 'Calculates daily stats'
 
+    option_list = BaseCommand.option_list + (
+        make_option("--full", dest="full", default=False,
+            action="store_true",
+            help='Recalculate stats of all days, not only the ones with '
+                'crawl aggregates changed since the last run.'),
+    )
+
     def handle(self, **options):
-        """Updates daily stats by reducing hitgroups_posted and
-        hitgroups_consumed of CrawAggregates occuring that day.
+        """Updates daily stats by reducing hits_posted, hits_consumed,
+        rewards_posted and rewards_consumed of CrawAggregates occuring that
+        day.
 
         """
-        commit_every = 100
-        crawl = get_first_crawl()
-        if not crawl:
-            log.error("No crawls to process.")
-            return
-
-        transaction.enter_transaction_management()
-        transaction.managed(True)
-        updates, creates = (0, 0)
-
-        start, end = (crawl.start_day(), datetime.date.today())
-        days = (end - start).days
-        log.info("Processing {0} to {1} ({2} days).".format(start, end, days))
-        i = 0
-
-        for i in range(0, days):
-
-            day = date_to_aware_utc_datetime(
-                crawl.start_day() + datetime.timedelta(days=i))
-
-            day_end = day + datetime.timedelta(days=1)
-
-            # excluding objects having zero
-            aggregates = CrawlAgregates.objects.filter(
-                start_time__gte=day, start_time__lt=day_end
-                ).filter(Q(hits_posted__gt=0) |
-                         Q(hits_consumed__gt=0) |
-                         Q(rewards_posted__gt=0) |
-                         Q(rewards_consumed__gt=0))
-
-            if len(aggregates) == 0:
-                log.info("No crawl aggregates for %s." % day)
-                continue
-
-            res = [0, 0, 0, 0]
-            for a in aggregates:
-                for i, at in enumerate(['hits_posted', 'rewards_posted',
-                    'hits_consumed', 'rewards_consumed']):
-                    res[i] += getattr(a, at) or 0
-            values = {}
-            for i, k in enumerate(['arrivals', 'arrivals_value', 'processed',
-                'processed_value']):
-                values[k] = res[i]
-
-            obj, created = DayStats.objects.get_or_create(
-                date=day, defaults=values)
-
-            if not created:
-                updated = False
-                for k, v in values.iteritems():
-                    if (v is not None and
-                        round(getattr(obj, k), 4) != round(v, 4)):
-                        setattr(obj, k, v)
-                        updated = True
-                if updated:
-                    obj.save()
-                    updates += 1
-            else:
-                creates += 1
-
-            if i % commit_every == 0:
-                log.info('{0}/{1} days processed, commiting.'.format(i, days))
-                transaction.commit()
-
-        # commit the missing records
-        if i % commit_every != 0:
-            log.info('{0}/{1} days processed, commiting.'.format(i, days))
-            transaction.commit()
-
-        log.info('DayStat refresh finished: {0}/{1}/{2} created/updated/total '
-            'objects.'.format(creates, updates, days))
+        start_time = time.time()
+        updates, creates = update_day_stats(full=options['full'])
+        log.info('DayStat refresh finished: {0}/{1} created/updated objects '
+            'in {2:.2f}s.'.format(creates, updates, time.time() - start_time))
+
+
+def update_day_stats(full=False):
+    """Recalculates main_daystats rows of dirty days, or of all days if
+    ``full`` is set, with a single statement. Returns tuple (number of
+    updated, number of created rows).
+
+    Today is never processed, its aggregates are still being written; the day
+    stays dirty until the next run. Days without any non-zero aggregates are
+    skipped.
+
+    """
+    today = date_to_aware_utc_datetime(datetime.date.today())
+    max_id = execute_sql('SELECT max(id) FROM daystats_dirty').fetchone()[0]
+    if max_id is None and not full:
+        log.info('No dirty days to process.')
+        return 0, 0
+
+    if full:
+        log.info('Processing all days before {0}.'.format(today.date()))
+        dirty_join = ''
+    else:
+        # a day marked after max_id was read will be processed next time
+        dirty_join = """
+            JOIN (
+                SELECT DISTINCT date FROM daystats_dirty
+                WHERE id <= %(max_id)s
+            ) AS dirty
+            ON
+                a.start_time >= dirty.date::timestamp AT TIME ZONE 'UTC' AND
+                a.start_time < (dirty.date + 1)::timestamp AT TIME ZONE 'UTC'
+        """
+
+    cursor = connection.cursor()
+    cursor.execute("""
+        WITH stats AS (
+            SELECT
+                date_trunc('day', a.start_time AT TIME ZONE 'UTC')::date
+                    AS date,
+                sum(coalesce(a.hits_posted, 0)) AS arrivals,
+                sum(coalesce(a.rewards_posted, 0)) AS arrivals_value,
+                sum(coalesce(a.hits_consumed, 0)) AS processed,
+                sum(coalesce(a.rewards_consumed, 0)) AS processed_value
+            FROM
+                main_crawlagregates a
+                {dirty_join}
+            WHERE
+                a.start_time < %(today)s AND (
+                a.hits_posted > 0 OR a.hits_consumed > 0 OR
+                a.rewards_posted > 0 OR a.rewards_consumed > 0)
+            GROUP BY 1
+        ), updated AS (
+            UPDATE main_daystats d
+            SET
+                arrivals = stats.arrivals,
+                arrivals_value = stats.arrivals_value,
+                processed = stats.processed,
+                processed_value = stats.processed_value
+            FROM stats
+            WHERE d.date = stats.date
+            RETURNING d.date
+        ), created AS (
+            INSERT INTO main_daystats (date, arrivals, arrivals_value,
+                processed, processed_value)
+            SELECT date, arrivals, arrivals_value, processed, processed_value
+            FROM stats
+            WHERE date NOT IN (SELECT date FROM updated)
+            RETURNING date
+        )
+        SELECT
+            (SELECT count(*) FROM updated), (SELECT count(*) FROM created)
+    """.format(dirty_join=dirty_join), {'today': today, 'max_id': max_id})
+    updates, creates = cursor.fetchone()
+
+    if max_id is not None:
+        execute_sql("""DELETE FROM daystats_dirty
+            WHERE id <= %s AND date < %s""", max_id, today.date())
+    transaction.commit_unless_managed()
+    return updates, creates
 
 
 def date_to_aware_utc_datetime(dt):
@@ -0,0 +1,75 @@
+-- Builds hitgroupstatus_history of correct crawls from the given interval from
+-- their main_hitgroupstatus rows, eg. to fill the history of crawls done before
+-- it was maintained by the crawler.
+
+-- Crawls are numbered by id and every group's statuses are ordered by that
+-- number. A run of consecutive crawls with the same hits_available has the
+-- same difference between the crawl number and the status number within the
+-- (group, hits_available) partition, so every run becomes one interval.
+-- Intervals ending in the last crawl of the interval are left open.
+
+-- Open intervals from before the interval are closed at its first crawl,
+-- groups that didn't change get a new interval starting there. The interval
+-- must be newer than all crawls already in the history.
+
+DECLARE
+  first_crawl_id integer;
+BEGIN
+
+  RAISE NOTICE 'Processing crawls from % to %.', istart, iend;
+  RAISE NOTICE 'Correct crawl threshold is %.', crawl_threshold;
+
+  DROP TABLE IF EXISTS history_crawls;
+  CREATE TEMP TABLE history_crawls ON COMMIT DROP AS
+    SELECT
+      id,
+      row_number() OVER (ORDER BY id) AS crawl_nr,
+      lead(id) OVER (ORDER BY id) AS next_id
+    FROM main_crawl
+    WHERE
+      start_time BETWEEN istart AND iend AND
+      groups_available * crawl_threshold < groups_downloaded;
+
+  SELECT min(id) INTO first_crawl_id FROM history_crawls;
+  IF first_crawl_id IS NULL THEN
+    RAISE NOTICE 'No crawls to process.';
+    RETURN;
+  END IF;
+  IF EXISTS (SELECT 1 FROM hitgroupstatus_history_crawls
+             WHERE crawl_id >= first_crawl_id) THEN
+    RAISE EXCEPTION 'History already contains crawls since %.',
+      first_crawl_id;
+  END IF;
+
+  UPDATE hitgroupstatus_history
+    SET valid_to_crawl_id = first_crawl_id
+  WHERE valid_to_crawl_id IS NULL;
+
+  INSERT INTO hitgroupstatus_history (group_id, hits_available,
+      valid_from_crawl_id, valid_to_crawl_id)
+    SELECT
+      group_id, hits_available, min(id),
+      CASE WHEN bool_or(next_id IS NULL) THEN NULL ELSE max(next_id) END
+    FROM (
+      SELECT
+        status.group_id, status.hits_available, crawl.id, crawl.next_id,
+        crawl.crawl_nr - row_number() OVER (
+          PARTITION BY status.group_id, status.hits_available
+          ORDER BY crawl.crawl_nr) AS run
+      FROM
+        (
+          SELECT DISTINCT ON (crawl_id, group_id)
+            crawl_id, group_id, hits_available
+          FROM main_hitgroupstatus
+          WHERE crawl_id IN (SELECT id FROM history_crawls)
+          ORDER BY crawl_id, group_id, id
+        ) AS status
+        JOIN history_crawls crawl ON crawl.id = status.crawl_id
+    ) AS statuses
+    GROUP BY group_id, hits_available, run;
+
+  INSERT INTO hitgroupstatus_history_crawls (crawl_id)
+    SELECT id FROM history_crawls;
+
+  RAISE NOTICE 'Finishing.';
+END;
@@ -0,0 +1,53 @@
+-- Writes changes of hits_available in crawl icrawl_id to
+-- hitgroupstatus_history.
+
+-- Statuses of the crawl are compared with open intervals (valid_to_crawl_id
+-- IS NULL) of the history:
+-- * an interval of a group that is missing in the crawl or has a different
+--   hits_available is closed at the crawl,
+-- * a new interval starting at the crawl is opened for every group that has
+--   no open interval with the same hits_available.
+-- Groups with unchanged hits_available are not written at all.
+
+-- Crawls must be processed in the order of their ids, a crawl older than the
+-- last one in the history is skipped.
+
+BEGIN
+
+  IF EXISTS (SELECT 1 FROM hitgroupstatus_history_crawls
+             WHERE crawl_id >= icrawl_id) THEN
+    RAISE WARNING 'Crawl % is not newer than the history, skipping.',
+      icrawl_id;
+    RETURN;
+  END IF;
+
+  WITH
+    crawl AS (
+      SELECT DISTINCT ON (group_id) group_id, hits_available
+      FROM main_hitgroupstatus
+      WHERE crawl_id = icrawl_id
+      ORDER BY group_id, id
+    ),
+    closed AS (
+      UPDATE hitgroupstatus_history h
+        SET valid_to_crawl_id = icrawl_id
+      WHERE
+        h.valid_to_crawl_id IS NULL AND NOT EXISTS (
+          SELECT 1 FROM crawl
+          WHERE
+            crawl.group_id = h.group_id AND
+            crawl.hits_available IS NOT DISTINCT FROM h.hits_available)
+    )
+  INSERT INTO hitgroupstatus_history (group_id, hits_available,
+      valid_from_crawl_id)
+    SELECT crawl.group_id, crawl.hits_available, icrawl_id
+    FROM crawl
+    WHERE NOT EXISTS (
+      SELECT 1 FROM hitgroupstatus_history h
+      WHERE
+        h.valid_to_crawl_id IS NULL AND
+        h.group_id = crawl.group_id AND
+        h.hits_available IS NOT DISTINCT FROM crawl.hits_available);
+
+  INSERT INTO hitgroupstatus_history_crawls (crawl_id) VALUES (icrawl_id);
+END;
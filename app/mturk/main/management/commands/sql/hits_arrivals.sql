@@ -0,0 +1,82 @@
+-- Set-based replacement of hits_temp_population and hits_update procedures.
+
+-- Updates hits_mv hits_posted and hits_consumed of crawls from the given
+-- interval with a single statement, instead of filling hits_temp and updating
+-- hits_mv row by row.
+
+-- Correct crawls from the interval are numbered by start_time and every
+-- group's statuses are ordered by that number, so lag/lead give the group's
+-- hits_available in the previous/next crawl - a gap in the numbers means the
+-- group was missing there, which counts as 0 hits.
+
+-- Results are the same as of the original procedures:
+-- * hits_posted of a group in a crawl is the increase of hits_available since
+--   the previous crawl,
+-- * hits_consumed of a group in a crawl is the decrease of hits_available in
+--   the next crawl (it's set on the earlier crawl, see hits_update),
+-- * neither is set when the difference equals hits_available, that is when the
+--   group was posted or has disappeared (see initial_post_hits_update).
+
+-- The update is run with EXECUTE, so that it's planned with the actual
+-- interval and hits_mv partitions of other months are skipped (a cached
+-- plpgsql plan is generic and would scan all of them).
+
+BEGIN
+
+  RAISE NOTICE 'Processing crawls from % to %.', istart, iend;
+  RAISE NOTICE 'Correct crawl threshold is %.', crawl_threshold;
+
+  EXECUTE $q$
+  UPDATE hits_mv
+    SET
+      hits_posted = CASE
+        WHEN diff.posted >= 0 AND hits_mv.hits_available <> diff.posted
+        THEN diff.posted ELSE hits_mv.hits_posted END,
+      hits_consumed = CASE
+        WHEN diff.consumed > 0 AND hits_mv.hits_available <> diff.consumed
+        THEN diff.consumed ELSE hits_mv.hits_consumed END
+    FROM (
+      SELECT
+        group_id, crawl_id,
+        CASE WHEN crawl_nr > 1 THEN hits - (
+          CASE WHEN prev_nr = crawl_nr - 1 THEN prev_hits ELSE 0 END)
+        END AS posted,
+        CASE WHEN crawl_nr < crawls THEN hits - (
+          CASE WHEN next_nr = crawl_nr + 1 THEN next_hits ELSE 0 END)
+        END AS consumed
+      FROM (
+        SELECT
+          status.group_id, status.crawl_id,
+          coalesce(status.hits_available, 0) AS hits,
+          crawl.crawl_nr, crawl.crawls,
+          lag(crawl.crawl_nr) OVER w AS prev_nr,
+          lag(coalesce(status.hits_available, 0)) OVER w AS prev_hits,
+          lead(crawl.crawl_nr) OVER w AS next_nr,
+          lead(coalesce(status.hits_available, 0)) OVER w AS next_hits
+        FROM
+          main_hitgroupstatus status
+          JOIN
+          (
+            SELECT
+              id,
+              row_number() OVER (ORDER BY start_time) AS crawl_nr,
+              count(*) OVER () AS crawls
+            FROM main_crawl
+            WHERE
+              start_time BETWEEN $1 AND $2 AND
+              groups_available * $3 < groups_downloaded
+          ) AS crawl
+          ON status.crawl_id = crawl.id
+        WINDOW w AS (PARTITION BY status.group_id ORDER BY crawl.crawl_nr)
+      ) AS neighbours
+    ) AS diff
+    WHERE
+      hits_mv.start_time BETWEEN $1 AND $2 AND
+      hits_mv.group_id = diff.group_id AND
+      hits_mv.crawl_id = diff.crawl_id AND (
+        (diff.posted >= 0 AND hits_mv.hits_available <> diff.posted) OR
+        (diff.consumed > 0 AND hits_mv.hits_available <> diff.consumed))
+  $q$ USING istart, iend, crawl_threshold;
+
+  RAISE NOTICE 'Finishing.';
+END;
@@ -0,0 +1,63 @@
+-- Creates monthly partition of hits_mv for the month of the given date, unless
+-- it already exists.
+
+-- Partitions are named hits_mv_YYYY_MM and inherit from hits_mv. A CHECK
+-- constraint on start_time (months are in UTC) lets the planner skip
+-- partitions not matching the start_time condition of a query
+-- (constraint_exclusion = partition). Rows inserted into hits_mv are routed
+-- to partitions by hits_mv_insert trigger (see hits_mv_partitions.sql).
+
+-- Every partition gets the indexes the unpartitioned hits_mv had.
+
+-- Concurrent inserts of rows of a new month (see hits_mv_insert trigger) would
+-- race to create the same partition. Its creation is serialized by a
+-- transaction-level advisory lock on the partition name and the existence is
+-- checked again once the lock is held.
+
+DECLARE
+  month_start TIMESTAMP WITH TIME ZONE;
+  month_end TIMESTAMP WITH TIME ZONE;
+  partition TEXT;
+
+BEGIN
+
+  month_start := date_trunc('month', imonth::timestamp) AT TIME ZONE 'UTC';
+  month_end := (date_trunc('month', imonth::timestamp) + interval '1 month')
+    AT TIME ZONE 'UTC';
+  partition := 'hits_mv_' || to_char(imonth, 'YYYY_MM');
+
+  IF EXISTS (SELECT 1 FROM pg_class WHERE relname = partition) THEN
+    RETURN;
+  END IF;
+
+  PERFORM pg_advisory_xact_lock(hashtext(partition));
+  IF EXISTS (SELECT 1 FROM pg_class WHERE relname = partition) THEN
+    RETURN;
+  END IF;
+
+  RAISE NOTICE 'Creating hits_mv partition %.', partition;
+
+  EXECUTE 'CREATE TABLE ' || partition || ' ('
+    || 'CHECK (start_time >= ' || quote_literal(month_start)
+    || '::timestamp with time zone AND start_time < '
+    || quote_literal(month_end) || '::timestamp with time zone)'
+    || ') INHERITS (hits_mv)';
+
+  EXECUTE 'CREATE INDEX ' || partition || '_start_time ON ' || partition
+    || ' USING btree (start_time)';
+  EXECUTE 'CREATE INDEX ' || partition || '_crawl_id ON ' || partition
+    || ' USING btree (crawl_id)';
+  EXECUTE 'CREATE INDEX ' || partition || '_group_id ON ' || partition
+    || ' USING btree (group_id)';
+  EXECUTE 'CREATE INDEX ' || partition || '_is_spam ON ' || partition
+    || ' USING btree (is_spam)';
+  EXECUTE 'CREATE INDEX ' || partition || '_group_id_start_time ON '
+    || partition || ' USING btree (group_id, start_time)';
+  EXECUTE 'CREATE INDEX ' || partition || '_groupid_crawlid_hitsposted ON '
+    || partition || ' USING btree (group_id, crawl_id, hits_posted)';
+  EXECUTE 'CREATE INDEX ' || partition || '_groupid_crawlid_hitsconsumed ON '
+    || partition || ' USING btree (group_id, crawl_id, hits_consumed)';
+  EXECUTE 'CREATE INDEX ' || partition || '_content_id_start_time ON '
+    || partition || ' USING btree (content_id, start_time)';
+
+END;
@@ -7,38 +7,32 @@
 -- The procedure will search for hitgroupcontents with first_crawl in the given
 -- interval and update matching hits_mv entries.
 
+-- Set-based version of initial_post_hits_update_loop: crawls of the interval
+-- are selected once and joined with contents first posted in them and their
+-- statuses. EXECUTE lets the planner skip hits_mv partitions outside the
+-- interval, see hits_arrivals.
+
 BEGIN
 
   RAISE NOTICE 'Processing crawls from % to %.', istart, iend;
 
+  EXECUTE $q$
   UPDATE hits_mv
     SET hits_posted = group_first_post.hits_available
     FROM (
       SELECT status.group_id, status.crawl_id, status.hits_available
       FROM
-        (
-          SELECT group_id, first_crawl_id
-          FROM main_hitgroupcontent
-          WHERE first_crawl_id IN (
-            SELECT id FROM main_crawl
-            WHERE start_time BETWEEN istart AND iend
-          )
-        ) as content
-        LEFT JOIN
-        (
-          SELECT group_id, crawl_id, hits_available
-          FROM main_hitgroupstatus
-          WHERE crawl_id IN (
-            SELECT id FROM main_crawl
-            WHERE start_time BETWEEN istart AND iend
-          )
-        ) as status
-        ON
-          content.group_id = status.group_id AND
-          content.first_crawl_id = status.crawl_id
-  ) as group_first_post
+        main_crawl crawl
+        JOIN main_hitgroupcontent content
+          ON content.first_crawl_id = crawl.id
+        JOIN main_hitgroupstatus status
+          ON status.crawl_id = crawl.id AND status.group_id = content.group_id
+      WHERE crawl.start_time BETWEEN $1 AND $2
+    ) AS group_first_post
   WHERE
+    hits_mv.start_time BETWEEN $1 AND $2 AND
     hits_mv.group_id = group_first_post.group_id AND
-    hits_mv.crawl_id = group_first_post.crawl_id;
+    hits_mv.crawl_id = group_first_post.crawl_id
+  $q$ USING istart, iend;
 
 END;
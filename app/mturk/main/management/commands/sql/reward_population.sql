@@ -1,39 +1,52 @@
-declare
-  i integer;
-  total_hits_posted integer; total_hits_consumed integer;
-  total_reward_consumed float; total_reward_posted float;
+-- Calculates the total hits and reward posted and consumed of each crawl from
+-- the given interval using hits_mv records and updates related
+-- main_crawlagregates records.
+
+-- Set-based version of reward_population_loop: hits_mv rows of the whole
+-- interval are aggregated grouped by crawl_id and applied with a single
+-- UPDATE. Crawls without hits_mv rows get NULL totals, as before. EXECUTE
+-- lets the planner skip hits_mv partitions outside the interval, see
+-- hits_arrivals.
 
 BEGIN
 
   RAISE NOTICE 'Processing crawls from % to %.', istart, iend;
-  FOR i IN (SELECT id FROM main_crawl
-            WHERE start_time BETWEEN istart AND iend)
-  LOOP
-
-    /* Calculate the total reward consumed/posted from hits_mv. */
-    SELECT
-      sum(coalesce(hits_consumed, 0)),
-      sum(coalesce(hits_posted, 0)),
-      sum(coalesce(hits_consumed, 0) * reward),
-      sum(coalesce(hits_posted, 0) * reward)
-    INTO
-      total_hits_consumed, total_hits_posted,
-      total_reward_consumed, total_reward_posted
-    FROM hits_mv
-    WHERE crawl_id = i;
 
-    /* The data to the main_crawlaggredates. */
-    UPDATE main_crawlagregates
+  EXECUTE $q$
+  UPDATE main_crawlagregates
     SET
-      hits_posted = total_hits_posted,
-      hits_consumed = total_hits_consumed,
-      rewards_consumed = total_reward_consumed,
-      rewards_posted = total_reward_posted
-    WHERE crawl_id = i;
-
-    if (i % 1000 = 0) then
-      RAISE NOTICE 'Processing crawl % ', i;
-    end if;
+      hits_posted = totals.total_hits_posted,
+      hits_consumed = totals.total_hits_consumed,
+      rewards_consumed = totals.total_reward_consumed,
+      rewards_posted = totals.total_reward_posted
+    FROM (
+      SELECT
+        crawl.id AS crawl_id,
+        sums.total_hits_posted, sums.total_hits_consumed,
+        sums.total_reward_posted, sums.total_reward_consumed
+      FROM
+        main_crawl crawl
+        LEFT JOIN
+        (
+          SELECT
+            crawl_id,
+            sum(coalesce(hits_consumed, 0)) AS total_hits_consumed,
+            sum(coalesce(hits_posted, 0)) AS total_hits_posted,
+            sum(coalesce(hits_consumed, 0) * reward) AS total_reward_consumed,
+            sum(coalesce(hits_posted, 0) * reward) AS total_reward_posted
+          FROM hits_mv
+          WHERE
+            start_time BETWEEN $1 AND $2 AND
+            crawl_id IN (
+              SELECT id FROM main_crawl
+              WHERE start_time BETWEEN $1 AND $2
+            )
+          GROUP BY crawl_id
+        ) AS sums
+        ON sums.crawl_id = crawl.id
+      WHERE crawl.start_time BETWEEN $1 AND $2
+    ) AS totals
+    WHERE main_crawlagregates.crawl_id = totals.crawl_id
+  $q$ USING istart, iend;
 
-  END LOOP;
 END;
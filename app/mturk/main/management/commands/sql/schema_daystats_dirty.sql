@@ -0,0 +1,60 @@
+--
+-- Days whose main_crawlagregates rows were written since the last
+-- db_update_daily_stats run, so that only their main_daystats rows are
+-- recalculated.
+--
+-- Rows are added by daystats_mark_dirty trigger on main_crawlagregates and
+-- removed by db_update_daily_stats. The same day can be listed many times.
+--
+-- Name: daystats_dirty; Type: TABLE; Schema: public; Owner: postgres; Tablespace:
+--
+
+CREATE TABLE daystats_dirty (
+    id serial PRIMARY KEY,
+    date date NOT NULL
+);
+
+
+--
+-- Name: daystats_dirty_date; Type: INDEX; Schema: public; Owner: postgres; Tablespace:
+--
+
+CREATE INDEX daystats_dirty_date ON daystats_dirty USING btree (date);
+
+
+--
+-- Name: daystats_mark_dirty; Type: FUNCTION; Schema: public; Owner: postgres
+--
+
+CREATE OR REPLACE FUNCTION daystats_mark_dirty() RETURNS trigger AS $$
+BEGIN
+  IF TG_OP IN ('INSERT', 'UPDATE') THEN
+    INSERT INTO daystats_dirty (date)
+      VALUES (date_trunc('day', NEW.start_time AT TIME ZONE 'UTC')::date);
+  END IF;
+  IF TG_OP = 'DELETE' OR
+      (TG_OP = 'UPDATE' AND OLD.start_time <> NEW.start_time) THEN
+    INSERT INTO daystats_dirty (date)
+      VALUES (date_trunc('day', OLD.start_time AT TIME ZONE 'UTC')::date);
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+
+--
+-- Name: daystats_mark_dirty; Type: TRIGGER; Schema: public; Owner: postgres
+--
+
+CREATE TRIGGER daystats_mark_dirty
+    AFTER INSERT OR UPDATE OR DELETE ON main_crawlagregates
+    FOR EACH ROW EXECUTE PROCEDURE daystats_mark_dirty();
+
+
+--
+-- All days with aggregates are dirty at first.
+--
+
+INSERT INTO daystats_dirty (date)
+    SELECT DISTINCT date_trunc('day', start_time AT TIME ZONE 'UTC')::date
+    FROM main_crawlagregates;
@@ -0,0 +1,67 @@
+--
+-- Run-length encoded history of hitgroups' hits_available.
+--
+-- Instead of a row for every group in every crawl (as in main_hitgroupstatus
+-- and hits_mv), a row is stored only when a group appears or its
+-- hits_available changes. The row is valid in crawls with ids from
+-- valid_from_crawl_id (inclusive) to valid_to_crawl_id (exclusive); it is NULL
+-- while the group still has the same hits_available.
+--
+-- Rows are written by hitgroupstatus_history_update procedure after every
+-- correct crawl and by hitgroupstatus_history_build for past crawls.
+--
+-- Name: hitgroupstatus_history; Type: TABLE; Schema: public; Owner: postgres; Tablespace:
+--
+
+CREATE TABLE hitgroupstatus_history (
+    id serial PRIMARY KEY,
+    group_id character varying(50) NOT NULL,
+    hits_available integer,
+    valid_from_crawl_id integer NOT NULL,
+    valid_to_crawl_id integer
+);
+
+
+--
+-- Name: hitgroupstatus_history_group_id_valid_from; Type: INDEX; Schema: public; Owner: postgres; Tablespace:
+--
+
+CREATE INDEX hitgroupstatus_history_group_id_valid_from ON hitgroupstatus_history USING btree (group_id, valid_from_crawl_id);
+
+
+--
+-- Name: hitgroupstatus_history_valid_from; Type: INDEX; Schema: public; Owner: postgres; Tablespace:
+--
+
+CREATE INDEX hitgroupstatus_history_valid_from ON hitgroupstatus_history USING btree (valid_from_crawl_id);
+
+
+--
+-- Name: hitgroupstatus_history_valid_to; Type: INDEX; Schema: public; Owner: postgres; Tablespace:
+--
+
+CREATE INDEX hitgroupstatus_history_valid_to ON hitgroupstatus_history USING btree (valid_to_crawl_id);
+
+
+--
+-- Name: hitgroupstatus_history_open; Type: INDEX; Schema: public; Owner: postgres; Tablespace:
+--
+
+CREATE INDEX hitgroupstatus_history_open ON hitgroupstatus_history USING btree (group_id) WHERE valid_to_crawl_id IS NULL;
+
+
+--
+-- Crawls covered by hitgroupstatus_history, only those can be reconstructed.
+--
+-- Name: hitgroupstatus_history_crawls; Type: TABLE; Schema: public; Owner: postgres; Tablespace:
+--
+
+CREATE TABLE hitgroupstatus_history_crawls (
+    crawl_id integer PRIMARY KEY
+);
+
+
+--
+-- hitgroupstatus_history_v view reconstructing per-crawl statuses is created
+-- by mturk.main.migration_extra.views.create_status_history_view.
+--
@@ -0,0 +1,36 @@
+--
+-- Rows of hits_mv written by the crawler while the crawl is running.
+--
+-- Rows are denormalized the same way as in hits_mv, so when the crawl
+-- finishes with enough groups downloaded they are moved to hits_mv with a
+-- single INSERT ... SELECT, without joining main_hitgroupstatus and
+-- main_hitgroupcontent (see db_refresh_mviews.move_staged_hits_mv).
+--
+-- The table is UNLOGGED - its content is lost after a database crash, what
+-- only makes db_refresh_mviews fall back to the join for affected crawls.
+--
+-- Name: hits_mv_staging; Type: TABLE; Schema: public; Owner: postgres; Tablespace:
+--
+
+CREATE UNLOGGED TABLE hits_mv_staging (
+    status_id integer,
+    content_id integer,
+    group_id character varying(50),
+    crawl_id integer,
+    start_time timestamp with time zone,
+    requester_id character varying(50),
+    hits_available integer,
+    page_number integer,
+    inpage_position integer,
+    hit_expiration_date timestamp with time zone,
+    reward double precision,
+    time_alloted integer,
+    is_spam boolean
+);
+
+
+--
+-- Name: hits_mv_staging_crawl_id; Type: INDEX; Schema: public; Owner: postgres; Tablespace:
+--
+
+CREATE INDEX hits_mv_staging_crawl_id ON hits_mv_staging USING btree (crawl_id);
@@ -119,15 +119,36 @@ def create_with_date_and_threshold_args(prname, prtext):
     ]
     return proc_create_query(prname, prtext, argslist)
 
+
+def create_with_month_arg(prname, prtext):
+    argslist = [
+        "imonth DATE",
+    ]
+    return proc_create_query(prname, prtext, argslist)
+
+
+def create_with_crawl_arg(prname, prtext):
+    argslist = [
+        "icrawl_id INTEGER",
+    ]
+    return proc_create_query(prname, prtext, argslist)
+
+
 """Dictionary {procedure_file_name.sql: procedure_creting_method}.
 See __create_procedures for more details.
 
 """
 PROCEDURES_TO_CREATE = {
+    'hits_arrivals.sql': create_with_date_and_threshold_args,
+    'hitgroupstatus_history_build.sql': create_with_date_and_threshold_args,
+    'hitgroupstatus_history_update.sql': create_with_crawl_arg,
+    'hits_mv_create_partition.sql': create_with_month_arg,
     'hits_temp_population.sql': create_with_date_and_threshold_args,
     'hits_update.sql': create_with_date_args,
     'initial_post_hits_update.sql': create_with_date_args,
+    'initial_post_hits_update_loop.sql': create_with_date_args,
     'reward_population.sql': create_with_date_args,
+    'reward_population_loop.sql': create_with_date_args,
 }
 
 """Extra columns to create. {table_name: [(colname, type), ]}."""
@@ -153,4 +174,7 @@ value should contain sql required to create the table.
 """
 EXTRA_TABLES = {
     u"hits_temp": "schema_hits_temp.sql",
+    u"hits_mv_staging": "schema_hits_mv_staging.sql",
+    u"daystats_dirty": "schema_daystats_dirty.sql",
+    u"hitgroupstatus_history": "schema_hitgroupstatus_history.sql",
 }
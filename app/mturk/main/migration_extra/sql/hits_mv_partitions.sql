@@ -0,0 +1,21 @@
+-- Routes rows inserted into hits_mv to its monthly partitions, creating
+-- missing ones (see hits_mv_create_partition procedure).
+
+CREATE OR REPLACE FUNCTION hits_mv_insert() RETURNS trigger AS $$
+DECLARE
+  month DATE;
+  partition TEXT;
+BEGIN
+  month := (NEW.start_time AT TIME ZONE 'UTC')::date;
+  partition := 'hits_mv_' || to_char(month, 'YYYY_MM');
+  IF NOT EXISTS (SELECT 1 FROM pg_class WHERE relname = partition) THEN
+    PERFORM hits_mv_create_partition(month);
+  END IF;
+  EXECUTE 'INSERT INTO ' || partition || ' SELECT ($1).*' USING NEW;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER hits_mv_insert
+    BEFORE INSERT ON hits_mv
+    FOR EACH ROW EXECUTE PROCEDURE hits_mv_insert();
@@ -109,3 +109,141 @@ def drop_indexes():
     db.drop_index('hits_mv', ['group_id'])
     db.drop_index('hits_mv', ['is_spam'])
     db.execute("DROP INDEX hits_mv_start_time_group_id;")
+
+
+def create_content_id_indexes():
+    """Creates (content_id, start_time) index on hits_mv and every table
+    inheriting from it (partitions created later get it from
+    hits_mv_create_partition procedure)."""
+    tables = ['hits_mv'] + [name for (name, ) in db.execute("""
+    SELECT c.relname
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    JOIN pg_class p ON p.oid = i.inhparent
+    WHERE p.relname = 'hits_mv';
+    """)]
+    for table in tables:
+        index = '{0}_content_id_start_time'.format(table)
+        if not db.execute("SELECT 1 FROM pg_class WHERE relname = %s;",
+                [index]):
+            db.execute("""
+            CREATE INDEX {0} ON {1} USING btree (content_id, start_time);
+            """.format(index, table))
+
+
+def drop_content_id_indexes():
+    """Drops indexes created by create_content_id_indexes."""
+    for (index, ) in db.execute("""
+    SELECT relname FROM pg_class
+    WHERE relkind = 'i' AND relname ~ '^hits_mv.*_content_id_start_time$';
+    """):
+        db.execute("DROP INDEX {0};".format(index))
+
+
+def create_status_history_view():
+    """Creates (or replaces) hitgroupstatus_history_v view reconstructing
+    per-crawl rows of hits_mv from run-length encoded hitgroupstatus_history
+    in the crawls it covers.
+
+    hits_posted and hits_consumed are derived from the neighbouring history
+    rows of the group with the rules of hits_arrivals and
+    initial_post_hits_update procedures: hits_posted is set in the first crawl
+    of a row preceded by a lower, non-zero value, or in the first crawl of the
+    group (main_hitgroupcontent.first_crawl_id); hits_consumed is set in the
+    last crawl of a row followed by a lower, non-zero value. Both are NULL
+    otherwise.
+
+    """
+    db.execute("""
+    CREATE OR REPLACE VIEW hitgroupstatus_history_v AS
+    SELECT
+        c.id AS crawl_id, c.start_time, h.group_id, h.hits_available,
+        q.id AS content_id,
+        CASE
+            WHEN hc.crawl_id <> h.valid_from_crawl_id THEN NULL
+            WHEN q.first_crawl_id = hc.crawl_id THEN h.hits_available
+            WHEN h.hits_available > prev_row.hits_available AND
+                prev_row.hits_available > 0
+            THEN h.hits_available - prev_row.hits_available
+        END AS hits_posted,
+        CASE
+            WHEN hc.next_crawl_id = h.valid_to_crawl_id AND
+                h.hits_available > next_row.hits_available AND
+                next_row.hits_available > 0
+            THEN h.hits_available - next_row.hits_available
+        END AS hits_consumed
+    FROM
+        hitgroupstatus_history h
+        JOIN (
+            SELECT
+                crawl_id,
+                lead(crawl_id) OVER (ORDER BY crawl_id) AS next_crawl_id
+            FROM hitgroupstatus_history_crawls
+        ) hc ON
+            hc.crawl_id >= h.valid_from_crawl_id AND (
+            h.valid_to_crawl_id IS NULL OR hc.crawl_id < h.valid_to_crawl_id)
+        JOIN main_crawl c ON c.id = hc.crawl_id
+        LEFT JOIN main_hitgroupcontent q ON q.group_id = h.group_id
+        -- rows of the group directly before and after, if there's no gap
+        LEFT JOIN hitgroupstatus_history prev_row ON
+            prev_row.group_id = h.group_id AND
+            prev_row.valid_to_crawl_id = h.valid_from_crawl_id
+        LEFT JOIN hitgroupstatus_history next_row ON
+            next_row.group_id = h.group_id AND
+            next_row.valid_from_crawl_id = h.valid_to_crawl_id;
+    """)
+
+
+def partition_hits_mv(ahead=2):
+    """Converts hits_mv into a parent of monthly partitions, see
+    hits_mv_create_partition procedure (which must already exist).
+
+    hits_mv is renamed to hits_mv_unpartitioned and a new, empty hits_mv with
+    the same columns and insert trigger routing rows to partitions takes its
+    place. Partitions for all months (in UTC, like partition bounds) from the
+    oldest row up to ``ahead`` months from now are created.
+
+    Existing rows are kept in hits_mv_unpartitioned, which inherits from the
+    new hits_mv, so that they are still visible through it. They should be
+    moved to partitions with db_hits_mv_partitions --move, which drops the
+    table when it's empty. Empty table is dropped right away.
+
+    """
+    db.execute("ALTER TABLE hits_mv RENAME TO hits_mv_unpartitioned;")
+    db.execute("""
+    CREATE TABLE hits_mv (LIKE hits_mv_unpartitioned INCLUDING DEFAULTS);
+    """)
+    db.execute(open(os.path.join(SQL_PATH, 'hits_mv_partitions.sql')).read())
+    db.execute("""
+    SELECT hits_mv_create_partition(month::date)
+    FROM generate_series(
+        date_trunc('month', coalesce(
+            (SELECT min(start_time) FROM hits_mv_unpartitioned), now())
+            AT TIME ZONE 'UTC'),
+        date_trunc('month', now() AT TIME ZONE 'UTC') +
+            interval '{0} months',
+        interval '1 month') AS month;
+    """.format(ahead))
+    if db.execute("SELECT 1 FROM hits_mv_unpartitioned LIMIT 1;"):
+        db.execute("ALTER TABLE hits_mv_unpartitioned INHERIT hits_mv;")
+    else:
+        db.execute("DROP TABLE hits_mv_unpartitioned;")
+
+
+def unpartition_hits_mv():
+    """Reverts partition_hits_mv, copying all rows into a single table."""
+    db.execute("ALTER TABLE hits_mv RENAME TO hits_mv_partitioned;")
+    db.execute("""
+    CREATE TABLE hits_mv (LIKE hits_mv_partitioned INCLUDING DEFAULTS);
+    """)
+    db.execute("INSERT INTO hits_mv SELECT * FROM hits_mv_partitioned;")
+    db.execute("DROP TABLE hits_mv_partitioned CASCADE;")
+    db.execute("DROP FUNCTION IF EXISTS hits_mv_insert();")
+    create_indexes()
+    db.execute("""
+    CREATE INDEX groupid_crawlid_hitsposted ON hits_mv
+    USING btree (group_id, crawl_id, hits_posted);
+    CREATE INDEX groupid_crawlid_hitsconsumed ON hits_mv
+    USING btree (group_id, crawl_id, hits_consumed);
+    """)
+    create_content_id_indexes()
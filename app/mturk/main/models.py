@@ -3,7 +3,8 @@
 import datetime
 from django.db import models, connection, transaction
 
-from mturk.fields import JSONField
+from mturk.fields import JSONField, BlobField
+from mturk.main import htmlblobs
 
 
 class Crawl(models.Model):
@@ -47,6 +48,32 @@ class Crawl(models.Model):
         return 'Crawl: ' + str(self.start_time) + ' ' + str(self.end_time)
 
 
+class CrawlMetrics(models.Model):
+    """Timings and throughput of a single crawl, recorded by the crawler.
+
+    Times are in seconds. ``stats`` keeps other crawler statistics, eg. of
+    the request scheduler and caches.
+    """
+    crawl = models.OneToOneField(Crawl, related_name='metrics',
+        verbose_name="Crawl")
+    work_time = models.FloatField('Work time')
+    groups_per_sec = models.FloatField('Groups per second', null=True)
+    fetch_requests = models.IntegerField('Fetch requests', default=0,
+        help_text="Number of download attempts, including retries")
+    fetch_latency_p50 = models.FloatField('Fetch latency p50', null=True)
+    fetch_latency_p95 = models.FloatField('Fetch latency p95', null=True)
+    fetch_latency_p99 = models.FloatField('Fetch latency p99', null=True)
+    retries_per_page = models.FloatField('Retries per page', null=True)
+    detail_fetches = models.IntegerField('Detail fetches', default=0)
+    detail_fetch_time = models.FloatField('Detail fetch time', default=0)
+    parse_time = models.FloatField('Parse time', default=0)
+    db_write_time = models.FloatField('Database write time', default=0)
+    queue_depth_max = models.IntegerField('Max queue depth', null=True)
+    queue_depth_avg = models.FloatField('Average queue depth', null=True)
+    stats = JSONField('Stats', blank=True, null=True,
+        help_text="Other crawler statistics in JSON format")
+
+
 class HitGroupContent(models.Model):
     """Description of a hitgroup with a given id. Only one entry per a hit
     group.
@@ -60,7 +87,11 @@ class HitGroupContent(models.Model):
         db_index=True)
     requester_name = models.CharField('Requester name', max_length=10000)
     reward = models.FloatField('Reward')
-    html = models.TextField('HTML', max_length=100000000)
+    # html of groups not converted to main_htmlblob yet, see html property
+    html_inline = models.TextField('HTML', max_length=100000000,
+        db_column='html', blank=True)
+    html_blob = models.ForeignKey('HtmlBlob', null=True, blank=True,
+        db_column='html_hash', verbose_name="HTML blob")
     description = models.TextField('Description', max_length=1000000)
     title = models.CharField('Title', max_length=10000)
     keywords = models.CharField('Keywords', blank=True, max_length=10000,
@@ -70,9 +101,6 @@ class HitGroupContent(models.Model):
     occurrence_date = models.DateTimeField('First occurrence date', blank=True,
         null=True, db_index=True)
 
-    hits_available = models.IntegerField('Last HITs available number', default=0)
-    last_updated = models.DateTimeField(null=True, blank=True)
-
     '''
     Time in minutes
     '''
@@ -88,6 +116,68 @@ class HitGroupContent(models.Model):
         """Returns url to HIT group details page."""
         return ('hit_group_details', (), {'hit_group_id': self.group_id})
 
+    def get_state(self):
+        """Returns HitGroupState of this group, or a new unsaved one if there
+        is none yet. It's saved together with this object.
+
+        """
+        if getattr(self, '_group_state', None) is None:
+            self._group_state = None
+            if self.pk:
+                try:
+                    self._group_state = self.state
+                except HitGroupState.DoesNotExist:
+                    pass
+            if self._group_state is None:
+                self._group_state = HitGroupState()
+        return self._group_state
+
+    def _get_hits_available(self):
+        return self.get_state().hits_available
+
+    def _set_hits_available(self, value):
+        self.get_state().hits_available = value
+
+    hits_available = property(_get_hits_available, _set_hits_available,
+        doc="Last HITs available number, stored in HitGroupState.")
+
+    def _get_last_updated(self):
+        return self.get_state().last_updated
+
+    def _set_last_updated(self, value):
+        self.get_state().last_updated = value
+
+    last_updated = property(_get_last_updated, _set_last_updated,
+        doc="Time of the last crawl containing the group, stored in "
+            "HitGroupState.")
+
+    def _get_html(self):
+        html = getattr(self, '_html', None)
+        if html is not None:
+            return html
+        if self.html_blob_id:
+            return htmlblobs.cache.get(self.html_blob_id) or u''
+        return self.html_inline
+
+    def _set_html(self, value):
+        self._html = value
+
+    html = property(_get_html, _set_html,
+        doc="HTML of the group, read lazily from HtmlBlob.")
+
+    def save(self, *args, **kwargs):
+        html = getattr(self, '_html', None)
+        if html is not None:
+            self.html_inline = u''
+            self.html_blob_id = (htmlblobs.store(connection.cursor(), html)
+                if html else None)
+            self._html = None
+        super(HitGroupContent, self).save(*args, **kwargs)
+        state = getattr(self, '_group_state', None)
+        if state is not None:
+            state.hit_group_content = self
+            state.save()
+
     def prepare_for_prediction(self):
 
         # import csv
@@ -115,6 +205,35 @@ class HitGroupContent(models.Model):
         # return csvrow
 
 
+class HtmlBlob(models.Model):
+    """Zlib compressed html of hitgroups, stored once under the SHA1 hash of
+    its utf-8 bytes (see mturk.main.htmlblobs)."""
+    hash = models.CharField('SHA1 hash', max_length=40, primary_key=True)
+    data = BlobField('Compressed data')
+    size = models.IntegerField('Size', help_text="Uncompressed size in bytes")
+
+
+class HitGroupState(models.Model):
+    """The current state of a hitgroup, updated by the crawler in every crawl
+    containing the group.
+
+    Kept apart from HitGroupContent, so that frequent updates don't rewrite
+    its wide rows (html, description etc.). HitGroupContent hits_available and
+    last_updated properties read this model.
+
+    """
+    hit_group_content = models.OneToOneField(HitGroupContent,
+        primary_key=True, related_name='state',
+        verbose_name="Hitgroup content")
+    hits_available = models.IntegerField('Last HITs available number',
+        default=0)
+    last_updated = models.DateTimeField('Last updated', null=True, blank=True,
+        db_index=True)
+    last_crawl = models.ForeignKey(Crawl, null=True, blank=True,
+        verbose_name="Last crawl",
+        help_text="The last crawl containing this group")
+
+
 class HitGroupStatus(models.Model):
     """Contains information on hit group progress.
     There can be many records per each hit group.
@@ -241,6 +360,9 @@ class HitGroupClass(models.Model):
     """ Contains information about classification.
     """
     group_id = models.CharField(max_length=50, db_index=True, unique=True)
+    # integer key used to join classes with hits_mv and hitgroup contents
+    content = models.ForeignKey(HitGroupContent, null=True, blank=True,
+        unique=True)
     classes = models.IntegerField(db_index=True)
     probabilities = models.CharField(max_length=1000)
 
@@ -9,6 +9,34 @@ from django.conf import settings
 from mturk.main.models import Crawl, HitGroupContent
 
 
+# (header, CrawlMetrics attribute, format)
+CRAWL_METRICS_COLUMNS = (
+    ('crawl', 'crawl_id', '{0}'),
+    ('start time', 'crawl.start_time', '{0:%y-%m-%d %H:%M}'),
+    ('work s', 'work_time', '{0:.0f}'),
+    ('groups/s', 'groups_per_sec', '{0:.1f}'),
+    ('requests', 'fetch_requests', '{0}'),
+    ('p50 s', 'fetch_latency_p50', '{0:.3f}'),
+    ('p95 s', 'fetch_latency_p95', '{0:.3f}'),
+    ('p99 s', 'fetch_latency_p99', '{0:.3f}'),
+    ('retries', 'retries_per_page', '{0:.2f}'),
+    ('details', 'detail_fetches', '{0}'),
+    ('detail s', 'detail_fetch_time', '{0:.1f}'),
+    ('parse s', 'parse_time', '{0:.1f}'),
+    ('db s', 'db_write_time', '{0:.1f}'),
+    ('queue max', 'queue_depth_max', '{0}'),
+    ('queue avg', 'queue_depth_avg', '{0:.1f}'),
+)
+
+
+def crawl_metrics_value(metrics, attr):
+    """Return value of ``attr`` (possibly dotted) of CrawlMetrics object."""
+    value = metrics
+    for name in attr.split('.'):
+        value = getattr(value, name)
+    return value
+
+
 def pad_string(s, l):
     return str(s) + ((l - len(str(s))) * ' ')
 
@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+"""Compact binary snapshots of finished crawls.
+
+Crawler writes groups downloaded by every crawl to a file in
+CRAWLER_SNAPSHOTS_PATH, named after the crawl id. A snapshot is read through
+mmap without any parsing, so crawls can be compared, replayed or scanned
+without touching the database.
+
+File layout (little-endian):
+
+* header: magic, format version, crawl id, start time (unix timestamp),
+  groups available, number of groups and size of the group ids block,
+* offsets of group ids (number of groups + 1 unsigned 32-bit integers),
+* group ids, sorted and concatenated,
+* columns, each aligned to 8 bytes: hits_available (int32), reward (float64),
+  page_number (int32) and inpage_position (int32).
+
+Missing values (None) are stored as NULL_INT in integer columns and NaN in
+float ones, so they aren't confused with zeros.
+"""
+
+import os
+import sys
+import mmap
+import time
+import struct
+import calendar
+from array import array
+from collections import namedtuple
+
+from django.conf import settings
+
+
+MAGIC = 'MTSNAP'
+VERSION = 1
+HEADER = struct.Struct('<6sHIdIII')
+OFFSET = struct.Struct('<I')
+OFFSETS = struct.Struct('<II')
+# (name, array typecode)
+COLUMNS = (
+    ('hits_available', 'i'),
+    ('reward', 'd'),
+    ('page_number', 'i'),
+    ('inpage_position', 'i'),
+)
+COLUMN_NAMES = tuple(name for name, typecode in COLUMNS)
+NULL_INT = -2 ** 31
+
+SnapshotRow = namedtuple('SnapshotRow', ('group_id', ) + COLUMN_NAMES)
+
+
+class SnapshotError(Exception):
+    """File is not a crawl snapshot of a supported version."""
+
+
+def align(position, size=8):
+    return (position + size - 1) // size * size
+
+
+def timestamp(dt):
+    """Return unix timestamp of ``dt``, naive datetimes are local time."""
+    if dt.tzinfo is not None:
+        return calendar.timegm(dt.utctimetuple()) + dt.microsecond / 1e6
+    return time.mktime(dt.timetuple()) + dt.microsecond / 1e6
+
+
+def encode(typecode, value):
+    """Return ``value`` to be stored in a column of ``typecode``."""
+    if value is None:
+        return NULL_INT if typecode == 'i' else float('nan')
+    return value
+
+
+def decode(typecode, value):
+    """Return stored ``value`` of a column of ``typecode``, None if it's
+    missing."""
+    if typecode == 'i' and value == NULL_INT or value != value:
+        return None
+    return value
+
+
+def to_little_endian(values):
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+def snapshots_path():
+    """Return directory of crawl snapshots."""
+    return settings.CRAWLER_SNAPSHOTS_PATH or os.path.join(
+        settings.RUN_DATA_PATH, 'snapshots')
+
+
+def snapshot_path(crawl_id, path=None):
+    """Return file name of the snapshot of crawl ``crawl_id``."""
+    return os.path.join(path or snapshots_path(),
+        '{0:010d}.snap'.format(crawl_id))
+
+
+def write_snapshot(filename, crawl_id, start_time, groups,
+        groups_available=0):
+    """Write snapshot of crawl ``crawl_id`` started at ``start_time``
+    (datetime) into ``filename``, atomically replacing it.
+
+    ``groups`` maps group ids to tuples of (hits_available, reward,
+    page_number, inpage_position).
+    """
+    group_ids = sorted(str(group_id) for group_id in groups)
+    offsets = array('I', [0])
+    for group_id in group_ids:
+        offsets.append(offsets[-1] + len(group_id))
+    ids = ''.join(group_ids)
+    columns = [array(typecode) for name, typecode in COLUMNS]
+    for group_id in group_ids:
+        for column, value in zip(columns, groups[group_id]):
+            column.append(encode(column.typecode, value))
+
+    with open(filename + '.tmp', 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, crawl_id, timestamp(start_time),
+            groups_available or 0, len(group_ids), len(ids)))
+        f.write(to_little_endian(offsets).tostring())
+        f.write(ids)
+        for column in columns:
+            f.write('\0' * (align(f.tell()) - f.tell()))
+            f.write(to_little_endian(column).tostring())
+    os.rename(filename + '.tmp', filename)
+
+
+class Snapshot(object):
+    """Read-only, memory mapped crawl snapshot.
+
+    Single groups are looked up by binary search over group ids (see get),
+    whole columns are copied into arrays with a single memcpy (see column).
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        with open(filename, 'rb') as f:
+            self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            (magic, version, self.crawl_id, self.start_time,
+                self.groups_available, self.count, ids_size) = (
+                    HEADER.unpack_from(self.mmap))
+        except struct.error:
+            self.close()
+            raise SnapshotError('{0} is too short.'.format(filename))
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise SnapshotError('{0} is not a crawl snapshot (version '
+                '{1}).'.format(filename, VERSION))
+        self.offsets_start = HEADER.size
+        self.ids_start = self.offsets_start + OFFSET.size * (self.count + 1)
+        self.columns = {}
+        position = self.ids_start + ids_size
+        for name, typecode in COLUMNS:
+            position = align(position)
+            self.columns[name] = (position, typecode,
+                struct.Struct('<' + typecode))
+            position += array(typecode).itemsize * self.count
+
+    def __len__(self):
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.mmap.close()
+
+    def group_id(self, i):
+        start, end = OFFSETS.unpack_from(self.mmap,
+            self.offsets_start + OFFSET.size * i)
+        return self.mmap[self.ids_start + start:self.ids_start + end]
+
+    def group_ids(self):
+        """Return sorted list of all group ids."""
+        offsets = self.read_array('I', self.offsets_start, self.count + 1)
+        ids = self.mmap[self.ids_start:self.ids_start + offsets[-1]]
+        return [ids[offsets[i]:offsets[i + 1]] for i in xrange(self.count)]
+
+    def index(self, group_id):
+        """Return position of ``group_id`` or -1 if it's not there."""
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.group_id(mid) < group_id:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.count and self.group_id(lo) == group_id:
+            return lo
+        return -1
+
+    def value(self, name, i):
+        position, typecode, fmt = self.columns[name]
+        return decode(typecode,
+            fmt.unpack_from(self.mmap, position + fmt.size * i)[0])
+
+    def row(self, i):
+        return SnapshotRow(self.group_id(i),
+            *[self.value(name, i) for name in COLUMN_NAMES])
+
+    def get(self, group_id):
+        """Return SnapshotRow of ``group_id`` or None if it's not there."""
+        i = self.index(str(group_id))
+        return self.row(i) if i >= 0 else None
+
+    def read_array(self, typecode, position, count):
+        values = array(typecode)
+        values.fromstring(
+            self.mmap[position:position + values.itemsize * count])
+        return to_little_endian(values)
+
+    def column(self, name):
+        """Return array of all values of column ``name``, in the order of
+        group_ids. Missing values are left encoded, see NULL_INT."""
+        position, typecode, fmt = self.columns[name]
+        return self.read_array(typecode, position, self.count)
+
+    def as_dict(self, name='hits_available'):
+        """Return dictionary mapping group ids to values of column
+        ``name``, None for missing ones."""
+        typecode = self.columns[name][1]
+        return dict((group_id, decode(typecode, value)) for group_id, value
+            in zip(self.group_ids(), self.column(name)))
+
+
+def diff(previous, current):
+    """Return tuple of dictionaries (posted, consumed) mapping group ids to
+    hits posted in the ``current`` snapshot and hits consumed since the
+    ``previous`` one, with the rules of hits_arrivals procedure: the increase
+    or decrease of hits_available, unless it equals hits_available (the group
+    was just posted or has disappeared). Groups with nothing posted or
+    consumed are left out.
+
+    Both snapshots are merged in the order of their sorted group ids. Only
+    groups present in both of them can have anything posted or consumed -
+    for other ones the difference equals their hits_available. Groups with
+    hits_available missing in either snapshot are skipped, like NULLs by the
+    procedure.
+    """
+    prev_ids, prev_hits = previous.group_ids(), previous.column(
+        'hits_available')
+    curr_ids, curr_hits = current.group_ids(), current.column(
+        'hits_available')
+    posted, consumed = {}, {}
+    i = j = 0
+    while i < len(prev_ids) and j < len(curr_ids):
+        prev_id, curr_id = prev_ids[i], curr_ids[j]
+        if prev_id < curr_id:
+            i += 1
+        elif curr_id < prev_id:
+            j += 1
+        else:
+            before, after = prev_hits[i], curr_hits[j]
+            if NULL_INT in (before, after):
+                pass
+            elif after > before > 0:
+                posted[curr_id] = after - before
+            elif before > after > 0:
+                consumed[curr_id] = before - after
+            i += 1
+            j += 1
+    return posted, consumed
+
+
+def remove_old_snapshots(days, path=None):
+    """Remove snapshots modified more than ``days`` days ago, return their
+    number."""
+    path = path or snapshots_path()
+    limit = time.time() - days * 86400
+    removed = 0
+    for fname in os.listdir(path):
+        filename = os.path.join(path, fname)
+        if fname.endswith('.snap') and os.path.getmtime(filename) < limit:
+            os.remove(filename)
+            removed += 1
+    return removed
@@ -0,0 +1,196 @@
+import os
+import shutil
+import datetime
+import tempfile
+import unittest
+
+from mturk.main import indexes
+from mturk.main import snapshots
+from mturk.main.indexes import Index, ExistingIndex
+
+
+def existing(definition, valid=True, primary=False):
+    return ExistingIndex(*indexes.parse_index_definition(definition) +
+        (valid, primary))
+
+
+class IndexRegistryTest(unittest.TestCase):
+
+    def test_parse_index_definition(self):
+        self.assertEqual(indexes.parse_index_definition(
+            'CREATE INDEX hits_mv_2012_01_group_id_start_time ON '
+            'hits_mv_2012_01 USING btree (group_id, start_time)'),
+            ('hits_mv_2012_01', 'hits_mv_2012_01_group_id_start_time',
+                ('group_id', 'start_time'), False, None, 'btree'))
+        self.assertEqual(indexes.parse_index_definition(
+            'CREATE UNIQUE INDEX hitgroupstatus_history_open ON '
+            'public.hitgroupstatus_history USING btree (group_id) '
+            'WHERE (valid_to_crawl_id IS NULL)'),
+            ('hitgroupstatus_history', 'hitgroupstatus_history_open',
+                ('group_id', ), True, 'valid_to_crawl_id is null', 'btree'))
+        self.assertEqual(indexes.parse_index_definition(
+            'CREATE INDEX x ON t USING btree (lower((a)::text), b)')[2],
+            ('lower((a)::text)', 'b'))
+
+    def test_find_missing(self):
+        required = [
+            Index('main_crawl', ['start_time']),
+            Index('main_hitgroupstatus', ['crawl_id']),
+            Index('main_hitgroupstatus', ['group_id']),
+            Index('hits_mv', ['content_id', 'start_time']),
+            Index('no_such_table', ['id']),
+        ]
+        present = [
+            existing('CREATE INDEX s ON main_hitgroupstatus USING btree '
+                '(crawl_id, group_id)'),
+            existing('CREATE INDEX g ON main_hitgroupstatus USING btree '
+                '(group_id varchar_pattern_ops)'),
+            existing('CREATE INDEX c ON main_crawl USING btree '
+                '(start_time)', valid=False),
+            existing('CREATE INDEX h ON hits_mv_2012_01 USING btree '
+                '(content_id, start_time)'),
+        ]
+        tables = {'main_crawl': [], 'main_hitgroupstatus': [],
+            'hits_mv': ['hits_mv_2012_01', 'hits_mv_2012_02'],
+            'hits_mv_2012_01': [], 'hits_mv_2012_02': []}
+        self.assertEqual(indexes.find_missing(required, present, tables), [
+            ('main_crawl', required[0]),
+            ('main_hitgroupstatus', required[2]),
+            ('hits_mv_2012_02', required[3]),
+        ])
+
+    def test_find_duplicates(self):
+        present = [
+            existing('CREATE INDEX a ON t USING btree (crawl_id)'),
+            existing('CREATE INDEX b ON t USING btree (crawl_id, group_id)'),
+            existing('CREATE INDEX c ON t USING btree (crawl_id, group_id)'),
+            existing('CREATE UNIQUE INDEX d ON t USING btree (id)'),
+            existing('CREATE INDEX e ON t USING btree (id)'),
+            existing('CREATE INDEX f ON t USING btree (group_id) '
+                'WHERE (id IS NULL)'),
+            existing('CREATE INDEX g ON u USING btree (crawl_id)'),
+        ]
+        self.assertEqual(
+            [(i.name, o.name) for i, o in indexes.find_duplicates(present)],
+            [('a', 'b'), ('c', 'b'), ('e', 'd')])
+
+
+class SnapshotTest(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def write(self, crawl_id, hits, **kwargs):
+        filename = snapshots.snapshot_path(crawl_id, self.path)
+        groups = dict((group_id, (hits, 0.01 * n, n / 10 + 1, n % 10 + 1))
+            for n, (group_id, hits) in enumerate(sorted(hits.items())))
+        snapshots.write_snapshot(filename, crawl_id,
+            datetime.datetime(2012, 6, 1, 12, 0), groups, **kwargs)
+        return snapshots.Snapshot(filename)
+
+    def test_write_and_read(self):
+        snapshot = self.write(7, {'B2': 5, 'A1': 3, 'C333': None},
+            groups_available=4)
+        self.assertEqual((snapshot.crawl_id, snapshot.groups_available,
+            len(snapshot)), (7, 4, 3))
+        self.assertEqual(snapshot.group_ids(), ['A1', 'B2', 'C333'])
+        self.assertEqual(list(snapshot.column('hits_available')),
+            [3, 5, snapshots.NULL_INT])
+        self.assertEqual(list(snapshot.column('page_number')), [1, 1, 1])
+        self.assertEqual(snapshot.get('B2'),
+            snapshots.SnapshotRow('B2', 5, 0.01, 1, 2))
+        self.assertEqual(snapshot.get('B'), None)
+        self.assertEqual(snapshot.get('D4'), None)
+        self.assertEqual(snapshot.get('C333').hits_available, None)
+        self.assertEqual(snapshot.as_dict(), {'A1': 3, 'B2': 5, 'C333': None})
+        snapshot.close()
+
+    def test_empty(self):
+        snapshot = self.write(1, {})
+        self.assertEqual(snapshot.group_ids(), [])
+        self.assertEqual(snapshot.get('A1'), None)
+        snapshot.close()
+
+    def test_not_a_snapshot(self):
+        filename = os.path.join(self.path, 'other')
+        with open(filename, 'w') as f:
+            f.write('{"crawl_id": 1, "groups": {}}')
+        self.assertRaises(snapshots.SnapshotError, snapshots.Snapshot,
+            filename)
+
+    def test_diff(self):
+        previous = self.write(1, {'grown': 5, 'shrunk': 10, 'same': 3,
+            'gone': 4, 'emptied': 2, 'was_empty': 0})
+        current = self.write(2, {'grown': 8, 'shrunk': 6, 'same': 3,
+            'new': 7, 'emptied': 0, 'was_empty': 4})
+        # a difference equal to hits_available means the group was posted or
+        # has disappeared, like in hits_arrivals procedure
+        self.assertEqual(snapshots.diff(previous, current),
+            ({'grown': 3}, {'shrunk': 4}))
+        previous.close()
+        current.close()
+
+    def test_missing_values(self):
+        filename = snapshots.snapshot_path(1, self.path)
+        snapshots.write_snapshot(filename, 1,
+            datetime.datetime(2012, 6, 1, 12, 0), {'A1': (0, None, 1, None)})
+        with snapshots.Snapshot(filename) as snapshot:
+            # zeros are kept distinct from missing values
+            self.assertEqual(snapshot.get('A1'),
+                snapshots.SnapshotRow('A1', 0, None, 1, None))
+            self.assertEqual(snapshot.as_dict('reward'), {'A1': None})
+
+    def test_diff_missing_hits_available(self):
+        previous = self.write(1, {'a': None, 'b': 2, 'c': 0})
+        current = self.write(2, {'a': 3, 'b': None, 'c': None})
+        self.assertEqual(snapshots.diff(previous, current), ({}, {}))
+        previous.close()
+        current.close()
+
+
+class CrawlAgregatesTest(unittest.TestCase):
+    """Per-crawl and batch paths of db_update_agregates, with queries
+    recorded instead of executed."""
+
+    class Cursor(object):
+
+        def __init__(self, rowcount):
+            self.rowcount = rowcount
+
+    def setUp(self):
+        from mturk.main.management.commands import db_update_agregates
+        self.module = db_update_agregates
+        self.saved = (db_update_agregates.execute_sql,
+            db_update_agregates.get_crawls)
+        db_update_agregates.execute_sql = self.execute_sql
+        db_update_agregates.get_crawls = lambda start=None, end=None: [
+            {'id': crawl_id} for crawl_id in (1, 2, 3)]
+        self.queries = []
+
+    def tearDown(self):
+        self.module.execute_sql, self.module.get_crawls = self.saved
+
+    def execute_sql(self, query, *args, **kwargs):
+        self.queries.append((' '.join(query.split()), args))
+        return self.Cursor(len(args[0]) if args else 0)
+
+    def test_same_crawls_skipped(self):
+        self.module.update_crawl_agregates()
+        per_crawl, self.queries = self.queries, []
+        self.module.update_crawl_agregates_batch(batch_size=2)
+        batch = self.queries
+
+        # both insert the same crawls with the same statement, crawls with
+        # too few projects are skipped by it and nothing is deleted
+        statements = set(query for query, args in per_crawl + batch)
+        self.assertEqual(len(statements), 1)
+        self.assertTrue(statements.pop().endswith('HAVING count(*) >= %s'))
+        for queries in (per_crawl, batch):
+            self.assertEqual(sorted(crawl_id for query, (crawl_ids, projects)
+                in queries for crawl_id in crawl_ids), [1, 2, 3])
+            self.assertEqual(set(projects for query, (crawl_ids, projects)
+                in queries), set([self.module.MIN_CRAWL_PROJECTS]))
+        self.assertEqual(len(batch), 2)
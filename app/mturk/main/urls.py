@@ -22,6 +22,8 @@ urlpatterns = patterns('',
     url(r'^hit/(?P<hit_group_id>[a-fA-Z0-9]+)/$',
         'mturk.main.views.hit_group_details', name='hit_group_details'),
 
+    url(r'^admin/crawl/metrics/$', 'mturk.main.admin.crawl_metrics',
+        name='admin-crawl-metrics'),
     url(r'^admin/requester/status/toggle/(?P<id>[^/]*)/$',
         'mturk.main.admin.toggle_requester_status',
         name='admin-toggle-requester-status'),
@@ -227,6 +227,7 @@ def hit_group_details(request, hit_group_id):
                 document = classified["document"]
                 hit_group_class = HitGroupClass(
                         group_id=document.group_id,
+                        content=hit_group,
                         classes=most_likely,
                         probabilities=classified["probabilities"])
                 hit_group_class.save()
@@ -258,8 +259,8 @@ def hit_group_details(request, hit_group_id):
 
     dicts = query_to_dicts(
                 """ select start_time, hits_available from hits_mv
-                    where group_id = '{}' order by start_time asc """
-                .format(hit_group_id))
+                    where content_id = {} order by start_time asc """
+                .format(hit_group.id))
     data = hit_group_details_data_formater(dicts)
     params['date_from'] = hit_group.occurrence_date
     params['date_to'] = datetime.datetime.utcnow()
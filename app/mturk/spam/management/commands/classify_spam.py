@@ -64,7 +64,7 @@ class Command(BaseCommand):
 
                 for row in query_to_dicts("""select content_id, group_id, is_spam from hits_mv
                     where
-                        crawl_id = %s""", c.id):
+                        crawl_id = %s""", c.id, server_side=True):
 
                     log.info("classyfing crawl_id: %s, %s", c.id, row)
 
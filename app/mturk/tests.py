@@ -1,2 +1,3 @@
 from main.management.commands.crawler.tests import *
 from importer.tests import *
+from main.tests import *
@@ -22,7 +22,7 @@ def topreq_data_hits_available(days):
         SELECT
             h.requester_id,
             h.requester_name,
-            count(DISTINCT hitgroup.group_id) as "projects",
+            count(DISTINCT hitgroup.content_id) as "projects",
             coalesce(round(CAST (sum(hitgroup.grp_hits) as NUMERIC), 0), 0) as hits,
             coalesce(sum(hitgroup.grp_hits * h.reward), 0) as reward,
             max(hitgroup.grp_last_posted) as "last_posted"
@@ -32,18 +32,18 @@ def topreq_data_hits_available(days):
                 ON h.requester_id = p.requester_id
             LEFT JOIN (
             SELECT
-                mv.group_id,
+                mv.content_id,
                 coalesce(avg(mv.hits_available), 0) as "grp_hits",
                 max(mv.start_time) as "grp_last_posted"
             FROM (
-                SELECT group_id, hits_available, start_time
+                SELECT content_id, hits_available, start_time
                 FROM hits_mv
                 WHERE
                     start_time > '{0}'
                 ) mv
-            GROUP BY mv.group_id
+            GROUP BY mv.content_id
             ) hitgroup
-                ON h.group_id = hitgroup.group_id
+                ON h.id = hitgroup.content_id
         WHERE
             coalesce(p.is_public, true) = true
         GROUP BY h.requester_id, h.requester_name
@@ -67,7 +67,7 @@ def topreq_data_hits_posted(days):
         SELECT
             h.requester_id,
             h.requester_name,
-            coalesce(count(distinct mv.group_id), 0) as "projects",
+            coalesce(count(distinct mv.content_id), 0) as "projects",
             coalesce(sum(mv.hits_posted), 0) as "hits",
             coalesce(sum(mv.hits_posted * h.reward), 0) as "reward",
             max(mv.start_time) as "last_posted"
@@ -76,13 +76,13 @@ def topreq_data_hits_posted(days):
             LEFT JOIN main_requesterprofile p
                 ON h.requester_id = p.requester_id
             LEFT JOIN (
-                SELECT group_id, hits_posted, start_time
+                SELECT content_id, hits_posted, start_time
                 FROM hits_mv
                 WHERE
                     start_time > '{0}' AND
                     hits_posted > 0
             ) mv
-                ON h.group_id = mv.group_id
+                ON h.id = mv.content_id
         WHERE
             coalesce(p.is_public, true) = true
         GROUP BY h.requester_id, h.requester_name
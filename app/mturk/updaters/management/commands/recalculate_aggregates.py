@@ -8,6 +8,8 @@ from django.conf import settings
 
 from utils.management.commands.base.crawl_updater import CrawlUpdaterCommand
 from utils.sql import execute_sql
+from mturk.main.management.commands.db_hits_mv_partitions import (
+    delete_hits_mv)
 
 
 class Command(CrawlUpdaterCommand):
@@ -79,7 +81,13 @@ class Command(CrawlUpdaterCommand):
         the given time period.
 
         """
-        for table in ['hits_mv', 'main_crawlagregates']:
+        st = time.time()
+        self.log.info('Deleting rows from hits_mv where start_time between '
+            '{0} and {1}.'.format(start, end))
+        delete_hits_mv(start, end)
+        self.log.info('{0}s elapsed.'.format(time.time() - st))
+
+        for table in ['main_crawlagregates']:
             st = time.time()
             self.log.info('Deleting rows from {0} where start_time between {1}'
                 ' and {2}.'.format(table, start, end))
@@ -77,8 +77,8 @@ class Command(BaseCommand):
                 '{0}/'.format(self.limit) if self.limit else '',
                 self.crawl_count))
 
-        ids = self.get_crawl_ids()
-        deleted = self.do_deletes(ids)
+        crawls = self.get_crawls()
+        deleted = self.do_deletes(crawls)
 
         log.info('Command took: {0}, {1} crawls processed.'.format(
             self.time_elapsed(), deleted))
@@ -93,9 +93,10 @@ class Command(BaseCommand):
         log.info('{0} records to process.'.format(self.crawl_count))
         sys.exit(0)
 
-    def get_crawl_ids(self):
-        """Returns an iterator containing the ids of records to delete."""
-        return [a for (a, ) in query_to_tuples(self.__get_crawls_query())]
+    def get_crawls(self):
+        """Returns a list of (id, start_time) tuples of crawls to delete."""
+        return list(query_to_tuples(self.__get_crawls_query(
+            what='id, start_time')))
 
     def get_crawls_count(self):
         """Counts the records to delete."""
@@ -138,22 +139,23 @@ class Command(BaseCommand):
         else:
             return self.do_deletes_simple(*args, **kwargs)
 
-    def delete_crawl_agregates(self, ids):
+    def delete_crawl_agregates(self, crawls):
         """This will be done separately, as it'a a much faster query with
         immediately visible effect.
         """
         qq = self.__get_delete_queries(['main_crawlagregates'], 'in').next()
-        execute_sql(qq.format(self.__chunk_str(ids)))
+        execute_sql(qq.format(self.__chunk_str(
+            [crawl_id for crawl_id, start_time in crawls])))
         transaction.commit_unless_managed()
 
-    def do_deletes_simple(self, ids):
+    def do_deletes_simple(self, crawls):
         """Performs a query per crawl and per table."""
         qs = list(self.__get_delete_queries(['hits_mv', 'hits_temp'], '='))
-        for i, crawl_id in enumerate(ids, start=1):
+        for i, (crawl_id, start_time) in enumerate(crawls, start=1):
             if self.limit and i > self.limit:
                 break
             for q in qs:
-                execute_sql(q.format(crawl_id))
+                execute_sql(q.format(crawl_id, start_time, start_time))
             if i % 10 == 0:
                 log.info(("{0}/{1} crawls processed, {2}s elapsed so far."
                     ).format(i, self.crawl_count, self.time_elapsed()))
@@ -169,10 +171,10 @@ class Command(BaseCommand):
         total from given ``iterator``.
         """
         items = list()
-        for i, crawl_id in enumerate(iterator, start=1):
+        for i, item in enumerate(iterator, start=1):
             if limit and i > limit:
                 break
-            items.append(crawl_id)
+            items.append(item)
             if len(items) == chunk_size:
                 yield items
                 items = list()
@@ -182,20 +184,22 @@ class Command(BaseCommand):
     def __chunk_str(self, ids):
         return "({0})".format(",".join([str(a) for a in ids]))
 
-    def do_deletes_chunked(self, ids):
+    def do_deletes_chunked(self, crawls):
         """More complex version, does multiple crawls at a time."""
         processed = 0
         qs = list(self.__get_delete_queries(['hits_mv', 'hits_temp'], 'in'))
         for chunk in self.read_chunks(
-                ids, limit=self.limit, chunk_size=self.chunk_size):
-            chunk_str = self.__chunk_str(chunk)
+                crawls, limit=self.limit, chunk_size=self.chunk_size):
+            ids, start_times = zip(*chunk)
+            chunk_str = self.__chunk_str(ids)
             for q in qs:
-                execute_sql(q.format(chunk_str))
+                execute_sql(q.format(chunk_str, min(start_times),
+                    max(start_times)))
             execute_sql(("update main_crawl set has_hits_mv = false where"
                 " id in {0}").format(chunk_str))
             processed += len(chunk)
             log.info('Processed crawls: {0}, {1}/{2} in {3}s.'.format(
-                chunk, processed, self.crawl_count, self.time_elapsed()))
+                list(ids), processed, self.crawl_count, self.time_elapsed()))
             transaction.commit_unless_managed()
 
         return processed
@@ -203,10 +207,16 @@ class Command(BaseCommand):
     def __get_delete_queries(self, tables, comparator='='):
         """Returns delete queries for all related tables, cmparator argument can
         be used to get 'crawl_id =' or 'crawl_id in' queries.
+
+        Queries are formatted with the crawl id(s) and, for hits_mv, the first
+        and the last of their start times, so that only hits_mv partitions of
+        their months are scanned.
         """
         for t in tables:
-            yield "delete from {0} where crawl_id {1} {{0}};".format(
-                t, comparator)
+            bounds = (" and start_time between '{1}' and '{2}'"
+                if t == 'hits_mv' else "")
+            yield "delete from {0} where crawl_id {1} {{0}}{2};".format(
+                t, comparator, bounds)
 
     recount_query = """
     UPDATE main_crawl c
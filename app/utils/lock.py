@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""
+   Exclusive process locks
+"""
+import os
+import fcntl
+import logging
+
+from django.conf import settings
+
+logger = logging.getLogger('pid_files')
+
+
+class FileLock(object):
+    """
+    Exclusive lock of a file named ``name``.lock in RUN_DATA_PATH, held by
+    at most one process at a time. Unlike pid files, the lock can't go stale -
+    the system releases it when the process holding it dies. Pid of the
+    holder is written to the file for information.
+
+    """
+    def __init__(self, name):
+        self.name = name
+        self.path = os.path.join(settings.RUN_DATA_PATH, '%s.lock' % name)
+        self.lock_file = None
+
+    def acquire(self):
+        """Return True if the lock was acquired, False if another process
+        holds it. Never blocks."""
+        lock_file = open(self.path, 'a+')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except IOError:
+            lock_file.seek(0)
+            logger.info('lock %s is held by process %s' % (self.path,
+                lock_file.read().strip() or 'unknown'))
+            lock_file.close()
+            return False
+        lock_file.truncate(0)
+        lock_file.write(str(os.getpid()))
+        lock_file.flush()
+        self.lock_file = lock_file
+        logger.info('lock %s acquired (%s)' % (self.path, self.name))
+        return True
+
+    def release(self):
+        if self.lock_file is not None:
+            fcntl.flock(self.lock_file, fcntl.LOCK_UN)
+            self.lock_file.close()
+            self.lock_file = None
+            logger.info('lock %s released (%s)' % (self.path, self.name))
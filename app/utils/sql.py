@@ -1,48 +1,81 @@
-from itertools import izip
+from itertools import izip, count
+from django.conf import settings
 from django.db import connection, transaction
 
+_cursor_numbers = count()
 
-def query_to_dicts(query_string, *query_args):
+
+def query_cursor(query_string, query_args, server_side=False,
+        itersize=None):
+    """Executes a query and returns tuple (cursor, generator of its rows).
+
+    Rows are fetched in batches of ``itersize`` rows (SQL_ITERSIZE setting by
+    default). If ``server_side`` is set a named cursor is used, so only the
+    current batch is kept in memory instead of the whole result. The cursor is
+    declared WITH HOLD, so it survives commits made while iterating (but not a
+    rollback of the transaction it was declared in), and closed when the
+    generator is exhausted or garbage collected.
+
+    Cursor description is available once the first row was fetched.
+    """
+    itersize = itersize or settings.SQL_ITERSIZE
+    if server_side:
+        # makes sure the connection is open
+        connection.cursor()
+        cursor = connection.connection.cursor(
+            'utils_sql_{0}'.format(next(_cursor_numbers)), withhold=True)
+        cursor.itersize = itersize
+    else:
+        cursor = connection.cursor()
+    cursor.execute(query_string, query_args)
+    return cursor, fetch_rows(cursor, itersize, close=server_side)
+
+
+def fetch_rows(cursor, size, close=False):
+    """Yields rows of ``cursor`` fetched in batches of ``size`` rows."""
+    try:
+        while True:
+            rows = cursor.fetchmany(size)
+            if not rows:
+                break
+            for row in rows:
+                yield row
+    finally:
+        if close and not cursor.closed:
+            cursor.close()
+
+
+def query_to_dicts(query_string, *query_args, **kwargs):
     """Run a simple query and produce a generator
     that returns the results as a bunch of dictionaries
     with keys for the column values selected.
+
+    Keyword arguments server_side and itersize are passed to query_cursor.
     """
-    cursor = connection.cursor()
-    cursor.execute(query_string, query_args)
-    col_names = [desc[0] for desc in cursor.description]
-    while True:
-        row = cursor.fetchone()
-        if row is None:
-            break
-        row_dict = dict(izip(col_names, row))
-        yield row_dict
-    return
+    cursor, rows = query_cursor(query_string, query_args, **kwargs)
+    col_names = None
+    for row in rows:
+        if col_names is None:
+            col_names = [desc[0] for desc in cursor.description]
+        yield dict(izip(col_names, row))
 
 
-def query_to_tuples(query_string, *query_args):
+def query_to_tuples(query_string, *query_args, **kwargs):
     """Run a simple query and produce a generator
     that returns the results as a bunch of tuples
     column values selected as subsequent values.
+
+    Keyword arguments server_side and itersize are passed to query_cursor.
     """
-    cursor = connection.cursor()
-    cursor.execute(query_string, query_args)
-    while True:
-        row = cursor.fetchone()
-        if row is None:
-            break
+    cursor, rows = query_cursor(query_string, query_args, **kwargs)
+    for row in rows:
         yield row
-    return
 
 
-def query_to_lists(query_string, *query_args):
-    cursor = connection.cursor()
-    cursor.execute(query_string, query_args)
-    while True:
-        row = cursor.fetchone()
-        if row is None:
-            break
+def query_to_lists(query_string, *query_args, **kwargs):
+    cursor, rows = query_cursor(query_string, query_args, **kwargs)
+    for row in rows:
         yield list(row)
-    return
 
 
 def execute_sql(query_string, *query_args, **kwargs):
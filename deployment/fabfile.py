@@ -166,6 +166,8 @@ def sync_db():
     show(yellow("Synchronising database"))
     run_django_cmd("syncdb", args="--noinput")
     run_django_cmd("migrate", args="--noinput")
+    show(yellow("Creating missing database indexes"))
+    run_django_cmd("db_ensure_indexes")
 
 
 def configure_services():